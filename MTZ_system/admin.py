@@ -1,4 +1,9 @@
+import os
 import sys
+import time
+
+_INICIO_PROCESO = time.perf_counter()
+
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -11,15 +16,92 @@ from PyQt6.QtWidgets import (
     QStackedWidget,
     QGridLayout,
 )
-from PyQt6.QtCore import Qt
-from registro import VentanaRegistro
-from gestion import VentanaGestion
-from reportes import VentanaReportes
-from monitor import VentanaPrincipal as VentanaMonitor
-from herramientas import VentanaHerramientas
+from PyQt6.QtCore import Qt, QTimer, QDate, QAbstractTableModel, QModelIndex
+
+# registro, gestion, reportes, monitor y herramientas se importan recién cuando se abren
 from database import Database
-from datetime import datetime
-from PyQt6.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView
+from metricas import ServicioMetricas
+from PyQt6.QtWidgets import (
+    QTableView,
+    QAbstractItemView,
+    QHeaderView,
+    QLineEdit,
+    QComboBox,
+    QDateEdit,
+    QCheckBox,
+)
+
+TAM_PAGINA_HISTORIAL = 200
+# MTZ_TIEMPOS_ARRANQUE=1 imprime cuánto tardó cada etapa del arranque
+MOSTRAR_TIEMPOS = os.environ.get("MTZ_TIEMPOS_ARRANQUE", "0") not in ("", "0")
+TIPOS_EVENTO = ["Ingreso", "Vencido", "Sin Pases", "Rechazado"]
+
+
+class ModeloHistorial(QAbstractTableModel):
+    """Historial de accesos con scroll infinito: pide páginas a medida que se baja"""
+
+    ENCABEZADOS = ["Fecha", "Hora", "Nombre", "Apellido", "Evento"]
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.filtros = {}
+        self.filas = []
+        self.hay_mas = False
+
+    def reiniciar(self, **filtros):
+        self.beginResetModel()
+        self.filtros = filtros
+        self.filas = self.db.pagina_historial(TAM_PAGINA_HISTORIAL, **filtros)
+        self.hay_mas = len(self.filas) == TAM_PAGINA_HISTORIAL
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ENCABEZADOS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.hay_mas
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.filas:
+            return
+        ultima = self.filas[-1]
+        nuevas = self.db.pagina_historial(
+            TAM_PAGINA_HISTORIAL, clave=(ultima[1], ultima[0]), **self.filtros
+        )
+        self.hay_mas = len(nuevas) == TAM_PAGINA_HISTORIAL
+        if not nuevas:
+            return
+        inicio = len(self.filas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(nuevas) - 1)
+        self.filas.extend(nuevas)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        # (id, fecha_hora, fecha, hora, nombre, apellido, evento)
+        fila = self.filas[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return fila[index.column() + 2]
+        if role == Qt.ItemDataRole.ForegroundRole and index.column() == 4:
+            evento = fila[6] or ""
+            if "Rechazado" in evento or "Vencido" in evento or "Sin Pases" in evento:
+                return Qt.GlobalColor.red
+            if "Ingreso" in evento:
+                return Qt.GlobalColor.darkGreen
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return self.ENCABEZADOS[section]
+        return None
 
 
 class VentanaHistorial(QWidget):
@@ -29,20 +111,58 @@ class VentanaHistorial(QWidget):
         layout = QVBoxLayout()
         layout.setContentsMargins(20, 20, 20, 20)
 
-        lbl_titulo = QLabel("Historial de Accesos (Últimos 100)")
+        lbl_titulo = QLabel("Historial de Accesos")
         lbl_titulo.setStyleSheet("font-size: 24px; font-weight: bold; color: #333;")
         layout.addWidget(lbl_titulo)
 
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(5)
-        self.tabla.setHorizontalHeaderLabels(
-            ["Fecha", "Hora", "Nombre", "Apellido", "Evento"]
-        )
+        # --- FILTROS ---
+        estilo_filtro = "background-color: white; color: #333; border: 1px solid #ccc; padding: 6px; border-radius: 4px;"
+        layout_filtros = QHBoxLayout()
+
+        self.check_fechas = QCheckBox("Desde / Hasta")
+        self.check_fechas.setStyleSheet("color: #333;")
+        self.fecha_desde = QDateEdit(QDate.currentDate().addDays(-7))
+        self.fecha_hasta = QDateEdit(QDate.currentDate())
+        for editor in (self.fecha_desde, self.fecha_hasta):
+            editor.setCalendarPopup(True)
+            editor.setDisplayFormat("dd/MM/yyyy")
+            editor.setStyleSheet(estilo_filtro)
+            editor.setEnabled(False)
+            editor.dateChanged.connect(self.cargar_historial)
+        self.check_fechas.toggled.connect(self.fecha_desde.setEnabled)
+        self.check_fechas.toggled.connect(self.fecha_hasta.setEnabled)
+        self.check_fechas.toggled.connect(self.cargar_historial)
+
+        self.input_socio = QLineEdit()
+        self.input_socio.setPlaceholderText("Socio: DNI o nombre...")
+        self.input_socio.setStyleSheet(estilo_filtro)
+        self.timer_socio = QTimer(self)
+        self.timer_socio.setSingleShot(True)
+        self.timer_socio.timeout.connect(self.cargar_historial)
+        self.input_socio.textChanged.connect(lambda: self.timer_socio.start(300))
+
+        self.combo_tipo = QComboBox()
+        self.combo_tipo.addItems(["Todos los eventos"] + TIPOS_EVENTO)
+        self.combo_tipo.setStyleSheet(estilo_filtro)
+        self.combo_tipo.currentIndexChanged.connect(self.cargar_historial)
+
+        layout_filtros.addWidget(self.check_fechas)
+        layout_filtros.addWidget(self.fecha_desde)
+        layout_filtros.addWidget(self.fecha_hasta)
+        layout_filtros.addWidget(self.input_socio)
+        layout_filtros.addWidget(self.combo_tipo)
+        layout.addLayout(layout_filtros)
+
+        self.modelo = ModeloHistorial(self.db, self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.horizontalHeader().setSectionResizeMode(
             QHeaderView.ResizeMode.Stretch
         )
+        self.tabla.verticalHeader().setDefaultSectionSize(28)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.tabla.setStyleSheet(
-            "QTableWidget { background-color: white; color: #333; gridline-color: #ccc; border: 1px solid #ccc; } QHeaderView::section { background-color: #eee; color: #333; padding: 5px; }"
+            "QTableView { background-color: white; color: #333; gridline-color: #ccc; border: 1px solid #ccc; } QHeaderView::section { background-color: #eee; color: #333; padding: 5px; }"
         )
         layout.addWidget(self.tabla)
 
@@ -58,40 +178,20 @@ class VentanaHistorial(QWidget):
         self.cargar_historial()
 
     def cargar_historial(self):
-        conn = self.db.conectar()
-        if conn:
-            cursor = conn.cursor()
-            sql = """
-                SELECT h.fecha_hora, m.nombre, m.apellido, h.tipo_acceso
-                FROM historial_acceso h
-                JOIN miembros m ON h.miembro_id = m.id
-                ORDER BY h.id DESC
-                LIMIT 100
-            """
-            cursor.execute(sql)
-            datos = cursor.fetchall()
-            self.tabla.setRowCount(0)
-            for row_idx, fila in enumerate(datos):
-                self.tabla.insertRow(row_idx)
-                fecha_hora = fila[0]
-                try:
-                    dt = datetime.strptime(fecha_hora, "%Y-%m-%d %H:%M:%S")
-                    fecha_str = dt.strftime("%d/%m/%Y")
-                    hora_str = dt.strftime("%H:%M")
-                except:
-                    fecha_str, hora_str = fecha_hora, ""
-
-                self.tabla.setItem(row_idx, 0, QTableWidgetItem(fecha_str))
-                self.tabla.setItem(row_idx, 1, QTableWidgetItem(hora_str))
-                self.tabla.setItem(row_idx, 2, QTableWidgetItem(fila[1]))
-                self.tabla.setItem(row_idx, 3, QTableWidgetItem(fila[2]))
-                item_evento = QTableWidgetItem(fila[3])
-                if "Rechazado" in fila[3] or "Vencido" in fila[3]:
-                    item_evento.setForeground(Qt.GlobalColor.red)
-                elif "Ingreso" in fila[3]:
-                    item_evento.setForeground(Qt.GlobalColor.darkGreen)
-                self.tabla.setItem(row_idx, 4, item_evento)
-            conn.close()
+        # Lo último del monitor puede estar todavía en el lote diferido
+        self.db.historial.vaciar()
+        self.timer_socio.stop()
+        desde = hasta = None
+        if self.check_fechas.isChecked():
+            desde = self.fecha_desde.date().toString("yyyy-MM-dd")
+            hasta = self.fecha_hasta.date().toString("yyyy-MM-dd")
+        tipo = None
+        if self.combo_tipo.currentIndex() > 0:
+            tipo = self.combo_tipo.currentText()
+        self.modelo.reiniciar(
+            desde=desde, hasta=hasta, socio=self.input_socio.text(), tipo=tipo
+        )
+        self.tabla.scrollToTop()
 
 
 # --- CLASE TARJETA DATO ---
@@ -119,6 +219,8 @@ class DashboardWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.db = Database()
+        self.metricas = ServicioMetricas.obtener(self.db)
+        self._mostradas = None
         layout = QVBoxLayout()
         layout.setContentsMargins(40, 40, 40, 40)
         lbl_bienvenida = QLabel("Resumen del Gimnasio")
@@ -135,45 +237,37 @@ class DashboardWidget(QWidget):
         self.actualizar_metricas()
 
     def actualizar_metricas(self):
+        metricas = self.metricas.metricas()
+        if metricas is self._mostradas:
+            return  # la base no cambió desde la última vez
+        self._mostradas = metricas
+
         while self.grid.count():
             item = self.grid.takeAt(0)
             if item.widget():
                 item.widget().deleteLater()
 
-        conn = self.db.conectar()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM miembros WHERE activo = 1")
-            activos = cursor.fetchone()[0]
-            hoy = datetime.now().strftime("%Y-%m-%d")
-            cursor.execute(
-                "SELECT COUNT(*) FROM miembros WHERE activo = 1 AND fecha_vencimiento < ?",
-                (hoy,),
-            )
-            vencidos = cursor.fetchone()[0]
-            cursor.execute(
-                "SELECT SUM(p.precio) FROM miembros m JOIN planes p ON m.plan_id = p.id WHERE m.activo = 1"
-            )
-            res = cursor.fetchone()[0]
-            caja = res if res else 0
-            conn.close()
-            self.grid.addWidget(TarjetaDato("Socios Activos", activos, "#2980b9"), 0, 0)
-            self.grid.addWidget(
-                TarjetaDato("Cuotas Vencidas", vencidos, "#c0392b"), 0, 1
-            )
-            txt_caja = f"${caja:,.0f}".replace(",", ".")
-            card_caja = TarjetaDato("Caja Mensual Est.", txt_caja, "#27ae60")
-            card_caja.setFixedWidth(420)
-            self.grid.addWidget(card_caja, 1, 0, 1, 2)
+        activos = metricas["activos"]
+        vencidos = metricas["vencidos"]
+        caja = metricas["ingreso_estimado"]
+        self.grid.addWidget(TarjetaDato("Socios Activos", activos, "#2980b9"), 0, 0)
+        self.grid.addWidget(
+            TarjetaDato("Cuotas Vencidas", vencidos, "#c0392b"), 0, 1
+        )
+        txt_caja = f"${caja:,.0f}".replace(",", ".")
+        card_caja = TarjetaDato("Caja Mensual Est.", txt_caja, "#27ae60")
+        card_caja.setFixedWidth(420)
+        self.grid.addWidget(card_caja, 1, 0, 1, 2)
 
 
 class PanelAdmin(QMainWindow):
-    def __init__(self):
+    def __init__(self, tiempos_previos=None):
         super().__init__()
         self.setWindowTitle("Panel de Administración - MTZ")
         self.setGeometry(100, 100, 1100, 700)
         self.setStyleSheet("background-color: #f0f0f0;")
         self.ventana_monitor = None
+        self.tiempos_arranque = dict(tiempos_previos or {})
 
         widget_central = QWidget()
         layout_principal = QHBoxLayout()
@@ -243,31 +337,67 @@ class PanelAdmin(QMainWindow):
         barra_lateral.setLayout(layout_menu)
 
         # --- STACK ---
+        # Cada página se construye la primera vez que se la visita
         self.stack = QStackedWidget()
-        self.pagina_inicio = DashboardWidget()
-        self.pagina_registro = VentanaRegistro()
-        self.pagina_gestion = VentanaGestion()
-        self.pagina_historial = VentanaHistorial()
-
-        self.stack.addWidget(self.pagina_inicio)  # 0
-        self.stack.addWidget(self.pagina_registro)  # 1
-        self.stack.addWidget(self.pagina_gestion)  # 2
-        self.stack.addWidget(self.pagina_historial)  # 3
+        self.paginas = {}
+        for _ in range(4):
+            self.stack.addWidget(QWidget())
 
         layout_principal.addWidget(barra_lateral)
         layout_principal.addWidget(self.stack)
         layout_principal.setContentsMargins(0, 0, 0, 0)
         widget_central.setLayout(layout_principal)
         self.setCentralWidget(widget_central)
+        self.marcar_tiempo("ventana")
+
+    def marcar_tiempo(self, etapa):
+        self.tiempos_arranque[etapa] = (time.perf_counter() - _INICIO_PROCESO) * 1000
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if "primer_pintado" not in self.tiempos_arranque:
+            self.marcar_tiempo("primer_pintado")
+            if MOSTRAR_TIEMPOS:
+                print("Arranque (ms desde el inicio): " + ", ".join(
+                    f"{etapa} {ms:.0f}" for etapa, ms in self.tiempos_arranque.items()
+                ))
+            # El Dashboard se arma después de mostrar la ventana
+            QTimer.singleShot(0, lambda: self.cambiar_pagina(0))
+
+    def crear_pagina(self, indice):
+        inicio = time.perf_counter()
+        if indice == 0:
+            pagina = DashboardWidget()
+        elif indice == 1:
+            from registro import VentanaRegistro
+            pagina = VentanaRegistro()
+        elif indice == 2:
+            from gestion import VentanaGestion
+            pagina = VentanaGestion()
+        else:
+            pagina = VentanaHistorial()
+        vieja = self.stack.widget(indice)
+        self.stack.insertWidget(indice, pagina)
+        self.stack.removeWidget(vieja)
+        vieja.deleteLater()
+        self.paginas[indice] = pagina
+        if MOSTRAR_TIEMPOS:
+            print(f"Página {indice} construida en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return pagina
 
     def cambiar_pagina(self, indice):
+        pagina = self.paginas.get(indice)
+        if pagina is None:
+            # Recién construida: ya cargó sus datos en el constructor
+            self.stack.setCurrentWidget(self.crear_pagina(indice))
+            return
         self.stack.setCurrentIndex(indice)
         if indice == 0:
-            self.pagina_inicio.actualizar_metricas()
+            pagina.actualizar_metricas()
         elif indice == 2:
-            self.pagina_gestion.cargar_socios()
+            pagina.cargar_socios()
         elif indice == 3:
-            self.pagina_historial.cargar_historial()
+            pagina.cargar_historial()
 
     def estilo_boton(self):
         return """
@@ -279,15 +409,21 @@ class PanelAdmin(QMainWindow):
         """
 
     def abrir_reportes(self):
+        from reportes import VentanaReportes
+
         dialogo = VentanaReportes()
         dialogo.exec()
 
     def abrir_herramientas(self):
+        from herramientas import VentanaHerramientas
+
         dialogo = VentanaHerramientas()
         dialogo.exec()
 
     def abrir_monitor(self):
         if self.ventana_monitor is None:
+            from monitor import VentanaPrincipal as VentanaMonitor
+
             self.ventana_monitor = VentanaMonitor()
         pantallas = QApplication.screens()
         if len(pantallas) > 1:
@@ -300,11 +436,14 @@ class PanelAdmin(QMainWindow):
 
 
 if __name__ == "__main__":
+    tiempos = {"imports": (time.perf_counter() - _INICIO_PROCESO) * 1000}
     app = QApplication(sys.argv)
+    tiempos["qapplication"] = (time.perf_counter() - _INICIO_PROCESO) * 1000
 
     db = Database()
     db.crear_tablas()
+    tiempos["base"] = (time.perf_counter() - _INICIO_PROCESO) * 1000
 
-    ventana = PanelAdmin()
+    ventana = PanelAdmin(tiempos)
     ventana.show()
     sys.exit(app.exec())
@@ -0,0 +1,169 @@
+"""Archivo anual de historial_acceso.
+
+La base principal guarda solo los últimos MESES_RETENCION meses de historial; los
+meses cerrados más viejos se mueven a un archivo SQLite por año
+(<base>-historial/historial-AAAA.db). Database.pagina_historial los adjunta (ATTACH)
+solo cuando una consulta llega a esas fechas.
+
+Sin interfaz:
+    python archivo_historial.py [--meses 12]
+"""
+import glob
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from perfil_sql import conectar_instrumentada
+from escritor_db import EjecutorEscrituras
+from instancias import UnaPorBase
+from entorno import numero_env
+
+ESQUEMA_ARCHIVO = (
+    '''CREATE TABLE IF NOT EXISTS {e}.historial_acceso (
+        id INTEGER PRIMARY KEY,  -- mismo id que tenía en la base principal
+        miembro_id INTEGER,
+        fecha_hora DATETIME,
+        tipo_acceso TEXT
+    )''',
+    "CREATE INDEX IF NOT EXISTS {e}.idx_historial_fecha ON historial_acceso (fecha_hora)",
+    "CREATE INDEX IF NOT EXISTS {e}.idx_historial_miembro_fecha ON historial_acceso (miembro_id, fecha_hora)",
+    "CREATE INDEX IF NOT EXISTS {e}.idx_historial_tipo_fecha ON historial_acceso (tipo_acceso, fecha_hora)",
+)
+MAX_ADJUNTOS = 8  # SQLite admite 10 bases adjuntas por conexión
+
+
+def _corte_retencion(meses, hoy=None):
+    """Primer día del mes más viejo que se conserva en la base principal"""
+    hoy = hoy or datetime.now()
+    total = hoy.year * 12 + (hoy.month - 1) - meses
+    return f"{total // 12:04d}-{total % 12 + 1:02d}-01"
+
+
+class ArchivoHistorial(UnaPorBase):
+    """Mueve meses cerrados de historial_acceso a archivos por año y los adjunta a pedido.
+
+    archivar() trabaja por lotes chicos: cada lote se copia al archivo en una
+    transacción y recién después se borra de la base principal en otra, así una
+    caída en el medio nunca pierde filas (la copia es INSERT OR IGNORE por id, y
+    repetir el lote no duplica nada). El borrado pasa por el hilo escritor del
+    proceso (EjecutorEscrituras) y entre lote y lote se suelta el lock de escritura
+    para que los kioscos sigan registrando ingresos."""
+
+    MESES_RETENCION = numero_env("MTZ_MESES_HISTORIAL", 12)
+    LOTE = 2000
+    PAUSA_S = 0.02
+
+    def __init__(self, gestor):
+        self.gestor = gestor
+        self.directorio = gestor.db_path + "-historial"
+        self.meses = self.MESES_RETENCION
+
+    def ruta(self, anio):
+        return os.path.join(self.directorio, f"historial-{anio}.db")
+
+    def anios(self):
+        """Años con archivo, del más nuevo al más viejo"""
+        anios = []
+        for ruta in glob.glob(os.path.join(self.directorio, "historial-*.db")):
+            encontrado = re.fullmatch(r"historial-(\d{4})\.db", os.path.basename(ruta))
+            if encontrado:
+                anios.append(int(encontrado.group(1)))
+        return sorted(anios, reverse=True)
+
+    def adjuntar(self, conn, anio):
+        """Adjunta el archivo del año a la conexión (fuera de transacción) y devuelve el esquema"""
+        esquema = f"historial_{anio}"
+        adjuntos = {fila[1] for fila in conn.execute("PRAGMA database_list")}
+        if esquema in adjuntos:
+            return esquema
+        viejos = sorted(a for a in adjuntos if a.startswith("historial_"))
+        if len(viejos) >= MAX_ADJUNTOS:
+            conn.execute(f"DETACH DATABASE {viejos[0]}")
+        conn.execute(f"ATTACH DATABASE ? AS {esquema}", (self.ruta(anio),))
+        return esquema
+
+    def _abrir_archivo(self, conn, anio):
+        os.makedirs(self.directorio, exist_ok=True)
+        esquema = self.adjuntar(conn, anio)
+        for sentencia in ESQUEMA_ARCHIVO:
+            conn.execute(sentencia.format(e=esquema))
+        return esquema
+
+    def _borrar_de_principal(self, ids):
+        with self.gestor.transaccion(inmediata=True) as cursor:
+            cursor.executemany("DELETE FROM historial_acceso WHERE id = ?", ids)
+
+    def archivar(self, meses=None, progreso=None, cancelado=None):
+        """Mueve al archivo todo lo anterior al corte de retención. Devuelve las filas movidas.
+
+        Nunca mueve accesos que todavía no resumió Database.actualizar_asistencia
+        (id mayor a la marca de agua): correrla antes para archivar todo."""
+        corte = _corte_retencion(self.meses if meses is None else meses)
+        # Conexión propia: los ATTACH no afectan a las del resto del programa
+        conn = conectar_instrumentada(
+            self.gestor.db_path, self.gestor.perfil, timeout=self.gestor.TIMEOUT, isolation_level=None
+        )
+        movidas = 0
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Solo lo que ya está en asistencia_horaria: lo archivado no se vuelve a resumir
+            resumido = conn.execute(
+                "SELECT ultimo_id FROM resumen_procesado WHERE nombre = 'asistencia'"
+            ).fetchone()[0]
+            total = conn.execute(
+                "SELECT COUNT(*) FROM historial_acceso WHERE fecha_hora < ? AND id <= ?", (corte, resumido)
+            ).fetchone()[0]
+            while not (cancelado and cancelado()):
+                primera = conn.execute(
+                    "SELECT fecha_hora FROM historial_acceso WHERE fecha_hora < ? AND id <= ? "
+                    "ORDER BY fecha_hora LIMIT 1",
+                    (corte, resumido),
+                ).fetchone()
+                if primera is None:
+                    break
+                anio = int(primera[0][:4])
+                esquema = self._abrir_archivo(conn, anio)
+                hasta = min(corte, f"{anio + 1}-01-01")
+                filas = conn.execute(
+                    "SELECT id, miembro_id, fecha_hora, tipo_acceso FROM historial_acceso "
+                    "WHERE fecha_hora < ? AND id <= ? ORDER BY fecha_hora, id LIMIT ?",
+                    (hasta, resumido, self.LOTE),
+                ).fetchall()
+
+                # 1) copia al archivo, 2) borrado en la principal: nunca al revés
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(f"INSERT OR IGNORE INTO {esquema}.historial_acceso VALUES (?, ?, ?, ?)", filas)
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                # El borrado en la base principal lo hace el hilo escritor del proceso
+                EjecutorEscrituras.obtener(self.gestor).ejecutar(
+                    self._borrar_de_principal, [(f[0],) for f in filas], agrupar=False
+                )
+
+                movidas += len(filas)
+                if progreso:
+                    progreso(movidas, total)
+                time.sleep(self.PAUSA_S)
+        finally:
+            conn.close()
+        return movidas
+
+
+if __name__ == "__main__":
+    from database import Database
+    meses = None
+    if len(sys.argv) == 3 and sys.argv[1] == "--meses":
+        meses = int(sys.argv[2])
+    elif len(sys.argv) != 1:
+        print("Uso: python archivo_historial.py [--meses 12]")
+        sys.exit(1)
+    db = Database()
+    db.crear_tablas()
+    db.historial.vaciar()
+    db.actualizar_asistencia()
+    movidas = db.archivo.archivar(meses)
+    print(f"{movidas} accesos archivados en {db.archivo.directorio}")
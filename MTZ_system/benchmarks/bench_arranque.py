@@ -0,0 +1,75 @@
+"""Arranque del panel de administración: ms desde el inicio del proceso hasta cada etapa.
+
+Copia el programa a una carpeta temporal con una base sintética (admin.py abre la
+base de su carpeta) y lo corre varias veces sin pantalla con MTZ_TIEMPOS_ARRANQUE=1.
+La primera corrida compila los .pyc y no se cuenta. Informa la mediana de cada etapa.
+
+Uso (desde MTZ_system/):
+    python -m benchmarks.bench_arranque --socios 50000 --corridas 7
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.generador import generar
+
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preparar(socios, anios):
+    destino = os.path.join(tempfile.mkdtemp(prefix="bench_mtz_arranque_"), "MTZ_system")
+    shutil.copytree(DIRECTORIO, destino, ignore=shutil.ignore_patterns(
+        "__pycache__", "*.db", "*.db-*", "kiosco_local", "cache_fondo", "benchmarks"))
+    generar(os.path.join(destino, "gym_mtz.db"), socios, anios)
+    return destino
+
+
+def correr(directorio):
+    """Una corrida de admin.py; devuelve {etapa: ms} hasta que el Dashboard quedó armado"""
+    entorno = dict(os.environ, QT_QPA_PLATFORM="offscreen", MTZ_TIEMPOS_ARRANQUE="1")
+    proceso = subprocess.Popen(
+        [sys.executable, "admin.py"], cwd=directorio, env=entorno,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    tiempos = {}
+    try:
+        for linea in proceso.stdout:
+            if linea.startswith("Arranque"):
+                for etapa, ms in re.findall(r"(\w+) (\d+)", linea.split(":", 1)[1]):
+                    tiempos[etapa] = float(ms)
+            elif linea.startswith("Página 0 construida"):
+                tiempos["dashboard"] = float(re.search(r"(\d+) ms", linea).group(1))
+                break
+    finally:
+        proceso.kill()
+        proceso.wait()
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socios", type=int, default=50000)
+    parser.add_argument("--anios", type=float, default=1)
+    parser.add_argument("--corridas", type=int, default=7)
+    args = parser.parse_args()
+
+    directorio = preparar(args.socios, args.anios)
+    correr(directorio)
+    corridas = [correr(directorio) for _ in range(args.corridas)]
+    print(f"Socios: {args.socios}  Corridas: {args.corridas}  (mediana, ms desde el inicio del proceso)")
+    for etapa in corridas[0]:
+        valores = [c[etapa] for c in corridas if etapa in c]
+        if etapa == "dashboard":
+            print(f"  {'dashboard':<15} {statistics.median(valores):6.0f}  (construcción, después del primer pintado)")
+        else:
+            print(f"  {etapa:<15} {statistics.median(valores):6.0f}")
+    shutil.rmtree(os.path.dirname(directorio), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
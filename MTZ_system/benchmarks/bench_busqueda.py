@@ -0,0 +1,73 @@
+"""Latencia de la búsqueda de socios (FTS5 con prefijos) contra el LIKE anterior.
+
+Uso (desde MTZ_system/):
+    python -m benchmarks.bench_busqueda --socios 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import Database
+TAM_PAGINA = 200  # igual que gestion.TAM_PAGINA (sin importar Qt)
+from benchmarks.generador import poblar, NOMBRES, APELLIDOS
+
+SQL_LIKE = """
+    SELECT m.id, m.nombre, m.apellido, m.dni, p.nombre, m.ingresos_restantes
+    FROM miembros m
+    LEFT JOIN planes p ON m.plan_id = p.id
+    WHERE m.activo = 1 AND (m.nombre LIKE ? OR m.apellido LIKE ? OR m.dni LIKE ?)
+    ORDER BY m.id DESC
+"""
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socios", type=int, default=100000)
+    parser.add_argument("--consultas", type=int, default=300)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(prefix="bench_mtz_"), "gym_mtz.db"))
+    db.crear_tablas()
+    poblar(db, args.socios)
+
+    rnd = random.Random(3)
+    # Lo que se va tipeando: prefijos de nombres, apellidos y DNIs
+    filtros = []
+    for _ in range(args.consultas):
+        i = rnd.randrange(args.socios)
+        texto = rnd.choice([rnd.choice(NOMBRES), rnd.choice(APELLIDOS), str(20000000 + i)])
+        filtros.append(texto[:rnd.randint(2, len(texto))])
+
+    def medir(funcion):
+        tiempos = []
+        for filtro in filtros:
+            inicio = time.perf_counter()
+            funcion(filtro)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    def con_like(filtro):
+        param = f"%{filtro}%"
+        with db.transaccion() as cursor:
+            cursor.execute(SQL_LIKE, (param, param, param))
+            return cursor.fetchall()
+
+    for nombre, funcion in [
+        ("LIKE (antes)", con_like),
+        ("FTS5 (ahora)", lambda f: db.pagina_socios(f, TAM_PAGINA)),
+    ]:
+        tiempos = medir(funcion)
+        print(f"{nombre:14s} p50 {statistics.median(tiempos):7.2f} ms   "
+              f"p95 {percentil(tiempos, 0.95):7.2f} ms   máx {max(tiempos):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
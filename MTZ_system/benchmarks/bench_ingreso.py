@@ -0,0 +1,107 @@
+"""Check-ins por segundo de registrar_ingreso: versión anterior vs. motor atómico actual.
+
+Uso (desde MTZ_system/):
+    python -m benchmarks.bench_ingreso --socios 50000 --scans 5000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from database import Database
+from benchmarks.generador import poblar
+
+
+def registrar_ingreso_anterior(db_path, dni):
+    """Copia del camino anterior: conexión nueva por llamada, SELECT + UPDATE + INSERT"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT m.id, m.nombre, m.apellido, p.nombre, m.ingresos_restantes, m.fecha_vencimiento
+            FROM miembros m
+            LEFT JOIN planes p ON m.plan_id = p.id
+            WHERE m.dni = ? AND m.activo = 1
+        ''', (dni,))
+        resultado = cursor.fetchone()
+        ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if not resultado:
+            return None
+        m_id, _, _, _, ingresos, fecha_venc = resultado
+        hoy_str = datetime.now().strftime('%Y-%m-%d')
+        es_vencido = bool(fecha_venc and hoy_str >= fecha_venc)
+        if ingresos > 0 and not es_vencido:
+            cursor.execute("UPDATE miembros SET ingresos_restantes = ingresos_restantes - 1 WHERE id = ?", (m_id,))
+            cursor.execute("INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, 'Ingreso')", (m_id, ahora))
+            conn.commit()
+            return True
+        motivo = "Vencido" if es_vencido else "Sin Pases"
+        cursor.execute("INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)", (m_id, ahora, motivo))
+        conn.commit()
+        return False
+    finally:
+        conn.close()
+
+
+def medir(funcion, dnis):
+    inicio = time.perf_counter()
+    for dni in dnis:
+        funcion(dni)
+    return len(dnis) / (time.perf_counter() - inicio)
+
+
+def carrera_ultimo_pase(funcion, db, kioscos=8):
+    """Varios kioscos escanean a la vez a un socio con un solo pase; devuelve cuántos entraron"""
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE miembros SET ingresos_restantes = 1, fecha_vencimiento = '2999-01-01' WHERE dni = '20000000'")
+    barrera = threading.Barrier(kioscos)
+    entradas = []
+
+    def kiosco():
+        barrera.wait()
+        resultado = funcion("20000000")
+        entradas.append(resultado is True or (isinstance(resultado, dict) and resultado["acceso"]))
+
+    hilos = [threading.Thread(target=kiosco) for _ in range(kioscos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return sum(entradas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socios", type=int, default=50000)
+    parser.add_argument("--scans", type=int, default=5000)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_mtz_")
+    db = Database(os.path.join(directorio, "gym_mtz.db"))
+    db.crear_tablas()
+    poblar(db, args.socios)
+    # Sin anti-repetidos: se mide el camino completo contra SQLite
+    db.escaneos.configurar(ventana=0)
+
+    rnd = random.Random(7)
+    dnis = [str(20000000 + rnd.randrange(args.socios)) for _ in range(args.scans)]
+
+    antes = medir(lambda dni: registrar_ingreso_anterior(db.db_path, dni), dnis)
+    despues = medir(db.registrar_ingreso, dnis)
+    print(f"Socios: {args.socios}  Scans: {args.scans}")
+    print(f"Antes:   {antes:8.1f} check-ins/s")
+    print(f"Después: {despues:8.1f} check-ins/s  (x{despues / antes:.1f})")
+
+    # Con sqlite3 el lock de escritura se pide recién en el UPDATE, por eso la versión
+    # anterior puede dejar pasar a más de uno con el mismo último pase.
+    print(f"Último pase, 8 kioscos - antes: {carrera_ultimo_pase(lambda d: registrar_ingreso_anterior(db.db_path, d), db)} ingresos")
+    print(f"Último pase, 8 kioscos - después: {carrera_ultimo_pase(db.registrar_ingreso, db)} ingresos")
+
+
+if __name__ == "__main__":
+    main()
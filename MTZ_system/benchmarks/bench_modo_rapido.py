@@ -0,0 +1,71 @@
+"""Throughput sostenido del monitor en modo rápido, simulando un lector de DNI tipo teclado.
+
+El lector "tipea" cada DNI y presiona Enter; se mide cuántos escaneos por segundo
+quedan resueltos en la lista. Corre sin pantalla (plataforma Qt offscreen).
+Con --ms-por-tecla el ritmo lo pone el lector; con --ms-por-tecla 0 se mide cuánto
+aguanta el monitor escaneando sin pausa.
+
+Uso (desde MTZ_system/):
+    python -m benchmarks.bench_modo_rapido --socios 50000 --scans 300
+    python -m benchmarks.bench_modo_rapido --socios 50000 --scans 300 --ms-por-tecla 0
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt
+from PyQt6.QtTest import QTest
+
+from database import Database
+from monitor import VentanaPrincipal
+from benchmarks.generador import poblar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socios", type=int, default=50000)
+    parser.add_argument("--scans", type=int, default=300)
+    parser.add_argument("--ms-por-tecla", type=int, default=2,
+                        help="demora entre teclas del lector (los lectores USB rondan 1-5 ms)")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+
+    directorio = tempfile.mkdtemp(prefix="bench_mtz_")
+    db = Database(os.path.join(directorio, "gym_mtz.db"))
+    db.crear_tablas()
+    poblar(db, args.socios)
+
+    ventana = VentanaPrincipal(modo_rapido=True, db=db)
+    ventana.show()
+    # Ritmo sostenido: sin contar la carga inicial de la foto local del kiosco
+    ventana.pool.waitForDone()
+
+    rnd = random.Random(11)
+    dnis = [str(20000000 + rnd.randrange(args.socios)) for _ in range(args.scans)]
+
+    inicio = time.perf_counter()
+    for dni in dnis:
+        QTest.keyClicks(ventana.input_dni, dni, delay=args.ms_por_tecla)
+        QTest.keyClick(ventana.input_dni, Qt.Key.Key_Return)
+        app.processEvents()
+    while ventana.tareas:
+        app.processEvents()
+    duracion = time.perf_counter() - inicio
+
+    print(f"Escaneos: {args.scans}  Demora del lector: {args.ms_por_tecla} ms/tecla  Duración: {duracion:.2f}s")
+    print(f"Throughput sostenido: {args.scans / duracion:.1f} check-ins/s")
+    print(f"Entradas visibles en la lista: {ventana.lista_rapida.count()}")
+    latencia = ventana.estadisticas_latencia()
+    if latencia:
+        print(f"Escaneo -> pantalla: p50 {latencia['p50_ms']:.1f} ms  p95 {latencia['p95_ms']:.1f} ms  máx {latencia['max_ms']:.1f} ms")
+    ventana.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Varios kioscos simulados contra la misma base: cada uno con su conexión SQLite vs. servicio de ingresos.
+
+Uso (desde MTZ_system/):
+    python -m benchmarks.bench_servicio --kioscos 8 --scans 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from database import Database
+from servicio_ingresos import ClienteIngresos, ServicioIngresos
+from benchmarks.generador import DNI_BASE, poblar
+
+
+def correr_kioscos(kioscos, dnis_por_kiosco, crear_registrador):
+    """Cada kiosco en su hilo escanea su lista; devuelve (segundos, latencias ms, errores)"""
+    barrera = threading.Barrier(kioscos)
+    latencias = []
+    errores = []
+    lock = threading.Lock()
+
+    def kiosco(dnis):
+        registrar = crear_registrador()
+        propias = []
+        fallidos = 0
+        barrera.wait()
+        for dni in dnis:
+            inicio = time.perf_counter()
+            try:
+                resultado = registrar(dni)
+                if resultado is None or resultado.get("error"):
+                    fallidos += 1
+            except (OSError, sqlite3.Error):
+                fallidos += 1
+            propias.append((time.perf_counter() - inicio) * 1000)
+        with lock:
+            latencias.extend(propias)
+            errores.append(fallidos)
+
+    hilos = [threading.Thread(target=kiosco, args=(dnis,)) for dnis in dnis_por_kiosco]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return time.perf_counter() - inicio, sorted(latencias), sum(errores)
+
+
+def percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p))]
+
+
+def informar(nombre, total, segundos, latencias, errores):
+    print(f"{nombre:<10} {total / segundos:8.1f} check-ins/s  "
+          f"p50 {percentil(latencias, 0.5):6.2f} ms  p99 {percentil(latencias, 0.99):7.2f} ms  "
+          f"fallidos {errores}")
+
+
+def iniciar_servicio(db_path):
+    """Levanta el servicio en un hilo con su propio loop (puerto libre)"""
+    listo = threading.Event()
+    estado = {}
+
+    def correr():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        servicio = ServicioIngresos(Database(db_path), "127.0.0.1", 0)
+        loop.run_until_complete(servicio.iniciar())
+        estado.update(loop=loop, servicio=servicio)
+        listo.set()
+        loop.run_forever()
+        loop.run_until_complete(servicio.detener())
+        loop.close()
+
+    hilo = threading.Thread(target=correr, daemon=True)
+    hilo.start()
+    listo.wait()
+    return estado["servicio"], estado["loop"], hilo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socios", type=int, default=20000)
+    parser.add_argument("--kioscos", type=int, default=8)
+    parser.add_argument("--scans", type=int, default=500, help="escaneos por kiosco")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="bench_mtz_")
+    db_path = os.path.join(directorio, "gym_mtz.db")
+    db = Database(db_path)
+    db.crear_tablas()
+    poblar(db, args.socios)
+    # Sin anti-repetidos: cada escaneo llega a SQLite
+    db.escaneos.configurar(ventana=0)
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE miembros SET ingresos_restantes = 1000000, fecha_vencimiento = '2999-01-01'")
+
+    rnd = random.Random(11)
+    dnis = [[str(DNI_BASE + rnd.randrange(args.socios)) for _ in range(args.scans)] for _ in range(args.kioscos)]
+    total = args.kioscos * args.scans
+    print(f"Socios: {args.socios}  Kioscos: {args.kioscos}  Scans por kiosco: {args.scans}")
+
+    # Antes: cada kiosco abre la base por su cuenta (un Database por hilo)
+    segundos, latencias, errores = correr_kioscos(
+        args.kioscos, dnis, lambda: Database(db_path).registrar_ingreso)
+    informar("Directo", total, segundos, latencias, errores)
+
+    servicio, loop, hilo = iniciar_servicio(db_path)
+    clientes = []
+
+    def crear_cliente():
+        cliente = ClienteIngresos("127.0.0.1", servicio.puerto)
+        clientes.append(cliente)
+        return cliente.registrar_ingreso
+
+    segundos, latencias, errores = correr_kioscos(args.kioscos, dnis, crear_cliente)
+    informar("Servicio", total, segundos, latencias, errores)
+    print(f"Lotes confirmados: {servicio.lotes}  (promedio {servicio.pedidos / max(1, servicio.lotes):.1f} escaneos por commit)")
+
+    for cliente in clientes:
+        cliente.cerrar()
+    loop.call_soon_threadsafe(loop.stop)
+    hilo.join()
+    db.historial.vaciar()
+
+    # Todos los descuentos quedaron: 1000000 * socios menos lo escaneado dos veces (directo + servicio)
+    with db.transaccion() as cursor:
+        cursor.execute("SELECT SUM(1000000 - ingresos_restantes) FROM miembros")
+        descontados = cursor.fetchone()[0]
+    print(f"Pases descontados: {descontados} de {2 * total} escaneos")
+
+
+if __name__ == "__main__":
+    main()
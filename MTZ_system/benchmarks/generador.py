@@ -0,0 +1,129 @@
+"""Generador determinista de datos de prueba: socios repartidos en los planes de
+inicializar_planes y años de historial_acceso. Misma semilla, misma base.
+
+Uso (desde MTZ_system/):
+    python -m benchmarks.generador --socios 50000 --anios 2 --destino /tmp/gym_mtz.db
+"""
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+from database import Database
+
+
+NOMBRES = [
+    "Juan", "María", "José", "Ana", "Carlos", "Lucía", "Martín", "Sofía", "Diego", "Valentina",
+    "Lucas", "Camila", "Mateo", "Julieta", "Santiago", "Florencia", "Nicolás", "Agustina",
+    "Facundo", "Micaela", "Tomás", "Milagros", "Franco", "Rocío", "Gonzalo", "Paula",
+]
+APELLIDOS = [
+    "González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez",
+    "García", "Sánchez", "Romero", "Sosa", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores",
+    "Acosta", "Benítez", "Medina", "Suárez", "Herrera", "Aguirre", "Pereyra", "Gutiérrez",
+    "Giménez", "Molina", "Silva", "Castro", "Rojas", "Ortiz", "Núñez", "Luna", "Juárez",
+]
+DNI_BASE = 20000000
+
+# Hora de entrada: pico a la mañana temprano y a la tarde-noche
+PESOS_HORA = {7: 6, 8: 8, 9: 6, 10: 4, 11: 3, 12: 3, 13: 2, 14: 2, 15: 3, 16: 4,
+              17: 7, 18: 10, 19: 10, 20: 8, 21: 5, 22: 2}
+RECHAZOS = [("Ingreso", 92), ("Vencido", 5), ("Sin Pases", 3)]
+LOTE_INSERCION = 20000
+
+
+def poblar(db, socios, semilla=42):
+    """Carga `socios` miembros con pases y vencimientos variados (DNI 20000000 + i)"""
+    rnd = random.Random(semilla)
+    hoy = datetime.now()
+    with db.transaccion() as cursor:
+        cursor.execute("SELECT id FROM planes ORDER BY id")
+        planes = [fila[0] for fila in cursor.fetchall()]
+        filas = []
+        for i in range(socios):
+            venc = hoy + timedelta(days=rnd.randint(-10, 30))
+            filas.append((
+                rnd.choice(NOMBRES), rnd.choice(APELLIDOS), str(DNI_BASE + i), rnd.choice(planes),
+                rnd.randint(0, 30), venc.strftime('%Y-%m-%d'),
+            ))
+        cursor.executemany('''
+            INSERT INTO miembros (nombre, apellido, dni, plan_id, ingresos_restantes, ultimo_pago, fecha_vencimiento)
+            VALUES (?, ?, ?, ?, ?, DATE('now'), ?)
+        ''', filas)
+
+
+def _accesos(socios, anios, por_dia, rnd):
+    horas = list(PESOS_HORA)
+    pesos_hora = list(PESOS_HORA.values())
+    tipos = [t for t, _ in RECHAZOS]
+    pesos_tipo = [p for _, p in RECHAZOS]
+    dia = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=int(365 * anios))
+    hoy = datetime.now()
+    while dia < hoy:
+        # Domingos más tranquilos
+        cantidad = max(1, int(rnd.gauss(por_dia * (0.4 if dia.weekday() == 6 else 1), por_dia * 0.1)))
+        marcas = sorted(
+            dia + timedelta(hours=rnd.choices(horas, pesos_hora)[0], seconds=rnd.randrange(3600))
+            for _ in range(cantidad)
+        )
+        for marca in marcas:
+            if marca > hoy:
+                break
+            yield (rnd.randint(1, socios), marca.strftime('%Y-%m-%d %H:%M:%S'), rnd.choices(tipos, pesos_tipo)[0])
+        dia += timedelta(days=1)
+
+
+def poblar_historial(db, socios, anios, por_dia=150, semilla=42):
+    """Carga `anios` de historial_acceso en orden cronológico. Devuelve la cantidad de filas."""
+    rnd = random.Random(semilla)
+    total = 0
+    lote = []
+    for fila in _accesos(socios, anios, por_dia, rnd):
+        lote.append(fila)
+        if len(lote) >= LOTE_INSERCION:
+            total += _insertar_historial(db, lote)
+            lote = []
+    if lote:
+        total += _insertar_historial(db, lote)
+    return total
+
+
+def _insertar_historial(db, filas):
+    with db.transaccion() as cursor:
+        cursor.executemany(
+            "INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)", filas
+        )
+    return len(filas)
+
+
+def generar(destino, socios, anios, por_dia=150, semilla=42):
+    """Crea una base nueva en `destino` (no debe existir) y devuelve su Database"""
+    if os.path.exists(destino):
+        raise FileExistsError(destino)
+    db = Database(os.path.abspath(destino))
+    db.crear_tablas()
+    poblar(db, socios, semilla)
+    poblar_historial(db, socios, anios, por_dia, semilla)
+    # Estadísticas del planificador como en una base con uso real
+    with db.transaccion() as cursor:
+        cursor.execute("ANALYZE")
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socios", type=int, default=50000)
+    parser.add_argument("--anios", type=float, default=2)
+    parser.add_argument("--por-dia", type=int, default=150, help="accesos promedio por día")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--destino", required=True)
+    args = parser.parse_args()
+    db = generar(args.destino, args.socios, args.anios, args.por_dia, args.semilla)
+    with db.transaccion() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM historial_acceso")
+        accesos = cursor.fetchone()[0]
+    print(f"{args.destino}: {args.socios} socios, {accesos} accesos")
+
+
+if __name__ == "__main__":
+    main()
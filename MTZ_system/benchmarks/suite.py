@@ -0,0 +1,221 @@
+"""Suite de benchmarks sin pantalla: genera (o reutiliza) una base sintética y mide
+cada escenario. Imprime JSON con p50/p95/p99 en ms para comparar versiones.
+
+Uso (desde MTZ_system/):
+    python -m benchmarks.suite --socios 50000 --anios 2 --salida resultados.json
+    python -m benchmarks.suite --db /tmp/gym_mtz.db --escenarios ingreso busqueda monitor_qt
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+
+# Los escenarios con widgets corren en la plataforma offscreen de Qt
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from database import Database
+from exportacion import exportar_socios
+from respaldo import crear_respaldo
+from benchmarks.generador import generar, NOMBRES, APELLIDOS, DNI_BASE
+
+TAM_PAGINA = 200  # igual que gestion.TAM_PAGINA
+TAM_PAGINA_HISTORIAL = 200  # igual que admin.TAM_PAGINA_HISTORIAL
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resumen(tiempos):
+    return {
+        "n": len(tiempos),
+        "p50_ms": round(percentil(tiempos, 0.50), 3),
+        "p95_ms": round(percentil(tiempos, 0.95), 3),
+        "p99_ms": round(percentil(tiempos, 0.99), 3),
+        "max_ms": round(max(tiempos), 3),
+    }
+
+
+def cronometrar(funcion, argumentos):
+    tiempos = []
+    for arg in argumentos:
+        inicio = time.perf_counter()
+        funcion(arg)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def _dnis(rnd, socios, n):
+    return [str(DNI_BASE + rnd.randrange(socios)) for _ in range(n)]
+
+
+def escenario_ingreso(db, socios, rnd, repeticiones):
+    ventana = db.escaneos.ventana
+    db.escaneos.configurar(ventana=0)  # sin anti-repetidos: camino completo
+    try:
+        return cronometrar(db.registrar_ingreso, _dnis(rnd, socios, repeticiones))
+    finally:
+        db.escaneos.configurar(ventana=ventana)
+        db.historial.vaciar()
+
+
+def escenario_busqueda(db, socios, rnd, repeticiones):
+    filtros = []
+    for _ in range(repeticiones):
+        texto = rnd.choice([rnd.choice(NOMBRES), rnd.choice(APELLIDOS), str(DNI_BASE + rnd.randrange(socios))])
+        filtros.append(texto[:rnd.randint(2, len(texto))])
+    return cronometrar(lambda f: db.pagina_socios(f, TAM_PAGINA), filtros)
+
+
+def escenario_kpis(db, socios, rnd, repeticiones):
+    return cronometrar(lambda _: db.obtener_metricas(), range(repeticiones))
+
+
+def escenario_historial(db, socios, rnd, repeticiones):
+    # Primera página + scroll, sin filtros y filtrando por socio
+    def pagina(filtros):
+        filas = db.pagina_historial(TAM_PAGINA_HISTORIAL, **filtros)
+        for _ in range(3):
+            if len(filas) < TAM_PAGINA_HISTORIAL:
+                break
+            filas = db.pagina_historial(TAM_PAGINA_HISTORIAL, clave=(filas[-1][1], filas[-1][0]), **filtros)
+    consultas = [
+        {} if rnd.random() < 0.5 else {"socio": str(DNI_BASE + rnd.randrange(socios))}
+        for _ in range(repeticiones)
+    ]
+    return cronometrar(pagina, consultas)
+
+
+def escenario_exportacion(db, socios, rnd, repeticiones):
+    directorio = tempfile.mkdtemp(prefix="bench_mtz_export_")
+    destino = os.path.join(directorio, "socios.csv")
+    return cronometrar(lambda _: exportar_socios(db, destino), range(max(1, repeticiones // 100)))
+
+
+def escenario_respaldo(db, socios, rnd, repeticiones):
+    directorio = tempfile.mkdtemp(prefix="bench_mtz_backup_")
+    destino = os.path.join(directorio, "respaldo.db")
+
+    def respaldar(_):
+        crear_respaldo(db, destino)
+        os.remove(destino)
+    return cronometrar(respaldar, range(max(1, repeticiones // 100)))
+
+
+def escenario_gestion_qt(db, socios, rnd, repeticiones):
+    """cargar_socios de la pantalla de Gestión (modelo + vista, sin pantalla)"""
+    from PyQt6.QtWidgets import QApplication
+    import gestion
+    app = QApplication.instance() or QApplication([])
+    ventana = gestion.VentanaGestion(db=db)
+
+    def cargar(filtro):
+        ventana.input_buscar.setText(filtro)
+        ventana.cargar_socios()
+        app.processEvents()
+    filtros = [rnd.choice(APELLIDOS)[:rnd.randint(2, 4)] for _ in range(max(1, repeticiones // 10))]
+    tiempos = cronometrar(cargar, filtros)
+    ventana.close()
+    return tiempos
+
+
+def escenario_monitor_qt(db, socios, rnd, repeticiones):
+    """Tarjeta del monitor: del Enter del lector al resultado pintado (VentanaPrincipal.latencias)"""
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtTest import QTest
+    os.environ.setdefault("MTZ_DIR_KIOSCO", tempfile.mkdtemp(prefix="bench_mtz_kiosco_"))
+    import monitor
+    app = QApplication.instance() or QApplication([])
+    ventana = monitor.VentanaPrincipal(db=db)
+    ventana.show()
+    ventana.pool.waitForDone()
+    ventana_escaneos = db.escaneos.ventana
+    db.escaneos.configurar(ventana=0)
+    try:
+        for dni in _dnis(rnd, socios, max(1, repeticiones // 5)):
+            pintados = len(ventana.latencias)
+            ventana.input_dni.setText(dni)
+            QTest.keyClick(ventana.input_dni, Qt.Key.Key_Return)
+            while len(ventana.latencias) == pintados:
+                app.processEvents()
+            ventana.timer_limpieza.stop()
+            ventana.resetear_pantalla()
+            app.processEvents()
+        return list(ventana.latencias)
+    finally:
+        db.escaneos.configurar(ventana=ventana_escaneos)
+        ventana.close()
+        db.historial.vaciar()
+
+
+ESCENARIOS = {
+    "ingreso": escenario_ingreso,
+    "busqueda": escenario_busqueda,
+    "kpis": escenario_kpis,
+    "historial": escenario_historial,
+    "exportacion": escenario_exportacion,
+    "respaldo": escenario_respaldo,
+    "gestion_qt": escenario_gestion_qt,
+    "monitor_qt": escenario_monitor_qt,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socios", type=int, default=50000)
+    parser.add_argument("--anios", type=float, default=2)
+    parser.add_argument("--por-dia", type=int, default=150)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--repeticiones", type=int, default=500)
+    parser.add_argument("--db", help="base generada antes (si no existe, se genera ahí)")
+    parser.add_argument("--escenarios", nargs="+", choices=list(ESCENARIOS), default=list(ESCENARIOS))
+    parser.add_argument("--salida", help="archivo JSON (por defecto, a la salida estándar)")
+    args = parser.parse_args()
+
+    destino = args.db or os.path.join(tempfile.mkdtemp(prefix="bench_mtz_"), "gym_mtz.db")
+    inicio = time.perf_counter()
+    if os.path.exists(destino):
+        db = Database(os.path.abspath(destino))
+        db.crear_tablas()
+    else:
+        db = generar(destino, args.socios, args.anios, args.por_dia, args.semilla)
+    generacion = time.perf_counter() - inicio
+
+    with db.transaccion() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM miembros")
+        socios = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM historial_acceso")
+        accesos = cursor.fetchone()[0]
+
+    resultados = {}
+    for nombre in args.escenarios:
+        rnd = random.Random(f"{args.semilla}-{nombre}")
+        try:
+            resultados[nombre] = resumen(ESCENARIOS[nombre](db, socios, rnd, args.repeticiones))
+        except ImportError as e:
+            resultados[nombre] = {"omitido": f"falta dependencia: {e.name}"}
+
+    informe = {
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "datos": {"db": destino, "socios": socios, "accesos": accesos, "generacion_s": round(generacion, 1)},
+        "escenarios": resultados,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
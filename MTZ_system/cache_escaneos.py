@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+from instancias import UnaPorBase
+from entorno import numero_env
+
+
+class CacheEscaneos(UnaPorBase):
+    """Recuerda el último resultado de cada DNI durante unos segundos.
+
+    Si el mismo DNI se vuelve a escanear dentro de la ventana (doble pitido, toque
+    impaciente) se repite el resultado anterior sin tocar la base: no se descuenta
+    otro pase ni se agrega otra fila al historial."""
+
+    # Segundos de la ventana; se puede cambiar con la variable MTZ_VENTANA_REPETIDOS (0 = desactivado)
+    VENTANA = numero_env("MTZ_VENTANA_REPETIDOS", 5.0)
+    MAX_ENTRADAS = 512
+
+    @classmethod
+    def _crear(cls, db_path):
+        # Una por base como el resto, pero no necesita la ruta
+        return cls()
+
+    def __init__(self, ventana=None, max_entradas=None):
+        self.ventana = self.VENTANA if ventana is None else ventana
+        self.max_entradas = max_entradas or self.MAX_ENTRADAS
+        self._entradas = OrderedDict()  # dni -> (vence, resultado)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def configurar(self, ventana=None, max_entradas=None):
+        with self._lock:
+            if ventana is not None:
+                self.ventana = ventana
+            if max_entradas is not None:
+                self.max_entradas = max_entradas
+            self._entradas.clear()
+
+    def buscar(self, dni):
+        """Resultado anterior (marcado como repetido) o None si no hay uno vigente"""
+        if self.ventana <= 0:
+            return None
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(dni)
+            if entrada is None or entrada[0] < ahora:
+                self._entradas.pop(dni, None)
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            resultado = dict(entrada[1])
+        resultado["repetido"] = True
+        return resultado
+
+    def guardar(self, dni, resultado):
+        if self.ventana <= 0:
+            return
+        with self._lock:
+            self._entradas[dni] = (time.monotonic() + self.ventana, resultado)
+            self._entradas.move_to_end(dni)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        """Se llama cuando cambian los datos de un socio (renovación, edición, baja)"""
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "repetidos": self.aciertos,
+                "consultas": self.aciertos + self.fallos,
+                "en_cache": len(self._entradas),
+                "ventana_s": self.ventana,
+            }
@@ -0,0 +1,66 @@
+import threading
+from types import MappingProxyType
+from instancias import UnaPorBase
+
+
+class FotoPlanes:
+    """Catálogo de planes inmutable: nombre -> (id, precio), en el orden de la tabla"""
+
+    __slots__ = ("version", "por_nombre", "por_id")
+
+    def __init__(self, version, filas):
+        self.version = version
+        self.por_nombre = MappingProxyType({nombre: (id_plan, precio) for id_plan, nombre, precio in filas})
+        self.por_id = MappingProxyType({id_plan: (nombre, precio) for id_plan, nombre, precio in filas})
+
+    def nombres(self):
+        return list(self.por_nombre)
+
+    def id_de(self, nombre):
+        plan = self.por_nombre.get(nombre)
+        return plan[0] if plan else None
+
+    def precio_de_id(self, id_plan):
+        plan = self.por_id.get(id_plan)
+        return plan[1] if plan else 0
+
+
+class CatalogoPlanes(UnaPorBase):
+    """Tabla planes cargada una sola vez por proceso y compartida por todas las ventanas.
+
+    catalogo_version (migración 10) sube con cada cambio en planes, venga de donde
+    venga. Solo se relee cuando PRAGMA data_version avisa que otra conexión escribió
+    algo y la versión guardada ya no coincide; los cambios hechos desde este proceso
+    llaman a invalidar()."""
+
+    def __init__(self, gestor):
+        self.gestor = gestor
+        self._foto = None
+        # Por hilo: (conexión, último PRAGMA data_version visto). threading.local se
+        # libera con el hilo, así los hilos del pool que vencen no quedan acumulados
+        self._vistos = threading.local()
+        self._lock = threading.Lock()
+
+    def invalidar(self):
+        with self._lock:
+            self._foto = None
+
+    def foto(self):
+        conn = self.gestor.conexion()
+        visto = (conn, conn.execute("PRAGMA data_version").fetchone()[0])
+        with self._lock:
+            foto = self._foto
+            if foto is not None and getattr(self._vistos, "ultimo", None) == visto:
+                return foto
+        self._vistos.ultimo = visto
+        with self.gestor.transaccion() as cursor:
+            cursor.execute("SELECT version FROM catalogo_version WHERE id = 1")
+            fila = cursor.fetchone()
+            version = fila[0] if fila else 0
+            if foto is not None and foto.version == version:
+                return foto
+            cursor.execute("SELECT id, nombre, precio FROM planes ORDER BY id")
+            foto = FotoPlanes(version, cursor.fetchall())
+        with self._lock:
+            self._foto = foto
+        return foto
@@ -1,7 +1,153 @@
 import sqlite3
 import os
 import sys
+import atexit
+import threading
+import weakref
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from migraciones import aplicar_migraciones, reconstruir_estadisticas
+from cache_escaneos import CacheEscaneos
+from historial_diferido import EscritorHistorial
+from perfil_sql import PerfilSQL, ConexionInstrumentada
+from archivo_historial import ArchivoHistorial
+from catalogo_planes import CatalogoPlanes
+from escritor_db import EjecutorEscrituras, escritura
+from instancias import UnaPorBase
+
+
+class _TitularHilo:
+    """Vive en el threading.local del hilo: cuando el hilo termina se libera y su
+    weakref.finalize cierra la conexión (los hilos de QThreadPool vencen a los 30 s)"""
+
+
+class GestorConexiones(UnaPorBase):
+    """Mantiene una conexión SQLite persistente por hilo, compartida por todo el proceso"""
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL;",
+        "PRAGMA synchronous=NORMAL;",
+        "PRAGMA cache_size=-16000;",  # ~16 MB de caché de páginas
+        "PRAGMA mmap_size=268435456;",  # 256 MB mapeados en memoria
+        "PRAGMA temp_store=MEMORY;",
+    )
+    CACHE_SENTENCIAS = 256
+    TIMEOUT = 5.0
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conexiones = []
+        self._lock = threading.Lock()
+        self.perfil = PerfilSQL.obtener(db_path)
+        # Contador de escrituras de este proceso (lo usa la caché de métricas)
+        self.escrituras = 0
+
+    def marcar_escritura(self):
+        with self._lock:
+            self.escrituras += 1
+
+    def conexion(self):
+        """Conexión del hilo actual; se abre y configura una sola vez"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: las transacciones se abren explícitamente en transaccion()
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.TIMEOUT,
+                isolation_level=None,
+                cached_statements=self.CACHE_SENTENCIAS,
+                check_same_thread=False,
+                factory=ConexionInstrumentada,
+            )
+            conn.perfil = self.perfil
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.titular = _TitularHilo()
+            # atexit=False: al salir las cierra _cerrar_al_salir, después de vaciar el historial
+            weakref.finalize(self._local.titular, self._soltar, conn).atexit = False
+            with self._lock:
+                self._conexiones.append(conn)
+        return conn
+
+    def _soltar(self, conn):
+        """Cierra una conexión y la saca de la lista (fin del hilo o descartar())"""
+        with self._lock:
+            if conn in self._conexiones:
+                self._conexiones.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def abiertas(self):
+        with self._lock:
+            return len(self._conexiones)
+
+    def en_transaccion(self):
+        """True si el hilo actual tiene una transacción abierta (sin abrir conexión)"""
+        conn = getattr(self._local, "conn", None)
+        return conn is not None and conn.in_transaction
+
+    @contextmanager
+    def transaccion(self, inmediata=False):
+        """Abre una transacción y entrega un cursor; commit al salir, rollback si hay error.
+
+        Si ya hay una transacción en curso en este hilo se reutiliza dentro de un
+        SAVEPOINT: un error deshace solo esa parte (commit agrupado de EjecutorEscrituras)."""
+        conn = self.conexion()
+        if conn.in_transaction:
+            conn.execute("SAVEPOINT anidada")
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.execute("ROLLBACK TO anidada")
+                conn.execute("RELEASE anidada")
+                raise
+            else:
+                conn.execute("RELEASE anidada")
+            return
+
+        conn.execute("BEGIN IMMEDIATE" if inmediata else "BEGIN")
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def descartar(self):
+        """Cierra la conexión del hilo actual; la próxima se abre de cero (tras un corte)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        self._local.titular = None
+        self._soltar(conn)
+
+    def cerrar(self):
+        with self._lock:
+            for conn in self._conexiones:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._conexiones.clear()
+        self._local = threading.local()
+
+
+def _cerrar_al_salir():
+    # Primero el historial diferido (se escribe por el hilo escritor), después el
+    # hilo escritor termina lo encolado y recién ahí se cierran las conexiones
+    EscritorHistorial.cerrar_todos()
+    EjecutorEscrituras.cerrar_todos()
+    GestorConexiones.cerrar_todos()
+
+
+atexit.register(_cerrar_al_salir)
+
 
 class Database:
     def __init__(self, db_name="gym_mtz.db"):
@@ -9,63 +155,91 @@ class Database:
             base_dir = os.path.dirname(sys.executable)
         else:
             base_dir = os.path.dirname(os.path.abspath(__file__))
-            
+
         self.db_path = os.path.join(base_dir, db_name)
+        self.gestor = GestorConexiones.obtener(self.db_path)
+        self.escaneos = CacheEscaneos.obtener(self.db_path)
+        self.historial = EscritorHistorial.obtener(self.gestor)
+        self.perfil = self.gestor.perfil
+        self.archivo = ArchivoHistorial.obtener(self.gestor)
+        self.planes = CatalogoPlanes.obtener(self.gestor)
+        self.escritor = EjecutorEscrituras.obtener(self.gestor)
+        self._con_fts = None
+
+    def _datos_modificados(self):
+        """Lo llaman los métodos que cambian socios: descarta lo que quedó en caché"""
+        self.escaneos.limpiar()
+        self.gestor.marcar_escritura()
 
     def conectar(self):
+        """Conexión compartida del hilo actual (no cerrarla: la administra el gestor)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("PRAGMA journal_mode=WAL;")
-            return conn
+            return self.gestor.conexion()
         except sqlite3.Error as e:
             print(f"Error conectando a la BD: {e}")
             return None
 
+    def transaccion(self, inmediata=False):
+        return self.gestor.transaccion(inmediata)
+
+    def escribir(self, metodo, *args, **kwargs):
+        """Encola una escritura (un método @escritura, ej. db.renovar_socio) sin esperarla.
+
+        Devuelve un concurrent.futures.Future; en la interfaz usar escritura_qt."""
+        return self.escritor.enviar(metodo, *args, agrupar=getattr(metodo, "agrupar", True), **kwargs)
+
+    @escritura(agrupar=False)
     def crear_tablas(self):
-        conn = self.conectar()
-        if conn:
-            cursor = conn.cursor()
-            
-            #tabla planes
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS planes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT UNIQUE NOT NULL,
-                    precio REAL NOT NULL
-                )
-            ''')
+        try:
+            with self.transaccion() as cursor:
+                #tabla planes
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS planes (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        nombre TEXT UNIQUE NOT NULL,
+                        precio REAL NOT NULL
+                    )
+                ''')
 
-            #tabla miembros
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS miembros (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT NOT NULL,
-                    apellido TEXT NOT NULL,
-                    dni TEXT UNIQUE NOT NULL,
-                    plan_id INTEGER,
-                    ingresos_restantes INTEGER DEFAULT 0,
-                    ultimo_pago DATE,
-                    fecha_vencimiento DATE,  -- <--- NUEVO CAMPO
-                    fecha_registro DATE DEFAULT CURRENT_DATE,
-                    activo BOOLEAN DEFAULT 1,
-                    FOREIGN KEY(plan_id) REFERENCES planes(id)
-                )
-            ''')
-            
-            #tabla historial
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS historial_acceso (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    miembro_id INTEGER,
-                    fecha_hora DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    tipo_acceso TEXT,
-                    FOREIGN KEY(miembro_id) REFERENCES miembros(id)
-                )
-            ''')
-            
-            self.inicializar_planes(cursor)
-            conn.commit()
-            conn.close()
+                #tabla miembros
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS miembros (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        nombre TEXT NOT NULL,
+                        apellido TEXT NOT NULL,
+                        dni TEXT UNIQUE NOT NULL,
+                        plan_id INTEGER,
+                        ingresos_restantes INTEGER DEFAULT 0,
+                        ultimo_pago DATE,
+                        fecha_vencimiento DATE,  -- <--- NUEVO CAMPO
+                        fecha_registro DATE DEFAULT CURRENT_DATE,
+                        activo BOOLEAN DEFAULT 1,
+                        FOREIGN KEY(plan_id) REFERENCES planes(id)
+                    )
+                ''')
+
+                #tabla historial
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS historial_acceso (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        miembro_id INTEGER,
+                        fecha_hora DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        tipo_acceso TEXT,
+                        FOREIGN KEY(miembro_id) REFERENCES miembros(id)
+                    )
+                ''')
+
+                self.inicializar_planes(cursor)
+
+            # Actualiza en el lugar las bases existentes (índices, columnas nuevas)
+            aplicar_migraciones(self.gestor.conexion())
+
+            self.planes.invalidar()
+            recuperados = self.historial.recuperar()
+            if recuperados:
+                print(f"Historial recuperado del diario: {recuperados} registros")
+        except sqlite3.Error as e:
+            print(f"Error creando tablas: {e}")
 
     def inicializar_planes(self, cursor):
         planes_base = [
@@ -76,20 +250,13 @@ class Database:
             ("Pase Libre (+1 actividad)", 42000)
         ]
         for nombre, precio in planes_base:
-            try:
-                cursor.execute("INSERT INTO planes (nombre, precio) VALUES (?, ?)", (nombre, precio))
-            except sqlite3.IntegrityError:
-                pass 
+            cursor.execute("INSERT OR IGNORE INTO planes (nombre, precio) VALUES (?, ?)", (nombre, precio))
 
+    @escritura
     def registrar_socio(self, nombre, apellido, dni, plan_nombre, ingresos):
-        conn = self.conectar()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT id FROM planes WHERE nombre = ?", (plan_nombre,))
-                plan_result = cursor.fetchone()
-                plan_id = plan_result[0] if plan_result else None
-
+        try:
+            plan_id = self.planes.foto().id_de(plan_nombre)
+            with self.transaccion() as cursor:
                 # Calculamos vencimiento: Hoy + 30 días
                 hoy = datetime.now()
                 vencimiento = hoy + timedelta(days=30)
@@ -99,209 +266,569 @@ class Database:
                     INSERT INTO miembros (nombre, apellido, dni, plan_id, ingresos_restantes, ultimo_pago, fecha_vencimiento)
                     VALUES (?, ?, ?, ?, ?, DATE('now'), ?)
                 ''', (nombre, apellido, dni, plan_id, ingresos, fecha_venc_str))
-                
-                conn.commit()
-                return True
-            except Exception as e:
-                print(f"Error al registrar: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+            self._datos_modificados()
+            return True
+        except Exception as e:
+            print(f"Error al registrar: {e}")
+            return False
 
+    @escritura
     def renovar_socio(self, id_socio, plan_nombre, pases_a_sumar):
-        conn = self.conectar()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT id FROM planes WHERE nombre = ?", (plan_nombre,))
-                plan_result = cursor.fetchone()
-                plan_id = plan_result[0] if plan_result else None
-
+        try:
+            plan_id = self.planes.foto().id_de(plan_nombre)
+            with self.transaccion() as cursor:
                 hoy = datetime.now()
                 vencimiento = hoy + timedelta(days=30)
                 fecha_venc_str = vencimiento.strftime('%Y-%m-%d')
 
                 cursor.execute('''
-                    UPDATE miembros 
-                    SET plan_id = ?, 
-                        ingresos_restantes = ?, 
+                    UPDATE miembros
+                    SET plan_id = ?,
+                        ingresos_restantes = ?,
                         ultimo_pago = DATE('now'),
                         fecha_vencimiento = ?
                     WHERE id = ?
                 ''', (plan_id, pases_a_sumar, fecha_venc_str, id_socio))
-                
-                conn.commit()
-                return True
-            except Exception as e:
-                print(f"Error al renovar: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+            self._datos_modificados()
+            return True
+        except Exception as e:
+            print(f"Error al renovar: {e}")
+            return False
 
     def registrar_ingreso(self, dni):
-        conn = self.conectar()
-        info_socio = None
-        
-        if conn:
-            try:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT m.id, m.nombre, m.apellido, p.nombre, m.ingresos_restantes, m.fecha_vencimiento 
-                    FROM miembros m
-                    LEFT JOIN planes p ON m.plan_id = p.id
-                    WHERE m.dni = ? AND m.activo = 1
-                ''', (dni,))
-                
-                resultado = cursor.fetchone()
-                ahora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                if resultado:
-                    m_id, nombre, apellido, plan, ingresos, fecha_venc = resultado
-                    
-                    hoy_str = datetime.now().strftime('%Y-%m-%d')
-                    
-                    es_vencido = False
-                    if fecha_venc and hoy_str >= fecha_venc:
-                        es_vencido = True
-                    
-                    if ingresos > 0 and not es_vencido:
-                        
-                        cursor.execute("UPDATE miembros SET ingresos_restantes = ingresos_restantes - 1 WHERE id = ?", (m_id,))
-                        
-                        cursor.execute("INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, 'Ingreso')", (m_id, ahora))
-                        
-                        conn.commit()
-                        
-                        info_socio = {
-                            "nombre": nombre, 
-                            "apellido": apellido, 
-                            "plan": plan,
-                            "vencimiento": fecha_venc,
-                            "ingresos_restantes": ingresos - 1,
-                            "acceso": True,
-                            "mensaje": "PASE HABILITADO"
-                        }
+        """Descuenta un pase de forma atómica y anota el acceso en el historial.
+
+        El lock de escritura se toma al empezar (BEGIN IMMEDIATE) y el descuento es un
+        único UPDATE condicional, así dos kioscos con el mismo DNI no pueden usar el
+        mismo último pase. La fila de historial_acceso va por EscritorHistorial
+        (diferida, en lotes). Un DNI repetido dentro de la ventana de CacheEscaneos
+        devuelve el resultado anterior sin tocar la base."""
+        return self.registrar_ingresos([dni])[0]
+
+    def registrar_ingresos(self, dnis, estricto=False):
+        """Como registrar_ingreso pero para varios escaneos en una sola transacción
+        (un solo commit). Lo usa el servicio de ingresos para agrupar los pedidos de
+        todos los kioscos. Devuelve los resultados en el mismo orden.
+
+        Con estricto=True un error de la base se relanza en vez de devolver None,
+        para que el kiosco distinga "no existe" de "no hay base" (kiosco_offline)."""
+        resultados = [self.escaneos.buscar(dni) for dni in dnis]
+        pendientes = [i for i, resultado in enumerate(resultados) if resultado is None]
+        if not pendientes:
+            return resultados
+
+        accesos = []
+        ahora = datetime.now()
+        ahora_str = ahora.strftime('%Y-%m-%d %H:%M:%S')
+        hoy_str = ahora.strftime('%Y-%m-%d')
+
+        try:
+            with self.transaccion(inmediata=True) as cursor:
+                vistos = {}
+                for i in pendientes:
+                    dni = dnis[i]
+                    if dni in vistos and self.escaneos.ventana > 0:
+                        # Mismo DNI dos veces en el lote: igual que un repetido de la caché
+                        anterior = resultados[vistos[dni]]
+                        resultados[i] = dict(anterior, repetido=True) if anterior else None
+                        continue
+                    vistos[dni] = i
+                    resultados[i], acceso = self._ingreso(cursor, dni, hoy_str)
+                    if acceso:
+                        accesos.append(acceso)
+        except Exception as e:
+            if estricto and isinstance(e, sqlite3.Error):
+                raise
+            print(f"Error en ingreso: {e}")
+            for i in pendientes:
+                resultados[i] = None
+            accesos = []
+
+        # Recién con el descuento confirmado se anota en el historial
+        for m_id, tipo in accesos:
+            self.historial.registrar(m_id, ahora_str, tipo)
+        for i in pendientes:
+            if resultados[i] is not None and not resultados[i].get("repetido"):
+                self.escaneos.guardar(dnis[i], resultados[i])
+        return resultados
+
+    def _ingreso(self, cursor, dni, hoy_str):
+        """Un escaneo dentro de la transacción ya abierta: (resultado, (miembro_id, tipo) o None)"""
+        cursor.execute('''
+            UPDATE miembros
+            SET ingresos_restantes = ingresos_restantes - 1
+            WHERE dni = ? AND activo = 1
+              AND ingresos_restantes > 0
+              AND (IFNULL(fecha_vencimiento, '') = '' OR fecha_vencimiento > ?)
+            RETURNING id, nombre, apellido,
+                      (SELECT p.nombre FROM planes p WHERE p.id = miembros.plan_id),
+                      ingresos_restantes, fecha_vencimiento
+        ''', (dni, hoy_str))
+        habilitado = cursor.fetchone()
+
+        if habilitado:
+            m_id, nombre, apellido, plan, ingresos, fecha_venc = habilitado
+            info_socio = {
+                "nombre": nombre,
+                "apellido": apellido,
+                "plan": plan,
+                "vencimiento": fecha_venc,
+                "ingresos_restantes": ingresos,
+                "acceso": True,
+                "mensaje": "PASE HABILITADO"
+            }
+            return info_socio, (m_id, "Ingreso")
+
+        # No se descontó nada: averiguamos el motivo (seguimos con el lock tomado)
+        cursor.execute('''
+            SELECT m.id, m.nombre, m.apellido, p.nombre, m.ingresos_restantes, m.fecha_vencimiento
+            FROM miembros m
+            LEFT JOIN planes p ON m.plan_id = p.id
+            WHERE m.dni = ? AND m.activo = 1
+        ''', (dni,))
+        resultado = cursor.fetchone()
+        if not resultado:
+            return None, None
+
+        m_id, nombre, apellido, plan, ingresos, fecha_venc = resultado
+
+        motivo = "Rechazado"
+        mensaje_pantalla = "ACCESO DENEGADO"
+
+        if fecha_venc and hoy_str >= fecha_venc:
+            motivo = "Vencido"
+            mensaje_pantalla = "⛔ CUOTA VENCIDA"
+        elif ingresos <= 0:
+            motivo = "Sin Pases"
+            mensaje_pantalla = "⛔ SIN PASES"
+
+        info_socio = {
+            "nombre": nombre,
+            "apellido": apellido,
+            "plan": plan,
+            "vencimiento": fecha_venc,
+            "ingresos_restantes": ingresos,
+            "acceso": False,
+            "mensaje": mensaje_pantalla
+        }
+        return info_socio, (m_id, motivo)
+
+    def socios_modificados(self, desde, limite=5000):
+        """Socios cambiados después del número de cambio `desde` (foto local del kiosco).
+
+        Filas (id, dni, nombre, apellido, plan, ingresos_restantes, fecha_vencimiento,
+        activo, cambio) en orden de cambio. Los errores de la base se relanzan."""
+        with self.transaccion() as cursor:
+            cursor.execute('''
+                SELECT m.id, m.dni, m.nombre, m.apellido, p.nombre, m.ingresos_restantes,
+                       m.fecha_vencimiento, m.activo, m.cambio
+                FROM miembros m
+                LEFT JOIN planes p ON m.plan_id = p.id
+                WHERE m.cambio > ?
+                ORDER BY m.cambio
+                LIMIT ?
+            ''', (desde, limite))
+            return cursor.fetchall()
+
+    def aplicar_ingresos_offline(self, registros):
+        """Aplica los ingresos que un kiosco registró sin conexión.
+
+        registros: (id, miembro_id, fecha_hora, tipo_acceso). Cada id se aplica una
+        sola vez (tabla ingresos_offline), así reenviar el diario no descuenta dos
+        veces. Devuelve cuántos eran nuevos. Los errores de la base se relanzan."""
+        aplicados = 0
+        with self.transaccion(inmediata=True) as cursor:
+            for id_registro, m_id, fecha_hora, tipo in registros:
+                cursor.execute(
+                    "INSERT OR IGNORE INTO ingresos_offline (id, fecha_hora) VALUES (?, ?)",
+                    (id_registro, fecha_hora),
+                )
+                if cursor.rowcount != 1:
+                    continue
+                cursor.execute(
+                    "INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)",
+                    (m_id, fecha_hora, tipo),
+                )
+                if tipo == "Ingreso":
+                    cursor.execute(
+                        "UPDATE miembros SET ingresos_restantes = MAX(ingresos_restantes - 1, 0) WHERE id = ?",
+                        (m_id,),
+                    )
+                aplicados += 1
+        if aplicados:
+            self._datos_modificados()
+        return aplicados
+
+    def _hay_indice_busqueda(self, cursor):
+        if self._con_fts is None:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'miembros_busqueda'")
+            self._con_fts = cursor.fetchone() is not None
+        return self._con_fts
+
+    # Expresión de orden por columna de la tabla de Gestión (ID, Nombre, Apellido, DNI, Plan, Pases)
+    ORDEN_SOCIOS = ["m.id", "m.nombre", "m.apellido", "m.dni", "IFNULL(p.nombre, '')", "IFNULL(m.ingresos_restantes, 0)"]
+
+    def buscar_socios(self, filtro, limite=None, cancelado=None):
+        """Socios activos que coinciden con el filtro, del más nuevo al más viejo"""
+        return self.pagina_socios(filtro, limite, cancelado=cancelado)
+
+    def pagina_socios(self, filtro, limite, orden=0, descendente=True, clave=None, inclusivo=False, cancelado=None):
+        """Una página de socios activos con paginación por clave (keyset).
+
+        Cada palabra del filtro se busca como prefijo de nombre, apellido o DNI en el
+        índice FTS5. Las filas se ordenan por la columna `orden` y después por id;
+        `clave` es el par (valor de orden, id) de la fila desde donde seguir, excluida
+        salvo `inclusivo`. `cancelado` es una función opcional: si devuelve True la
+        consulta se interrumpe (llegó una tecla nueva) y se devuelve None."""
+        palabras = [p.replace('"', '') for p in filtro.split()]
+        palabras = [p for p in palabras if p]
+        columnas = "m.id, m.nombre, m.apellido, m.dni, IFNULL(p.nombre, ''), IFNULL(m.ingresos_restantes, 0)"
+        sentido = "DESC" if descendente else "ASC"
+        comparador = ("<" if descendente else ">") + ("=" if inclusivo else "")
+        conn = self.gestor.conexion()
+        if cancelado:
+            conn.set_progress_handler(lambda: 1 if cancelado() else 0, 1000)
+        try:
+            with self.transaccion() as cursor:
+                params = []
+                if palabras and self._hay_indice_busqueda(cursor):
+                    # Con FTS5 el id sale del rowid del índice: así LIMIT corta temprano
+                    id_expr = "f.rowid"
+                    desde = """
+                        FROM miembros_busqueda f
+                        JOIN miembros m ON m.id = f.rowid
+                        LEFT JOIN planes p ON m.plan_id = p.id
+                        WHERE miembros_busqueda MATCH ? AND m.activo = 1
+                    """
+                    params.append(" ".join(f'"{p}"*' for p in palabras))
+                elif palabras:
+                    id_expr = "m.id"
+                    desde = """
+                        FROM miembros m
+                        LEFT JOIN planes p ON m.plan_id = p.id
+                        WHERE m.activo = 1 AND (m.nombre LIKE ? OR m.apellido LIKE ? OR m.dni LIKE ?)
+                    """
+                    param = f"%{filtro.strip()}%"
+                    params += [param, param, param]
+                else:
+                    id_expr = "m.id"
+                    desde = """
+                        FROM miembros m
+                        LEFT JOIN planes p ON m.plan_id = p.id
+                        WHERE m.activo = 1
+                    """
+
+                orden_expr = id_expr if orden == 0 else self.ORDEN_SOCIOS[orden]
+                if clave is not None:
+                    if orden == 0:
+                        desde += f" AND {id_expr} {comparador} ?"
+                        params.append(clave[1])
+                    else:
+                        desde += f" AND ({orden_expr}, {id_expr}) {comparador} (?, ?)"
+                        params += list(clave)
+
+                sql = f"SELECT {columnas} {desde} ORDER BY {orden_expr} {sentido}"
+                if orden != 0:
+                    sql += f", {id_expr} {sentido}"
+                if limite:
+                    sql += " LIMIT ?"
+                    params.append(limite)
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            if cancelado and cancelado():
+                return None
+            print(f"Error en búsqueda: {e}")
+            return []
+        finally:
+            if cancelado:
+                conn.set_progress_handler(None, 0)
+
+    def pagina_historial(self, limite, clave=None, desde=None, hasta=None, socio="", tipo=None):
+        """Una página del historial de accesos, del más reciente al más viejo.
+
+        Paginación por clave (fecha_hora, id): cada filtro (fechas, tipo, socio) cae
+        en un índice que ya está en ese orden, así cada página es un recorrido corto
+        sin importar el tamaño del historial. `desde`/`hasta` son 'YYYY-MM-DD'
+        (ambos inclusive); `socio` es un DNI o palabras del nombre. La fecha y la hora
+        ya vienen formateadas para mostrar.
+
+        Si la base principal no llega a completar la página, se sigue por los archivos
+        anuales (ArchivoHistorial), del año más nuevo al más viejo: todo lo archivado
+        es anterior a lo que queda en la principal, así el orden se mantiene."""
+        condiciones = []
+        params = []
+        if desde:
+            condiciones.append("h.fecha_hora >= ?")
+            params.append(desde)
+        if hasta:
+            condiciones.append("h.fecha_hora < date(?, '+1 day')")
+            params.append(hasta)
+        if tipo:
+            condiciones.append("h.tipo_acceso = ?")
+            params.append(tipo)
+        if clave is not None:
+            condiciones.append("(h.fecha_hora, h.id) < (?, ?)")
+            params += list(clave)
+
+        socio = socio.strip()
+        try:
+            conn = self.gestor.conexion()
+            with self.transaccion() as cursor:
+                if socio.isdigit():
+                    condiciones.append("h.miembro_id IN (SELECT id FROM miembros WHERE dni = ?)")
+                    params.append(socio)
+                elif socio:
+                    palabras = [p.replace('"', '') for p in socio.split()]
+                    if self._hay_indice_busqueda(cursor):
+                        condiciones.append("h.miembro_id IN (SELECT rowid FROM miembros_busqueda WHERE miembros_busqueda MATCH ?)")
+                        params.append(" ".join(f'"{p}"*' for p in palabras if p))
                     else:
-                        motivo = "Rechazado"
-                        mensaje_pantalla = "ACCESO DENEGADO"
-                        
-                        if es_vencido:
-                            motivo = "Vencido"
-                            mensaje_pantalla = "⛔ CUOTA VENCIDA"
-                        elif ingresos <= 0:
-                            motivo = "Sin Pases"
-                            mensaje_pantalla = "⛔ SIN PASES"
-
-                        cursor.execute("INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)", (m_id, ahora, motivo))
-                        conn.commit()
-                        
-                        info_socio = {
-                            "nombre": nombre, 
-                            "apellido": apellido, 
-                            "plan": plan,
-                            "vencimiento": fecha_venc,
-                            "ingresos_restantes": ingresos,
-                            "acceso": False,
-                            "mensaje": mensaje_pantalla
-                        }
-            except Exception as e:
-                print(f"Error en ingreso: {e}")
-            finally:
-                conn.close()
-        
-        return info_socio
+                        condiciones.append("(m.nombre LIKE ? OR m.apellido LIKE ?)")
+                        params += [f"%{socio}%", f"%{socio}%"]
+                filas = self._consulta_historial(cursor, "main", condiciones, params, limite)
+            if len(filas) == limite or conn.in_transaction:
+                return filas
+
+            # ATTACH no se puede dentro de una transacción
+            for anio in self.archivo.anios():
+                if (hasta and str(anio) > hasta[:4]) or (desde and str(anio) < desde[:4]):
+                    continue
+                esquema = self.archivo.adjuntar(conn, anio)
+                with self.transaccion() as cursor:
+                    filas += self._consulta_historial(cursor, esquema, condiciones, params, limite - len(filas))
+                if len(filas) == limite:
+                    break
+            return filas
+        except sqlite3.Error as e:
+            print(f"Error leyendo historial: {e}")
+            return []
+
+    def _consulta_historial(self, cursor, esquema, condiciones, params, limite):
+        # CROSS JOIN fija historial como tabla externa: los archivos no tienen ANALYZE
+        # y sin eso el planificador puede recorrer miembros y ordenar todo en memoria
+        where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        cursor.execute(f"""
+            SELECT h.id, h.fecha_hora,
+                   strftime('%d/%m/%Y', h.fecha_hora), strftime('%H:%M', h.fecha_hora),
+                   m.nombre, m.apellido, h.tipo_acceso
+            FROM {esquema}.historial_acceso h
+            CROSS JOIN main.miembros m ON h.miembro_id = m.id
+            {where}
+            ORDER BY h.fecha_hora DESC, h.id DESC
+            LIMIT ?
+        """, params + [limite])
+        return cursor.fetchall()
+
+    def obtener_metricas(self):
+        """Socios activos, vencidos e ingreso mensual estimado, leídos de los contadores"""
+        hoy = datetime.now().strftime('%Y-%m-%d')
+        foto = self.planes.foto()
+        with self.transaccion() as cursor:
+            cursor.execute("SELECT plan_id, activos FROM estadisticas")
+            por_plan = cursor.fetchall()
+            cursor.execute(
+                "SELECT IFNULL(SUM(activos), 0) FROM estadisticas_vencimientos WHERE fecha <> '' AND fecha < ?",
+                (hoy,),
+            )
+            vencidos = cursor.fetchone()[0]
+            # Los contadores juntan NULL y '' en la fila ''; como siempre (fecha_vencimiento < hoy)
+            # '' cuenta como vencido y NULL no: esos se cuentan aparte, por el índice parcial
+            cursor.execute("SELECT COUNT(*) FROM miembros WHERE activo = 1 AND fecha_vencimiento = ''")
+            vencidos += cursor.fetchone()[0]
+        activos = sum(cantidad for _, cantidad in por_plan)
+        ingreso = sum(cantidad * foto.precio_de_id(plan_id) for plan_id, cantidad in por_plan)
+        return {"activos": activos, "vencidos": vencidos, "ingreso_estimado": ingreso,
+                "version_planes": foto.version}
+
+    @escritura(agrupar=False)
+    def verificar_estadisticas(self):
+        """Recalcula los contadores desde miembros. Devuelve True si ya estaban bien."""
+        with self.transaccion(inmediata=True) as cursor:
+            cursor.execute("SELECT plan_id, activos FROM estadisticas WHERE activos <> 0 ORDER BY plan_id")
+            antes = cursor.fetchall()
+            cursor.execute("SELECT fecha, activos FROM estadisticas_vencimientos WHERE activos <> 0 ORDER BY fecha")
+            antes_venc = cursor.fetchall()
+            reconstruir_estadisticas(cursor)
+            cursor.execute("SELECT plan_id, activos FROM estadisticas ORDER BY plan_id")
+            despues = cursor.fetchall()
+            cursor.execute("SELECT fecha, activos FROM estadisticas_vencimientos ORDER BY fecha")
+            despues_venc = cursor.fetchall()
+        self.gestor.marcar_escritura()
+        return antes == despues and antes_venc == despues_venc
+
+    @escritura(agrupar=False)
+    def actualizar_asistencia(self, lote=50000):
+        """Suma a asistencia_horaria los accesos nuevos (id mayor a la marca de agua).
+
+        Va de a `lote` ids por transacción para no frenar a los kioscos. El plan es el
+        que tiene el socio al momento de resumir. Lo archivado ya está resumido: el
+        resumen nunca se descuenta. Devuelve la cantidad de accesos procesados."""
+        procesados = 0
+        try:
+            while True:
+                with self.transaccion(inmediata=True) as cursor:
+                    cursor.execute("SELECT ultimo_id FROM resumen_procesado WHERE nombre = 'asistencia'")
+                    desde = cursor.fetchone()[0]
+                    cursor.execute("SELECT IFNULL(MAX(id), 0) FROM historial_acceso")
+                    hasta = min(cursor.fetchone()[0], desde + lote)
+                    if hasta <= desde:
+                        return procesados
+                    cursor.execute('''
+                        INSERT INTO asistencia_horaria (fecha, hora, plan_id, ingresos, rechazos)
+                        SELECT substr(h.fecha_hora, 1, 10), CAST(substr(h.fecha_hora, 12, 2) AS INTEGER),
+                               IFNULL(m.plan_id, 0),
+                               SUM(h.tipo_acceso = 'Ingreso'), SUM(h.tipo_acceso <> 'Ingreso')
+                        FROM historial_acceso h
+                        LEFT JOIN miembros m ON m.id = h.miembro_id
+                        WHERE h.id > ? AND h.id <= ?
+                        GROUP BY 1, 2, 3
+                        ON CONFLICT (fecha, hora, plan_id) DO UPDATE SET
+                            ingresos = ingresos + excluded.ingresos,
+                            rechazos = rechazos + excluded.rechazos
+                    ''', (desde, hasta))
+                    cursor.execute(
+                        "UPDATE resumen_procesado SET ultimo_id = ? WHERE nombre = 'asistencia'", (hasta,)
+                    )
+                procesados += hasta - desde
+        except sqlite3.Error as e:
+            print(f"Error resumiendo asistencia: {e}")
+            return procesados
+
+    def horas_pico(self, dias=30):
+        """[(hora, ingresos promedio por día)] de los últimos `dias`, de 0 a 23"""
+        desde = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
+        with self.transaccion() as cursor:
+            cursor.execute('''
+                SELECT hora, SUM(ingresos) * 1.0 / ? FROM asistencia_horaria
+                WHERE fecha >= ? GROUP BY hora ORDER BY hora
+            ''', (dias, desde))
+            return cursor.fetchall()
+
+    def tendencia_diaria(self, dias=14):
+        """[(fecha, ingresos, rechazos)] de los últimos `dias`, del más viejo al más nuevo"""
+        desde = (datetime.now() - timedelta(days=dias - 1)).strftime('%Y-%m-%d')
+        with self.transaccion() as cursor:
+            cursor.execute('''
+                SELECT fecha, SUM(ingresos), SUM(rechazos) FROM asistencia_horaria
+                WHERE fecha >= ? GROUP BY fecha ORDER BY fecha
+            ''', (desde,))
+            return cursor.fetchall()
+
+    def asistencia_por_plan(self, dias=30):
+        """[(plan, ingresos)] de los últimos `dias`, del más concurrido al menos"""
+        desde = (datetime.now() - timedelta(days=dias)).strftime('%Y-%m-%d')
+        nombres = self.planes.foto().por_id
+        with self.transaccion() as cursor:
+            cursor.execute('''
+                SELECT plan_id, SUM(ingresos) FROM asistencia_horaria
+                WHERE fecha >= ? GROUP BY plan_id ORDER BY 2 DESC
+            ''', (desde,))
+            return [(nombres[plan_id][0] if plan_id in nombres else "Sin plan", ingresos)
+                    for plan_id, ingresos in cursor.fetchall()]
 
     def obtener_planes(self):
-        conn = self.conectar()
         planes = []
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT nombre FROM planes")
-            planes = [row[0] for row in cursor.fetchall()]
-            conn.close()
+        try:
+            planes = self.planes.foto().nombres()
+        except sqlite3.Error as e:
+            print(f"Error leyendo planes: {e}")
         return planes
+
+    @escritura
     def editar_socio(self, id_socio, nombre, apellido, dni):
         """Modifica los datos personales de un socio existente"""
-        conn = self.conectar()
-        if conn:
-            try:
-                cursor = conn.cursor()
+        try:
+            with self.transaccion() as cursor:
                 cursor.execute('''
-                    UPDATE miembros 
+                    UPDATE miembros
                     SET nombre = ?, apellido = ?, dni = ?
                     WHERE id = ?
                 ''', (nombre, apellido, dni, id_socio))
-                
-                conn.commit()
-                return True
-            except sqlite3.IntegrityError:
-                print("Error: El DNI ya existe en otro socio.")
-                return False
-            except Exception as e:
-                print(f"Error al editar: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
-    
+            self._datos_modificados()
+            return True
+        except sqlite3.IntegrityError:
+            print("Error: El DNI ya existe en otro socio.")
+            return False
+        except Exception as e:
+            print(f"Error al editar: {e}")
+            return False
+
+    @escritura
     def eliminar_socio(self, id_socio):
         """Marca al socio como inactivo (Borrado lógico) para que no aparezca más"""
-        conn = self.conectar()
-        if conn:
-            try:
-                cursor = conn.cursor()
+        try:
+            with self.transaccion() as cursor:
                 cursor.execute("UPDATE miembros SET activo = 0 WHERE id = ?", (id_socio,))
-                conn.commit()
-                return True
-            except Exception as e:
-                print(f"Error al eliminar: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+            self._datos_modificados()
+            return True
+        except Exception as e:
+            print(f"Error al eliminar: {e}")
+            return False
+    @escritura(agrupar=False)
+    def importar_socios(self, filas):
+        """Alta o actualización por DNI de muchos socios en una sola transacción.
+
+        filas: (nombre, apellido, dni, plan_id, ingresos, fecha_vencimiento, activo).
+        fecha_vencimiento None no pisa la de un socio existente.
+        Devuelve (nuevos, actualizados, reactivados)."""
+        with self.transaccion(inmediata=True) as cursor:
+            cursor.execute("SELECT dni, activo FROM miembros")
+            existentes = dict(cursor.fetchall())
+            nuevos = actualizados = reactivados = 0
+            for fila in filas:
+                activo_antes = existentes.get(fila[2])
+                if activo_antes is None:
+                    nuevos += 1
+                elif not activo_antes and fila[6]:
+                    reactivados += 1
+                else:
+                    actualizados += 1
+            cursor.executemany('''
+                INSERT INTO miembros (nombre, apellido, dni, plan_id, ingresos_restantes, ultimo_pago, fecha_vencimiento, activo)
+                VALUES (?, ?, ?, ?, ?, DATE('now'), ?, ?)
+                ON CONFLICT (dni) DO UPDATE SET
+                    nombre = excluded.nombre, apellido = excluded.apellido, plan_id = excluded.plan_id,
+                    ingresos_restantes = excluded.ingresos_restantes,
+                    fecha_vencimiento = COALESCE(excluded.fecha_vencimiento, miembros.fecha_vencimiento),
+                    ultimo_pago = CASE WHEN miembros.activo = 0 AND excluded.activo = 1
+                                       THEN DATE('now') ELSE miembros.ultimo_pago END,
+                    activo = excluded.activo
+            ''', filas)
+        self._datos_modificados()
+        return nuevos, actualizados, reactivados
+
     def verificar_dni_existente(self, dni):
-        conn = self.conectar()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT activo FROM miembros WHERE dni = ?", (dni,))
-            resultado = cursor.fetchone()
-            conn.close()
-            if resultado:
-                return True, resultado[0] # (Existe: Sí, Activo: 0 o 1)
-            return False, False # (Existe: No)
-        return False, False
+        try:
+            with self.transaccion() as cursor:
+                cursor.execute("SELECT activo FROM miembros WHERE dni = ?", (dni,))
+                resultado = cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"Error verificando DNI: {e}")
+            return False, False
+        if resultado:
+            return True, resultado[0] # (Existe: Sí, Activo: 0 o 1)
+        return False, False # (Existe: No)
 
+    @escritura
     def reactivar_socio(self, nombre, apellido, dni, plan_nombre, ingresos):
         """Revive a un socio inactivo actualizando sus datos"""
-        conn = self.conectar()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                
-                cursor.execute("SELECT id FROM planes WHERE nombre = ?", (plan_nombre,))
-                plan_result = cursor.fetchone()
-                plan_id = plan_result[0] if plan_result else None
-
+        try:
+            plan_id = self.planes.foto().id_de(plan_nombre)
+            with self.transaccion() as cursor:
                 hoy = datetime.now()
                 vencimiento = hoy + timedelta(days=30)
                 fecha_venc_str = vencimiento.strftime('%Y-%m-%d')
 
                 cursor.execute('''
-                    UPDATE miembros 
-                    SET nombre = ?, apellido = ?, plan_id = ?, 
+                    UPDATE miembros
+                    SET nombre = ?, apellido = ?, plan_id = ?,
                         ingresos_restantes = ?, ultimo_pago = DATE('now'),
                         fecha_vencimiento = ?, activo = 1
                     WHERE dni = ?
                 ''', (nombre, apellido, plan_id, ingresos, fecha_venc_str, dni))
-                
-                conn.commit()
-                return True
-            except Exception as e:
-                print(f"Error al reactivar: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
\ No newline at end of file
+            self._datos_modificados()
+            return True
+        except Exception as e:
+            print(f"Error al reactivar: {e}")
+            return False
@@ -0,0 +1,36 @@
+"""Diarios de solo agregado (una línea JSON por registro) que sobreviven a una caída.
+
+Los usan el historial diferido y el kiosco sin conexión: cada proceso escribe el
+suyo y lo tiene bloqueado mientras está abierto; el diario que nadie tiene
+bloqueado es de un proceso que ya no está y se puede aplicar y borrar.
+"""
+import json
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+def leer_diario(diario):
+    registros = []
+    for linea in diario:
+        try:
+            registros.append(json.loads(linea))
+        except ValueError:
+            pass  # última línea cortada por la caída
+    return registros
+
+
+def bloquear(archivo):
+    """Lock exclusivo no bloqueante sobre el diario; False si otro proceso lo tiene"""
+    try:
+        if msvcrt:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,18 @@
+"""Configuración por variables de entorno (MTZ_*).
+
+Un valor mal escrito no debe impedir que el programa arranque: se avisa y se usa
+el valor por defecto.
+"""
+import os
+
+
+def numero_env(nombre, defecto):
+    """Valor numérico de la variable `nombre`, del mismo tipo que `defecto` (int o float)"""
+    texto = os.environ.get(nombre, "").strip()
+    if not texto:
+        return defecto
+    try:
+        return type(defecto)(texto)
+    except ValueError:
+        print(f"Valor inválido en {nombre}={texto!r}; se usa {defecto}")
+        return defecto
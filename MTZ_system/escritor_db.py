@@ -0,0 +1,150 @@
+"""Hilo escritor único del proceso.
+
+Todas las escrituras de Database marcadas con @escritura, el vaciado del historial
+diferido (EscritorHistorial) y los lotes del archivo anual (ArchivoHistorial) se
+ejecutan en un solo hilo, de a uno: ya no compiten entre ventanas por el lock
+de SQLite y la interfaz puede pedirlas sin esperar (Database.escribir devuelve un
+Future; escritura_qt lo convierte en señales de Qt).
+
+Con carga, los trabajos que se juntan en la cola se confirman en una sola
+transacción (commit agrupado). Cada uno corre dentro de su propio SAVEPOINT (ver
+GestorConexiones.transaccion), así el error de uno no deshace a los demás.
+"""
+import functools
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from instancias import UnaPorBase
+
+_NADA = object()
+
+
+class EjecutorEscrituras(UnaPorBase):
+    """Cola de trabajos de escritura atendida por un único hilo"""
+
+    LOTE = 32
+
+    def __init__(self, gestor):
+        self.gestor = gestor
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.trabajos = 0
+
+    def en_hilo_escritor(self):
+        return threading.current_thread() is self._hilo
+
+    def enviar(self, funcion, *args, agrupar=True, **kwargs):
+        """Encola funcion(*args, **kwargs) y devuelve un Future con su resultado"""
+        futuro = Future()
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ciclo, name="EscritorDB", daemon=True)
+                self._hilo.start()
+            self._cola.put((futuro, funcion, args, kwargs, agrupar))
+        return futuro
+
+    def ejecutar(self, funcion, *args, agrupar=True, **kwargs):
+        """Como enviar() pero espera el resultado (y relanza su error).
+
+        Si el hilo actual es el escritor, o ya tiene una transacción abierta, se
+        ejecuta ahí mismo: mandarlo a la cola lo dejaría esperando un lock que tiene
+        quien llama."""
+        if self.en_hilo_escritor() or self.gestor.en_transaccion():
+            return funcion(*args, **kwargs)
+        return self.enviar(funcion, *args, agrupar=agrupar, **kwargs).result()
+
+    def _ciclo(self):
+        apartado = _NADA
+        while True:
+            trabajo = self._cola.get() if apartado is _NADA else apartado
+            apartado = _NADA
+            if trabajo is None:
+                return
+            trabajos = [trabajo]
+            # Lo que llegó mientras se confirmaba el lote anterior se confirma junto
+            while trabajo[4] and len(trabajos) < self.LOTE:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None or not siguiente[4]:
+                    # Va solo, en la próxima vuelta (sin perder su lugar en la cola)
+                    apartado = siguiente
+                    break
+                trabajos.append(siguiente)
+            if len(trabajos) == 1:
+                self._ejecutar(trabajos[0])
+            else:
+                self._ejecutar_lote(trabajos)
+            self.lotes += 1
+            self.trabajos += len(trabajos)
+
+    def _ejecutar(self, trabajo):
+        futuro, funcion, args, kwargs, _ = trabajo
+        if not futuro.set_running_or_notify_cancel():
+            return
+        try:
+            futuro.set_result(funcion(*args, **kwargs))
+        except BaseException as e:
+            futuro.set_exception(e)
+
+    def _ejecutar_lote(self, trabajos):
+        resultados = []
+        try:
+            with self.gestor.transaccion(inmediata=True):
+                for futuro, funcion, args, kwargs, _ in trabajos:
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        resultados.append((futuro, funcion(*args, **kwargs), None))
+                    except Exception as e:
+                        resultados.append((futuro, None, e))
+        except sqlite3.Error as e:
+            # No se pudo abrir o confirmar el lote: cada trabajo de nuevo, por separado,
+            # para que cada uno informe su propio resultado
+            print(f"Error confirmando lote de escrituras (se reintenta de a uno): {e}")
+            for futuro, funcion, args, kwargs, _ in trabajos:
+                if futuro.done():
+                    continue
+                try:
+                    futuro.set_result(funcion(*args, **kwargs))
+                except BaseException as error:
+                    futuro.set_exception(error)
+            return
+        # Recién confirmado: las cachés que se invalidaron antes del commit, de nuevo
+        self.gestor.marcar_escritura()
+        for futuro, valor, error in resultados:
+            if error is None:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(error)
+
+    def cerrar(self):
+        """Termina lo encolado y detiene el hilo"""
+        with self._lock:
+            hilo = self._hilo
+            if hilo is None or not hilo.is_alive():
+                return
+            self._cola.put(None)
+        if not self.en_hilo_escritor():
+            hilo.join()
+
+
+def escritura(metodo=None, agrupar=True):
+    """Marca un método de Database como escritura: corre en el hilo escritor.
+
+    Quien llama espera el resultado como antes (misma firma y mismos errores, ver
+    EjecutorEscrituras.ejecutar). agrupar=False para trabajos largos que manejan
+    sus propias transacciones."""
+    if metodo is None:
+        return functools.partial(escritura, agrupar=agrupar)
+
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        return self.escritor.ejecutar(metodo, self, *args, agrupar=agrupar, **kwargs)
+
+    envoltura.agrupar = agrupar
+    return envoltura
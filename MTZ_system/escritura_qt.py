@@ -0,0 +1,45 @@
+"""Puente entre EjecutorEscrituras y la interfaz: el resultado llega como señal de Qt.
+
+    EscrituraQt(self.db.escribir(self.db.renovar_socio, id_socio, plan, pases),
+                self, self.renovacion_terminada, self.renovacion_fallida)
+
+Las señales se emiten desde el hilo escritor y Qt las entrega en el hilo de la
+ventana (conexión encolada), así los slots pueden tocar widgets.
+"""
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class EscrituraQt(QObject):
+    terminado = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    def __init__(self, futuro, parent, al_terminar=None, al_fallar=None):
+        super().__init__(parent)
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        # A métodos de este objeto (no lambdas): así se ejecutan en el hilo de la ventana
+        self.terminado.connect(self._terminar)
+        self.error.connect(self._fallar)
+        # Recién con las señales conectadas: el futuro puede estar ya resuelto
+        futuro.add_done_callback(self._resuelto)
+
+    def _terminar(self, resultado):
+        if self.al_terminar:
+            self.al_terminar(resultado)
+        self.deleteLater()
+
+    def _fallar(self, mensaje):
+        print(f"Error en escritura: {mensaje}")
+        if self.al_fallar:
+            self.al_fallar(mensaje)
+        self.deleteLater()
+
+    def _resuelto(self, futuro):
+        error = futuro.exception()
+        try:
+            if error is None:
+                self.terminado.emit(futuro.result())
+            else:
+                self.error.emit(str(error))
+        except RuntimeError:
+            pass  # la ventana se cerró antes de que terminara la escritura
@@ -0,0 +1,67 @@
+"""Exportación de socios a CSV por lotes, sin cargar toda la tabla en memoria.
+
+Se usa desde Herramientas (en un hilo aparte) o sin interfaz:
+    python exportacion.py Socios.csv
+"""
+import csv
+import os
+import sys
+from database import Database
+
+LOTE_EXPORTACION = 1000
+BUFFER_ESCRITURA = 1 << 16  # 64 KB
+
+ENCABEZADO = ["Nombre", "Apellido", "DNI", "Plan", "Pases Restantes", "Vencimiento", "Activo"]
+
+
+def exportar_socios(db, archivo, progreso=None, cancelado=None, lote=LOTE_EXPORTACION):
+    """Escribe todos los socios en `archivo` (CSV con ';').
+
+    progreso(hechas, total) se llama después de cada lote; si cancelado() devuelve
+    True se corta y no queda ningún archivo. Devuelve la cantidad de filas
+    exportadas, o None si se canceló."""
+    temporal = archivo + ".parcial"
+    exportadas = 0
+    interrumpida = False
+    try:
+        # Una sola transacción de lectura: el CSV es una foto consistente y en WAL
+        # no frena a los kioscos que siguen escribiendo
+        with db.transaccion() as cursor, \
+                open(temporal, mode='w', newline='', encoding='utf-8-sig', buffering=BUFFER_ESCRITURA) as file:
+            cursor.execute("SELECT COUNT(*) FROM miembros")
+            total = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT m.nombre, m.apellido, m.dni, p.nombre, m.ingresos_restantes, m.fecha_vencimiento, m.activo
+                FROM miembros m
+                LEFT JOIN planes p ON m.plan_id = p.id
+            """)
+            writer = csv.writer(file, delimiter=';')
+            writer.writerow(ENCABEZADO)
+            while True:
+                if cancelado and cancelado():
+                    interrumpida = True
+                    break
+                filas = cursor.fetchmany(lote)
+                if not filas:
+                    break
+                writer.writerows(fila[:6] + ("SI" if fila[6] else "NO",) for fila in filas)
+                exportadas += len(filas)
+                if progreso:
+                    progreso(exportadas, total)
+        if interrumpida:
+            os.remove(temporal)
+            return None
+        os.replace(temporal, archivo)
+        return exportadas
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python exportacion.py archivo.csv")
+        sys.exit(1)
+    cantidad = exportar_socios(Database(), sys.argv[1])
+    print(f"{cantidad} socios exportados a {sys.argv[1]}")
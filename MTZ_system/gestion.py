@@ -1,12 +1,158 @@
 import sys
 from PyQt6.QtWidgets import (
     QWidget, QDialog, QVBoxLayout, QLineEdit, QPushButton,
-    QHBoxLayout, QTableWidget, QTableWidgetItem, 
+    QHBoxLayout, QTableView, QAbstractItemView,
     QHeaderView, QMessageBox, QLabel, QComboBox, 
     QSpinBox, QFormLayout, QAbstractSpinBox
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import (
+    Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal,
+    QAbstractTableModel, QModelIndex
+)
+from collections import OrderedDict
 from database import Database
+from escritura_qt import EscrituraQt
+
+# Espera entre teclas antes de buscar
+DEBOUNCE_BUSQUEDA_MS = 150
+# Filas por página y cuántas páginas se guardan en memoria a la vez
+TAM_PAGINA = 200
+MAX_PAGINAS_EN_MEMORIA = 10
+
+class ModeloSocios(QAbstractTableModel):
+    """Socios activos cargados por páginas a medida que se hace scroll.
+
+    Las páginas se piden con paginación por clave (valor de orden, id) y solo se
+    guardan MAX_PAGINAS_EN_MEMORIA; de las demás se recuerda la clave de su primera
+    fila para volver a pedirlas si se vuelve a ver esa zona."""
+    ENCABEZADOS = ["ID", "Nombre", "Apellido", "DNI", "Plan", "Pases"]
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.filtro = ""
+        self.orden = 0
+        self.descendente = True
+        self.paginas = OrderedDict()
+        self.claves = []
+        self.ultima_clave = None
+        self.total = 0
+        self.hay_mas = False
+
+    def clave(self, fila):
+        return (fila[self.orden], fila[0])
+
+    def pedir_pagina(self, clave=None, inclusivo=False, cancelado=None):
+        return self.db.pagina_socios(
+            self.filtro, TAM_PAGINA, self.orden, self.descendente,
+            clave=clave, inclusivo=inclusivo, cancelado=cancelado
+        )
+
+    def reiniciar(self, filtro, primera=None):
+        """Vuelve a la primera página; `primera` puede venir ya buscada en segundo plano"""
+        self.beginResetModel()
+        self.filtro = filtro
+        self.paginas.clear()
+        self.claves = []
+        self.ultima_clave = None
+        self.total = 0
+        if primera is None:
+            primera = self.pedir_pagina()
+        self.agregar_pagina(primera)
+        self.endResetModel()
+
+    def agregar_pagina(self, filas):
+        self.hay_mas = len(filas) == TAM_PAGINA
+        if not filas:
+            return
+        self.guardar_pagina(len(self.claves), filas)
+        self.claves.append(self.clave(filas[0]))
+        self.ultima_clave = self.clave(filas[-1])
+        self.total += len(filas)
+
+    def guardar_pagina(self, numero, filas):
+        self.paginas[numero] = filas
+        self.paginas.move_to_end(numero)
+        while len(self.paginas) > MAX_PAGINAS_EN_MEMORIA:
+            self.paginas.popitem(last=False)
+
+    def fila(self, row):
+        """Tupla (id, nombre, apellido, dni, plan, pases) de la fila, o None"""
+        if row < 0 or row >= self.total:
+            return None
+        numero = row // TAM_PAGINA
+        pagina = self.paginas.get(numero)
+        if pagina is None:
+            pagina = self.pedir_pagina(self.claves[numero], inclusivo=True)
+            self.guardar_pagina(numero, pagina)
+        else:
+            self.paginas.move_to_end(numero)
+        indice = row % TAM_PAGINA
+        return pagina[indice] if indice < len(pagina) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ENCABEZADOS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.hay_mas
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.hay_mas:
+            return
+        filas = self.pedir_pagina(self.ultima_clave)
+        if not filas:
+            self.hay_mas = False
+            return
+        self.beginInsertRows(QModelIndex(), self.total, self.total + len(filas) - 1)
+        self.agregar_pagina(filas)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            fila = self.fila(index.row())
+            return str(fila[index.column()]) if fila else None
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() in [3, 5]:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.ENCABEZADOS[section]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.orden = column
+        self.descendente = order == Qt.SortOrder.DescendingOrder
+        self.reiniciar(self.filtro)
+
+class SenalesBusqueda(QObject):
+    resultado = pyqtSignal(int, object)
+
+class TareaBusqueda(QRunnable):
+    """Busca la primera página en segundo plano; se cancela sola si llega una búsqueda más nueva"""
+    def __init__(self, ventana, ticket, filtro):
+        super().__init__()
+        self.ventana = ventana
+        self.ticket = ticket
+        self.filtro = filtro
+        self.senales = SenalesBusqueda()
+
+    def cancelada(self):
+        return self.ticket != self.ventana.ticket_busqueda
+
+    def run(self):
+        filas = None
+        modelo = self.ventana.modelo
+        if not self.cancelada():
+            filas = self.ventana.db.pagina_socios(
+                self.filtro, TAM_PAGINA, modelo.orden, modelo.descendente, cancelado=self.cancelada
+            )
+        self.senales.resultado.emit(self.ticket, filas)
 
 # --- LAS VENTANAS PEQUEÑAS SIGUEN SIENDO DIALOGOS (FLOTANTES) ---
 class VentanaEdicion(QDialog):
@@ -36,21 +182,21 @@ class VentanaEdicion(QDialog):
         self.input_dni = QLineEdit(dni)
         self.input_dni.setPlaceholderText("Solo números")
 
-        btn_guardar = QPushButton("GUARDAR CAMBIOS")
-        btn_guardar.setCursor(Qt.CursorShape.PointingHandCursor)
-        btn_guardar.setStyleSheet("""
+        self.btn_guardar = QPushButton("GUARDAR CAMBIOS")
+        self.btn_guardar.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_guardar.setStyleSheet("""
             QPushButton {
                 background-color: #f39c12; color: white; padding: 12px;
                 font-weight: bold; border-radius: 5px; border: none; margin-top: 15px;
             }
             QPushButton:hover { background-color: #e67e22; }
         """)
-        btn_guardar.clicked.connect(self.guardar_cambios)
+        self.btn_guardar.clicked.connect(self.guardar_cambios)
 
         layout.addRow("Nombre:", self.input_nombre)
         layout.addRow("Apellido:", self.input_apellido)
         layout.addRow("DNI:", self.input_dni)
-        layout.addRow("", btn_guardar)
+        layout.addRow("", self.btn_guardar)
 
         self.setLayout(layout)
 
@@ -63,7 +209,15 @@ class VentanaEdicion(QDialog):
             QMessageBox.warning(self, "Error", "Ningún campo puede quedar vacío.")
             return
 
-        exito = self.db.editar_socio(self.id_socio, nuevo_nombre, nuevo_apellido, nuevo_dni)
+        # La escritura va al hilo escritor; la ventana no se congela mientras tanto
+        self.btn_guardar.setEnabled(False)
+        EscrituraQt(
+            self.db.escribir(self.db.editar_socio, self.id_socio, nuevo_nombre, nuevo_apellido, nuevo_dni),
+            self, self.edicion_terminada, lambda _: self.edicion_terminada(False)
+        )
+
+    def edicion_terminada(self, exito):
+        self.btn_guardar.setEnabled(True)
         if exito:
             QMessageBox.information(self, "Éxito", "Datos actualizados correctamente.")
             self.accept()
@@ -102,20 +256,20 @@ class VentanaRenovacion(QDialog):
         self.spin_pases.setRange(0, 999)
         self.spin_pases.setButtonSymbols(QAbstractSpinBox.ButtonSymbols.NoButtons)
         
-        btn_confirmar = QPushButton("CONFIRMAR PAGO")
-        btn_confirmar.setCursor(Qt.CursorShape.PointingHandCursor)
-        btn_confirmar.setStyleSheet("""
+        self.btn_confirmar = QPushButton("CONFIRMAR PAGO")
+        self.btn_confirmar.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_confirmar.setStyleSheet("""
             QPushButton {
                 background-color: #27ae60; color: white; padding: 12px;
                 font-weight: bold; border-radius: 5px; border: none; margin-top: 15px;
             }
             QPushButton:hover { background-color: #2ecc71; }
         """)
-        btn_confirmar.clicked.connect(self.confirmar_renovacion)
+        self.btn_confirmar.clicked.connect(self.confirmar_renovacion)
 
         layout.addRow("Plan a Pagar:", self.combo_plan)
         layout.addRow("Sumar Pases:", self.spin_pases)
-        layout.addRow("", btn_confirmar)
+        layout.addRow("", self.btn_confirmar)
 
         self.setLayout(layout)
         self.actualizar_pases() 
@@ -134,7 +288,14 @@ class VentanaRenovacion(QDialog):
     def confirmar_renovacion(self):
         plan = self.combo_plan.currentText()
         pases = self.spin_pases.value()
-        exito = self.db.renovar_socio(self.id_socio, plan, pases)
+        self.btn_confirmar.setEnabled(False)
+        EscrituraQt(
+            self.db.escribir(self.db.renovar_socio, self.id_socio, plan, pases),
+            self, self.renovacion_terminada, lambda _: self.renovacion_terminada(False)
+        )
+
+    def renovacion_terminada(self, exito):
+        self.btn_confirmar.setEnabled(True)
         if exito:
             QMessageBox.information(self, "Pago Registrado", "La cuota se renovó correctamente.")
             self.accept()
@@ -143,7 +304,7 @@ class VentanaRenovacion(QDialog):
 
 #TABLA PRINCIPAL
 class VentanaGestion(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, db=None):
         super().__init__(parent)
         
         # Estilos adaptados para fondo CLARO (Panel blanco)
@@ -156,17 +317,17 @@ class VentanaGestion(QWidget):
             QPushButton {
                 padding: 8px 12px; border-radius: 4px; font-weight: bold; border: none;
             }
-            QTableWidget {
+            QTableView {
                 background-color: white; color: #333; gridline-color: #ccc;
                 border: 1px solid #ccc; font-size: 13px;
             }
             QHeaderView::section {
                 background-color: #eee; color: #333; padding: 5px; border: 1px solid #ccc;
             }
-            QTableWidget::item:selected { background-color: #3498db; color: white; }
+            QTableView::item:selected { background-color: #3498db; color: white; }
         """)
 
-        self.db = Database()
+        self.db = db or Database()
         layout = QVBoxLayout()
         layout.setContentsMargins(20, 20, 20, 20)
         layout.setSpacing(15)
@@ -180,7 +341,15 @@ class VentanaGestion(QWidget):
         layout_buscar = QHBoxLayout()
         self.input_buscar = QLineEdit()
         self.input_buscar.setPlaceholderText("Buscar por Nombre, Apellido o DNI...")
-        self.input_buscar.textChanged.connect(self.cargar_socios)
+        self.input_buscar.textChanged.connect(self.programar_busqueda)
+
+        self.ticket_busqueda = 0
+        self.busquedas = {}
+        self.pool_busqueda = QThreadPool(self)
+        self.pool_busqueda.setMaxThreadCount(1)
+        self.timer_busqueda = QTimer(self)
+        self.timer_busqueda.setSingleShot(True)
+        self.timer_busqueda.timeout.connect(self.lanzar_busqueda)
         
         btn_refrescar = QPushButton("🔄")
         btn_refrescar.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -193,13 +362,17 @@ class VentanaGestion(QWidget):
         layout.addLayout(layout_buscar)
 
         # Tabla
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(6)
-        self.tabla.setHorizontalHeaderLabels(["ID", "Nombre", "Apellido", "DNI", "Plan", "Pases"])
+        self.modelo = ModeloSocios(self.db, self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.tabla.verticalHeader().setDefaultSectionSize(28)
         self.tabla.setColumnHidden(0, True) 
-        self.tabla.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.tabla.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        # Orden inicial: los más nuevos primero (columna ID oculta)
+        self.tabla.horizontalHeader().setSortIndicator(0, Qt.SortOrder.DescendingOrder)
+        self.tabla.setSortingEnabled(True)
         layout.addWidget(self.tabla)
 
         # Botones
@@ -226,43 +399,40 @@ class VentanaGestion(QWidget):
         layout.addLayout(layout_botones)
 
         self.setLayout(layout)
-        self.cargar_socios()
+
+    def programar_busqueda(self):
+        # Invalida la búsqueda en curso ya mismo; la nueva sale cuando se deja de tipear
+        self.ticket_busqueda += 1
+        self.timer_busqueda.start(DEBOUNCE_BUSQUEDA_MS)
+
+    def lanzar_busqueda(self):
+        tarea = TareaBusqueda(self, self.ticket_busqueda, self.input_buscar.text())
+        tarea.senales.resultado.connect(self.busqueda_resuelta)
+        self.busquedas[tarea.ticket] = tarea
+        self.pool_busqueda.start(tarea)
+
+    def busqueda_resuelta(self, ticket, resultados):
+        self.busquedas.pop(ticket, None)
+        if resultados is not None and ticket == self.ticket_busqueda:
+            self.modelo.reiniciar(self.input_buscar.text(), resultados)
 
     def cargar_socios(self):
-        filtro = self.input_buscar.text().strip()
-        conn = self.db.conectar()
-        if conn:
-            cursor = conn.cursor()
-            sql = """
-                SELECT m.id, m.nombre, m.apellido, m.dni, p.nombre, m.ingresos_restantes 
-                FROM miembros m
-                LEFT JOIN planes p ON m.plan_id = p.id
-                WHERE m.activo = 1 AND (m.nombre LIKE ? OR m.apellido LIKE ? OR m.dni LIKE ?)
-                ORDER BY m.id DESC
-            """
-            param = f"%{filtro}%"
-            cursor.execute(sql, (param, param, param))
-            resultados = cursor.fetchall()
-            
-            self.tabla.setRowCount(0)
-            for row_idx, datos in enumerate(resultados):
-                self.tabla.insertRow(row_idx)
-                for col_idx, dato in enumerate(datos):
-                    item = QTableWidgetItem(str(dato))
-                    if col_idx in [3, 5]: 
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.tabla.setItem(row_idx, col_idx, item)
-            conn.close()
+        """Recarga inmediata (botón, después de editar/renovar/eliminar)"""
+        self.ticket_busqueda += 1
+        self.timer_busqueda.stop()
+        self.modelo.reiniciar(self.input_buscar.text())
+
+    def socio_seleccionado(self):
+        indice = self.tabla.currentIndex()
+        return self.modelo.fila(indice.row()) if indice.isValid() else None
 
     def accion_renovar(self):
-        fila = self.tabla.currentRow()
-        if fila == -1:
+        socio = self.socio_seleccionado()
+        if socio is None:
             QMessageBox.warning(self, "Atención", "Por favor, selecciona un socio de la tabla.")
             return
 
-        id_socio = self.tabla.item(fila, 0).text()
-        nombre = self.tabla.item(fila, 1).text()
-        apellido = self.tabla.item(fila, 2).text()
+        id_socio, nombre, apellido = socio[0], socio[1], socio[2]
 
         # Dialogo FLOTANTE (se mantiene QDialog)
         dialogo = VentanaRenovacion(id_socio, f"{nombre} {apellido}", self)
@@ -270,15 +440,12 @@ class VentanaGestion(QWidget):
             self.cargar_socios()
     
     def accion_editar(self):
-        fila = self.tabla.currentRow()
-        if fila == -1:
+        socio = self.socio_seleccionado()
+        if socio is None:
             QMessageBox.warning(self, "Atención", "Selecciona un socio para editar.")
             return
 
-        id_socio = self.tabla.item(fila, 0).text()
-        nombre = self.tabla.item(fila, 1).text()
-        apellido = self.tabla.item(fila, 2).text()
-        dni = self.tabla.item(fila, 3).text()
+        id_socio, nombre, apellido, dni = socio[0], socio[1], socio[2], socio[3]
 
         # Dialogo FLOTANTE (se mantiene QDialog)
         dialogo = VentanaEdicion(id_socio, nombre, apellido, dni, self)
@@ -286,14 +453,12 @@ class VentanaGestion(QWidget):
             self.cargar_socios()
 
     def accion_borrar(self):
-        fila = self.tabla.currentRow()
-        if fila == -1:
+        socio = self.socio_seleccionado()
+        if socio is None:
             QMessageBox.warning(self, "Atención", "Selecciona un socio para eliminar.")
             return
 
-        id_socio = self.tabla.item(fila, 0).text()
-        nombre = self.tabla.item(fila, 1).text()
-        apellido = self.tabla.item(fila, 2).text()
+        id_socio, nombre, apellido = socio[0], socio[1], socio[2]
 
         confirmacion = QMessageBox.question(
             self, "Confirmar Eliminación",
@@ -303,11 +468,17 @@ class VentanaGestion(QWidget):
         )
 
         if confirmacion == QMessageBox.StandardButton.Yes:
-            if self.db.eliminar_socio(id_socio):
-                QMessageBox.information(self, "Eliminado", "El socio ha sido eliminado correctamente.")
-                self.cargar_socios()
-            else:
-                QMessageBox.critical(self, "Error", "No se pudo eliminar al socio.")
+            EscrituraQt(
+                self.db.escribir(self.db.eliminar_socio, id_socio),
+                self, self.borrado_terminado, lambda _: self.borrado_terminado(False)
+            )
+
+    def borrado_terminado(self, exito):
+        if exito:
+            QMessageBox.information(self, "Eliminado", "El socio ha sido eliminado correctamente.")
+            self.cargar_socios()
+        else:
+            QMessageBox.critical(self, "Error", "No se pudo eliminar al socio.")
 
 if __name__ == "__main__":
     app = sys.modules.get('PyQt6.QtWidgets').QApplication(sys.argv)
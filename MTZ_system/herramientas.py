@@ -1,23 +1,108 @@
 import sys
-import csv
-import shutil
 import os
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QPushButton, QLabel, 
-    QMessageBox, QFileDialog, QFrame, QApplication
+    QMessageBox, QFileDialog, QFrame, QApplication, QProgressDialog,
+    QTableWidget, QTableWidgetItem, QHeaderView, QHBoxLayout
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 from database import Database
+from exportacion import exportar_socios
+from respaldo import crear_respaldo, describir_respaldo
+from importacion import importar_socios, describir_importacion
+from escritura_qt import EscrituraQt
+
+class SenalesOperacion(QObject):
+    progreso = pyqtSignal(int, int)
+    terminado = pyqtSignal(object)  # resultado de la operación (None si se canceló)
+    error = pyqtSignal(str)
+
+class TareaExportacion(QRunnable):
+    """Exporta el CSV fuera del hilo de la interfaz"""
+    def __init__(self, db, archivo):
+        super().__init__()
+        self.db = db
+        self.archivo = archivo
+        self.cancelar = False
+        self.senales = SenalesOperacion()
+
+    def run(self):
+        try:
+            cantidad = exportar_socios(
+                self.db, self.archivo,
+                progreso=self.senales.progreso.emit,
+                cancelado=lambda: self.cancelar,
+            )
+        except Exception as e:
+            self.senales.error.emit(str(e))
+            return
+        self.senales.terminado.emit(cantidad)
+
+class TareaImportacion(QRunnable):
+    """Importa el CSV de socios en segundo plano"""
+    def __init__(self, db, archivo):
+        super().__init__()
+        self.db = db
+        self.archivo = archivo
+        self.senales = SenalesOperacion()
+
+    def run(self):
+        try:
+            resultado = importar_socios(self.db, self.archivo, progreso=lambda lineas: self.senales.progreso.emit(lineas, 0))
+        except Exception as e:
+            self.senales.error.emit(str(e))
+            return
+        self.senales.terminado.emit(resultado)
+
+class TareaArchivo(QRunnable):
+    """Mueve el historial viejo a los archivos anuales en segundo plano"""
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.cancelar = False
+        self.senales = SenalesOperacion()
+
+    def run(self):
+        try:
+            self.db.historial.vaciar()
+            # Primero al resumen de asistencia: lo que se archiva ya tiene que estar contado
+            self.db.actualizar_asistencia()
+            movidas = self.db.archivo.archivar(
+                progreso=self.senales.progreso.emit, cancelado=lambda: self.cancelar
+            )
+        except Exception as e:
+            self.senales.error.emit(str(e))
+            return
+        self.senales.terminado.emit(movidas)
+
+class TareaRespaldo(QRunnable):
+    """Respaldo con la API de backup en segundo plano"""
+    def __init__(self, db, destino):
+        super().__init__()
+        self.db = db
+        self.destino = destino
+        self.senales = SenalesOperacion()
+
+    def run(self):
+        try:
+            resultado = crear_respaldo(self.db, self.destino, progreso=self.senales.progreso.emit)
+        except Exception as e:
+            self.senales.error.emit(str(e))
+            return
+        self.senales.terminado.emit(resultado)
 
 class VentanaHerramientas(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Herramientas del Sistema")
-        self.setFixedSize(450, 400)
+        self.setFixedSize(450, 680)
         self.setStyleSheet("background-color: #f0f0f0;")
         
         self.db = Database()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.tarea = None
         
         layout = QVBoxLayout()
         layout.setContentsMargins(30, 30, 30, 30)
@@ -36,12 +121,38 @@ class VentanaHerramientas(QDialog):
         btn_csv.clicked.connect(self.exportar_socios)
         layout.addWidget(btn_csv)
 
+        btn_importar = QPushButton("  📥 Importar Socios desde CSV")
+        btn_importar.setStyleSheet(self.estilo_boton("#e67e22"))
+        btn_importar.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_importar.clicked.connect(self.importar_socios)
+        layout.addWidget(btn_importar)
+
         # --- SECCIÓN 2: BACKUP ---
         btn_backup = QPushButton("  💾 Crear Respaldo de Base de Datos")
         btn_backup.setStyleSheet(self.estilo_boton("#27ae60"))
         btn_backup.setCursor(Qt.CursorShape.PointingHandCursor)
         btn_backup.clicked.connect(self.crear_backup)
         layout.addWidget(btn_backup)
+
+        btn_archivo = QPushButton("  🗄 Archivar Historial Antiguo")
+        btn_archivo.setStyleSheet(self.estilo_boton("#16a085"))
+        btn_archivo.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_archivo.clicked.connect(self.archivar_historial)
+        layout.addWidget(btn_archivo)
+
+        # --- SECCIÓN 3: CONTADORES DEL DASHBOARD ---
+        btn_contadores = QPushButton("  🔢 Verificar Contadores del Dashboard")
+        btn_contadores.setStyleSheet(self.estilo_boton("#8e44ad"))
+        btn_contadores.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_contadores.clicked.connect(self.verificar_contadores)
+        layout.addWidget(btn_contadores)
+
+        # --- SECCIÓN 4: RENDIMIENTO SQL ---
+        btn_sql = QPushButton("  ⏱ Ver Consultas SQL (tiempos)")
+        btn_sql.setStyleSheet(self.estilo_boton("#34495e"))
+        btn_sql.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_sql.clicked.connect(self.ver_consultas_sql)
+        layout.addWidget(btn_sql)
         
         # Texto de ayuda
         lbl_info = QLabel("Estas herramientas generan archivos externos.\nGuárdalos en una ubicación segura.")
@@ -74,27 +185,77 @@ class VentanaHerramientas(QDialog):
         archivo, _ = QFileDialog.getSaveFileName(self, "Guardar Lista de Socios", nombre_default, "Archivos CSV (*.csv)")
         
         if not archivo: return
+        if self.tarea is not None:
+            QMessageBox.warning(self, "Atención", "Ya hay una operación en curso.")
+            return
 
-        conn = self.db.conectar()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT m.nombre, m.apellido, m.dni, p.nombre, m.ingresos_restantes, m.fecha_vencimiento, m.activo
-            FROM miembros m
-            LEFT JOIN planes p ON m.plan_id = p.id
-        """)
-        datos = cursor.fetchall()
-        conn.close()
+        self.progreso = QProgressDialog("Exportando socios...", "Cancelar", 0, 0, self)
+        self.progreso.setWindowTitle("Exportar")
+        self.progreso.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progreso.setMinimumDuration(0)
 
-        try:
-            with open(archivo, mode='w', newline='', encoding='utf-8-sig') as file:
-                writer = csv.writer(file, delimiter=';')
-                writer.writerow(["Nombre", "Apellido", "DNI", "Plan", "Pases Restantes", "Vencimiento", "Activo"])
-                for fila in datos:
-                    estado = "SI" if fila[6] else "NO"
-                    writer.writerow([fila[0], fila[1], fila[2], fila[3], fila[4], fila[5], estado])
-            QMessageBox.information(self, "Éxito", "La lista se exportó correctamente.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"No se pudo guardar.\nError: {e}")
+        self.tarea = TareaExportacion(self.db, archivo)
+        self.tarea.senales.progreso.connect(self.exportacion_avanzo)
+        self.tarea.senales.terminado.connect(self.exportacion_terminada)
+        self.tarea.senales.error.connect(self.exportacion_fallida)
+        self.progreso.canceled.connect(self.cancelar_exportacion)
+        self.pool.start(self.tarea)
+
+    def exportacion_avanzo(self, hechas, total):
+        self.progreso.setMaximum(total)
+        self.progreso.setValue(hechas)
+        self.progreso.setLabelText(f"Exportando socios... {hechas} de {total}")
+
+    def cancelar_exportacion(self):
+        if isinstance(self.tarea, (TareaExportacion, TareaArchivo)):
+            self.tarea.cancelar = True
+
+    def exportacion_terminada(self, cantidad):
+        self.tarea = None
+        self.progreso.reset()
+        if cantidad is None:
+            QMessageBox.information(self, "Cancelado", "La exportación se canceló.")
+        else:
+            QMessageBox.information(self, "Éxito", f"La lista se exportó correctamente ({cantidad} socios).")
+
+    def exportacion_fallida(self, mensaje):
+        self.tarea = None
+        self.progreso.reset()
+        QMessageBox.critical(self, "Error", f"No se pudo guardar.\nError: {mensaje}")
+
+    def importar_socios(self):
+        archivo, _ = QFileDialog.getOpenFileName(self, "Importar Lista de Socios", "", "Archivos CSV (*.csv)")
+
+        if not archivo: return
+        if self.tarea is not None:
+            QMessageBox.warning(self, "Atención", "Ya hay una operación en curso.")
+            return
+
+        self.progreso = QProgressDialog("Leyendo archivo...", None, 0, 0, self)
+        self.progreso.setWindowTitle("Importar")
+        self.progreso.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progreso.setMinimumDuration(0)
+
+        self.tarea = TareaImportacion(self.db, archivo)
+        self.tarea.senales.progreso.connect(
+            lambda lineas, _: self.progreso.setLabelText(f"Leyendo archivo... {lineas} líneas")
+        )
+        self.tarea.senales.terminado.connect(self.importacion_terminada)
+        self.tarea.senales.error.connect(self.importacion_fallida)
+        self.pool.start(self.tarea)
+
+    def importacion_terminada(self, resultado):
+        self.tarea = None
+        self.progreso.reset()
+        if resultado["errores"]:
+            QMessageBox.warning(self, "Importación con errores", describir_importacion(resultado))
+        else:
+            QMessageBox.information(self, "Éxito", describir_importacion(resultado))
+
+    def importacion_fallida(self, mensaje):
+        self.tarea = None
+        self.progreso.reset()
+        QMessageBox.critical(self, "Error", f"No se pudo importar.\nError: {mensaje}")
 
     def crear_backup(self):
         ruta_db_original = self.db.db_path
@@ -104,15 +265,163 @@ class VentanaHerramientas(QDialog):
 
         fecha = datetime.now().strftime("%Y-%m-%d")
         nombre_default = f"Respaldo_MTZ_{fecha}.db"
-        archivo_destino, _ = QFileDialog.getSaveFileName(self, "Guardar Copia de Seguridad", nombre_default, "Archivos DB (*.db)")
+        archivo_destino, _ = QFileDialog.getSaveFileName(
+            self, "Guardar Copia de Seguridad", nombre_default,
+            "Archivos DB (*.db);;Comprimido (*.db.gz)"
+        )
         
         if not archivo_destino: return
+        if self.tarea is not None:
+            QMessageBox.warning(self, "Atención", "Ya hay una operación en curso.")
+            return
 
-        try:
-            shutil.copy2(ruta_db_original, archivo_destino)
-            QMessageBox.information(self, "Respaldo Creado", "Copia de seguridad exitosa.")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Falló la copia de seguridad.\nError: {e}")
+        self.progreso = QProgressDialog("Copiando base de datos...", None, 0, 0, self)
+        self.progreso.setWindowTitle("Respaldo")
+        self.progreso.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progreso.setMinimumDuration(0)
+
+        self.tarea = TareaRespaldo(self.db, archivo_destino)
+        self.tarea.senales.progreso.connect(self.mostrar_avance)
+        self.tarea.senales.terminado.connect(self.respaldo_terminado)
+        self.tarea.senales.error.connect(self.respaldo_fallido)
+        self.pool.start(self.tarea)
+
+    def mostrar_avance(self, copiadas, total):
+        self.progreso.setMaximum(total)
+        self.progreso.setValue(copiadas)
+
+    def respaldo_terminado(self, resultado):
+        self.tarea = None
+        self.progreso.reset()
+        QMessageBox.information(self, "Respaldo Creado", f"Copia de seguridad exitosa.\n{describir_respaldo(resultado)}")
+
+    def respaldo_fallido(self, mensaje):
+        self.tarea = None
+        self.progreso.reset()
+        QMessageBox.critical(self, "Error", f"Falló la copia de seguridad.\nError: {mensaje}")
+
+    def archivar_historial(self):
+        if self.tarea is not None:
+            QMessageBox.warning(self, "Atención", "Ya hay una operación en curso.")
+            return
+        meses = self.db.archivo.meses
+        confirmacion = QMessageBox.question(
+            self, "Archivar Historial",
+            f"Se moverán a archivos anuales los accesos de más de {meses} meses.\n"
+            "Se siguen viendo en el Historial. ¿Continuar?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes
+        )
+        if confirmacion != QMessageBox.StandardButton.Yes:
+            return
+
+        self.progreso = QProgressDialog("Archivando historial...", "Detener", 0, 0, self)
+        self.progreso.setWindowTitle("Archivar")
+        self.progreso.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progreso.setMinimumDuration(0)
+
+        self.tarea = TareaArchivo(self.db)
+        self.tarea.senales.progreso.connect(self.mostrar_avance)
+        self.tarea.senales.terminado.connect(self.archivo_terminado)
+        self.tarea.senales.error.connect(self.archivo_fallido)
+        self.progreso.canceled.connect(self.cancelar_exportacion)
+        self.pool.start(self.tarea)
+
+    def archivo_terminado(self, movidas):
+        self.tarea = None
+        self.progreso.reset()
+        QMessageBox.information(
+            self, "Historial Archivado",
+            f"{movidas} accesos movidos a {self.db.archivo.directorio}"
+        )
+
+    def archivo_fallido(self, mensaje):
+        self.tarea = None
+        self.progreso.reset()
+        QMessageBox.critical(self, "Error", f"No se pudo archivar.\nError: {mensaje}")
+
+    def verificar_contadores(self):
+        EscrituraQt(
+            self.db.escribir(self.db.verificar_estadisticas),
+            self, self.contadores_verificados, self.verificacion_fallida
+        )
+
+    def verificacion_fallida(self, mensaje):
+        QMessageBox.critical(self, "Error", f"No se pudieron verificar los contadores.\nError: {mensaje}")
+
+    def contadores_verificados(self, correctos):
+        if correctos:
+            QMessageBox.information(self, "Contadores", "Los contadores están al día.")
+        else:
+            QMessageBox.warning(self, "Contadores", "Había diferencias: los contadores se recalcularon desde cero.")
+
+    def closeEvent(self, event):
+        # No dejar el hilo escribiendo un archivo a medias al cerrar
+        self.cancelar_exportacion()
+        self.pool.waitForDone()
+        super().closeEvent(event)
+
+    def ver_consultas_sql(self):
+        VentanaPerfilSQL(self.db.perfil, self).exec()
+
+class VentanaPerfilSQL(QDialog):
+    """Tabla de sentencias SQL de este proceso: veces, tiempo total, promedio y máximo"""
+    def __init__(self, perfil, parent=None):
+        super().__init__(parent)
+        self.perfil = perfil
+        self.setWindowTitle("Consultas SQL")
+        self.resize(900, 500)
+
+        layout = QVBoxLayout()
+        self.lbl_estado = QLabel()
+        layout.addWidget(self.lbl_estado)
+
+        self.tabla = QTableWidget(0, 5)
+        self.tabla.setHorizontalHeaderLabels(["Sentencia", "Veces", "Total (ms)", "Promedio (ms)", "Máx (ms)"])
+        self.tabla.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tabla.setWordWrap(False)
+        layout.addWidget(self.tabla)
+
+        botones = QHBoxLayout()
+        self.btn_activar = QPushButton()
+        self.btn_activar.clicked.connect(self.alternar)
+        btn_reiniciar = QPushButton("Reiniciar")
+        btn_reiniciar.clicked.connect(self.reiniciar)
+        btn_actualizar = QPushButton("Actualizar")
+        btn_actualizar.clicked.connect(self.cargar)
+        botones.addWidget(self.btn_activar)
+        botones.addWidget(btn_reiniciar)
+        botones.addStretch()
+        botones.addWidget(btn_actualizar)
+        layout.addLayout(botones)
+        self.setLayout(layout)
+        self.cargar()
+
+    def cargar(self):
+        estado = "activa" if self.perfil.activo else "apagada"
+        self.lbl_estado.setText(
+            f"Medición {estado}. Consultas de más de {self.perfil.umbral_ms:.0f} ms: {self.perfil.ruta_log}"
+        )
+        self.btn_activar.setText("Detener medición" if self.perfil.activo else "Iniciar medición")
+        filas = self.perfil.tabla()
+        self.tabla.setRowCount(len(filas))
+        for i, (sql, veces, total, promedio, maximo) in enumerate(filas):
+            item_sql = QTableWidgetItem(sql)
+            item_sql.setToolTip(sql)
+            self.tabla.setItem(i, 0, item_sql)
+            for j, valor in enumerate([f"{veces}", f"{total:.1f}", f"{promedio:.2f}", f"{maximo:.1f}"], start=1):
+                item = QTableWidgetItem(valor)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.tabla.setItem(i, j, item)
+
+    def alternar(self):
+        self.perfil.activar(not self.perfil.activo)
+        self.cargar()
+
+    def reiniciar(self):
+        self.perfil.reiniciar()
+        self.cargar()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,153 @@
+import os
+import glob
+import json
+import threading
+import sqlite3
+import time
+from escritor_db import EjecutorEscrituras
+from instancias import UnaPorBase
+from diarios import bloquear, leer_diario
+
+
+class EscritorHistorial(UnaPorBase):
+    """Escritura diferida de historial_acceso.
+
+    Los registros se juntan en memoria y se insertan en una sola transacción cada
+    LOTE registros o cada INTERVALO_MS. Mientras tanto quedan en un diario de solo
+    agregado (una línea JSON por registro) para no perderlos si el programa se cae;
+    recuperar() los inserta al próximo arranque. La tabla bitacora_aplicada guarda
+    hasta qué número de secuencia de cada diario ya está en la base, así la
+    recuperación nunca duplica filas."""
+
+    LOTE = 50
+    INTERVALO_MS = 1000
+
+    def __init__(self, gestor):
+        self.gestor = gestor
+        self.directorio = gestor.db_path + "-bitacora"
+        self.nombre = f"{os.getpid()}-{int(time.time() * 1000)}.jsonl"
+        self._pendientes = []
+        self._seq = 0
+        self._diario = None
+        self._hilo = None
+        self._detener = threading.Event()
+        self._despertar = threading.Event()
+        self._lock = threading.Lock()
+        self._lock_vaciado = threading.Lock()
+
+    def _abrir_diario(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        self._diario = open(os.path.join(self.directorio, self.nombre), "a+", encoding="utf-8")
+        bloquear(self._diario)
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name="EscritorHistorial", daemon=True)
+        self._hilo.start()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.INTERVALO_MS / 1000)
+            self._despertar.clear()
+            self.vaciar()
+
+    def registrar(self, miembro_id, fecha_hora, tipo_acceso):
+        with self._lock:
+            if self._diario is None:
+                self._abrir_diario()
+            self._seq += 1
+            registro = (self._seq, miembro_id, fecha_hora, tipo_acceso)
+            self._diario.write(json.dumps(registro) + "\n")
+            self._diario.flush()
+            # Sin fsync un corte de luz puede perder lo que el sistema no bajó a disco
+            os.fsync(self._diario.fileno())
+            self._pendientes.append(registro)
+            if len(self._pendientes) >= self.LOTE:
+                # Lo inserta el hilo propio, nunca dentro de la transacción de quien llama
+                self._despertar.set()
+
+    def vaciar(self):
+        """Inserta lo pendiente en una transacción. Devuelve la cantidad escrita.
+
+        La escritura corre en el hilo escritor del proceso (EjecutorEscrituras),
+        nunca en paralelo con las demás escrituras."""
+        with self._lock_vaciado:
+            with self._lock:
+                lote = self._pendientes
+                self._pendientes = []
+            if not lote:
+                return 0
+            try:
+                EjecutorEscrituras.obtener(self.gestor).ejecutar(self._insertar, lote)
+            except sqlite3.Error as e:
+                print(f"Error guardando historial (se reintenta): {e}")
+                with self._lock:
+                    self._pendientes = lote + self._pendientes
+                return 0
+
+            with self._lock:
+                # Si no llegó nada nuevo mientras escribíamos, el diario ya no hace falta
+                if not self._pendientes:
+                    self._diario.seek(0)
+                    self._diario.truncate()
+            return len(lote)
+
+    def _insertar(self, lote):
+        with self.gestor.transaccion() as cursor:
+            cursor.executemany(
+                "INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)",
+                [registro[1:] for registro in lote],
+            )
+            cursor.execute(
+                "INSERT OR REPLACE INTO bitacora_aplicada (archivo, ultimo_seq) VALUES (?, ?)",
+                (self.nombre, lote[-1][0]),
+            )
+
+    def cerrar(self):
+        """Vacía lo pendiente y borra el diario; si la base no responde, el diario queda para recuperar()"""
+        self._detener.set()
+        self._despertar.set()
+        self.vaciar()
+        with self._lock:
+            if self._diario is None or self._pendientes:
+                return
+            self._diario.close()
+            self._diario = None
+            try:
+                EjecutorEscrituras.obtener(self.gestor).ejecutar(self._olvidar, self.nombre)
+                os.remove(os.path.join(self.directorio, self.nombre))
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error cerrando diario de historial: {e}")
+
+    def _olvidar(self, archivo):
+        with self.gestor.transaccion() as cursor:
+            cursor.execute("DELETE FROM bitacora_aplicada WHERE archivo = ?", (archivo,))
+
+    def _aplicar_diario(self, archivo, registros):
+        with self.gestor.transaccion(inmediata=True) as cursor:
+            cursor.execute("SELECT ultimo_seq FROM bitacora_aplicada WHERE archivo = ?", (archivo,))
+            fila = cursor.fetchone()
+            ultimo = fila[0] if fila else 0
+            faltantes = [r[1:] for r in registros if r[0] > ultimo]
+            cursor.executemany(
+                "INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)",
+                faltantes,
+            )
+            cursor.execute("DELETE FROM bitacora_aplicada WHERE archivo = ?", (archivo,))
+        return len(faltantes)
+
+    def recuperar(self):
+        """Inserta los diarios que dejaron procesos que ya no están (caída, corte de luz)"""
+        recuperados = 0
+        for ruta in glob.glob(os.path.join(self.directorio, "*.jsonl")):
+            archivo = os.path.basename(ruta)
+            if archivo == self.nombre:
+                continue
+            with open(ruta, "r+", encoding="utf-8") as diario:
+                if not bloquear(diario):
+                    continue  # sigue abierto por otro kiosco
+                diario.seek(0)
+                registros = leer_diario(diario)
+                recuperados += EjecutorEscrituras.obtener(self.gestor).ejecutar(
+                    self._aplicar_diario, archivo, registros, agrupar=False
+                )
+            os.remove(ruta)
+        return recuperados
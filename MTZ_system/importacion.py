@@ -0,0 +1,113 @@
+"""Importación masiva de socios desde el CSV que genera la exportación (separado por ';').
+
+Columnas: Nombre;Apellido;DNI;Plan;Pases Restantes;Vencimiento;Activo
+Si el DNI ya existe se actualiza (y se reactiva si estaba dado de baja); si no, se da
+de alta. Vencimiento vacío = sin vencimiento (así lo escribe la exportación); para un
+socio que ya existe conserva el que tenía. Todo se escribe en una sola transacción.
+Sin interfaz:
+    python importacion.py Socios.csv
+"""
+import csv
+import sys
+from datetime import datetime
+from database import Database
+
+AVISO_PROGRESO = 1000
+
+
+def _leer_filas(archivo, planes, errores, progreso=None):
+    """Valida el archivo y devuelve las filas listas para Database.importar_socios"""
+    filas = []
+    lineas_por_dni = {}
+    with open(archivo, newline='', encoding='utf-8-sig') as file:
+        lector = csv.reader(file, delimiter=';')
+        encabezado = next(lector, None)
+        if not encabezado or encabezado[0].strip().lower() != "nombre":
+            errores.append((1, "Falta el encabezado (Nombre;Apellido;DNI;Plan;...)"))
+            return filas
+        for fila in lector:
+            linea = lector.line_num
+            if progreso and linea % AVISO_PROGRESO == 0:
+                progreso(linea)
+            if not any(c.strip() for c in fila):
+                continue
+            if len(fila) < 5:
+                errores.append((linea, "Faltan columnas"))
+                continue
+            nombre, apellido, dni, plan = (c.strip() for c in fila[:4])
+            pases = fila[4].strip()
+            vencimiento = fila[5].strip() if len(fila) > 5 else ""
+            activo = fila[6].strip().upper() if len(fila) > 6 else "SI"
+
+            if not nombre or not apellido or not dni:
+                errores.append((linea, "Nombre, apellido y DNI son obligatorios"))
+                continue
+            if dni in lineas_por_dni:
+                errores.append((linea, f"DNI {dni} repetido (ya está en la línea {lineas_por_dni[dni]})"))
+                continue
+            # Celda vacía = socio sin plan (así la escribe la exportación)
+            plan_id = planes.get(plan) if plan else None
+            if plan and plan_id is None:
+                errores.append((linea, f"Plan desconocido: '{plan}'"))
+                continue
+            try:
+                pases = int(pases or 0)
+                if pases < 0:
+                    raise ValueError
+            except ValueError:
+                errores.append((linea, f"Pases inválidos: '{fila[4]}'"))
+                continue
+            if vencimiento:
+                try:
+                    datetime.strptime(vencimiento, '%Y-%m-%d')
+                except ValueError:
+                    errores.append((linea, f"Vencimiento inválido (AAAA-MM-DD): '{vencimiento}'"))
+                    continue
+            else:
+                vencimiento = None
+            if activo not in ("SI", "NO"):
+                errores.append((linea, f"Activo debe ser SI o NO: '{activo}'"))
+                continue
+
+            lineas_por_dni[dni] = linea
+            filas.append((nombre, apellido, dni, plan_id, pases, vencimiento, 1 if activo == "SI" else 0))
+    return filas
+
+
+def importar_socios(db, archivo, progreso=None):
+    """Importa el CSV. Devuelve un dict con nuevos, actualizados, reactivados y
+    errores (lista de (línea, motivo) de las filas que no se importaron).
+    progreso(lineas_leidas) se llama cada AVISO_PROGRESO líneas."""
+    planes = {nombre: plan[0] for nombre, plan in db.planes.foto().por_nombre.items()}
+
+    errores = []
+    filas = _leer_filas(archivo, planes, errores, progreso)
+    nuevos, actualizados, reactivados = db.importar_socios(filas) if filas else (0, 0, 0)
+    return {
+        "nuevos": nuevos,
+        "actualizados": actualizados,
+        "reactivados": reactivados,
+        "errores": errores,
+    }
+
+
+def describir_importacion(resultado, max_errores=10):
+    texto = (
+        f"Nuevos: {resultado['nuevos']}  Actualizados: {resultado['actualizados']}  "
+        f"Reactivados: {resultado['reactivados']}  Con errores: {len(resultado['errores'])}"
+    )
+    for linea, motivo in resultado["errores"][:max_errores]:
+        texto += f"\nLínea {linea}: {motivo}"
+    if len(resultado["errores"]) > max_errores:
+        texto += f"\n... y {len(resultado['errores']) - max_errores} más"
+    return texto
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python importacion.py archivo.csv")
+        sys.exit(1)
+    db = Database()
+    db.crear_tablas()
+    resultado = importar_socios(db, sys.argv[1])
+    print(describir_importacion(resultado, max_errores=len(resultado["errores"])))
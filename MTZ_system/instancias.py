@@ -0,0 +1,40 @@
+"""Una instancia por archivo de base de datos en todo el proceso.
+
+Gestor de conexiones, hilo escritor, historial diferido, caché de escaneos, perfil
+SQL, archivo, catálogo de planes y métricas se comparten entre todas las ventanas
+que abren la misma base: Database pide cada uno con Clase.obtener(...).
+"""
+import threading
+
+
+class UnaPorBase:
+    """Mixin: obtener(fuente) devuelve la instancia única del proceso para esa base.
+
+    fuente es lo que recibe el constructor: la ruta de la base o un objeto con
+    db_path (GestorConexiones, Database). Cada subclase lleva su propio registro."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._instancias = {}
+        cls._lock_instancias = threading.Lock()
+
+    @classmethod
+    def _crear(cls, fuente):
+        return cls(fuente)
+
+    @classmethod
+    def obtener(cls, fuente):
+        clave = fuente if isinstance(fuente, str) else fuente.db_path
+        with cls._lock_instancias:
+            instancia = cls._instancias.get(clave)
+            if instancia is None:
+                instancia = cls._crear(fuente)
+                cls._instancias[clave] = instancia
+            return instancia
+
+    @classmethod
+    def cerrar_todos(cls):
+        """Llama a cerrar() de cada instancia (para las clases que lo tienen)"""
+        with cls._lock_instancias:
+            for instancia in cls._instancias.values():
+                instancia.cerrar()
@@ -0,0 +1,344 @@
+"""Kiosco que sigue funcionando sin la base principal.
+
+El kiosco guarda en su disco una foto compacta del estado de los socios (DNI, plan,
+pases, vencimiento) y la mantiene al día de a partes con el número de cambio de
+miembros (migración 11). Si la base no responde (carpeta compartida caída, PC de
+administración reiniciándose) decide el acceso con la foto y anota cada escaneo en
+un diario local de solo agregado; cuando la base vuelve, el diario se aplica con
+Database.aplicar_ingresos_offline, que ignora los registros ya aplicados.
+
+La foto vive en un dict en memoria (búsqueda O(1) por DNI) respaldado por un
+SQLite local, así sobrevive a un reinicio del kiosco. Foto y diario van en el disco
+de cada PC (no en la carpeta compartida de la base, que es justo la que se cae) y
+cada kiosco anota en su propio diario.
+"""
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from diarios import bloquear, leer_diario
+
+
+def _directorio_programa():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def _directorio_local(db_path):
+    """Carpeta de datos locales de esta PC (LOCALAPPDATA en Windows), una por base"""
+    if os.environ.get("MTZ_DIR_KIOSCO"):
+        return os.environ["MTZ_DIR_KIOSCO"]
+    datos = (
+        os.environ.get("LOCALAPPDATA")
+        or os.environ.get("XDG_DATA_HOME")
+        or os.path.join(os.path.expanduser("~"), ".local", "share")
+    )
+    clave = hashlib.sha1(os.path.abspath(db_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(datos, "MTZ", "kiosco", clave)
+
+
+class KioscoOffline:
+    """Mismo contrato que Database.registrar_ingreso, con foto local y diario de respaldo.
+
+    Se usa siempre desde un mismo hilo (el pool de un hilo del monitor), que también
+    corre sincronizar(): así foto, diario y base nunca se pisan."""
+
+    REINTENTO_S = 15.0
+    LOTE_FOTO = 5000
+    LOTE_DIARIO = 500
+
+    def __init__(self, db, directorio=None):
+        self.db = db
+        self.directorio = directorio or _directorio_local(db.db_path)
+        self._traer_anterior = directorio is None and not os.environ.get("MTZ_DIR_KIOSCO")
+        # Diario propio de este kiosco, bloqueado mientras está abierto: el de un kiosco
+        # que ya no está (caída, cierre con pendientes) lo aplica el próximo que arranque
+        self.ruta_diario = os.path.join(self.directorio, f"diario-{uuid.uuid4().hex[:12]}.jsonl")
+        self._diario = None
+        self._ajenos = False
+        self.sin_conexion = False
+        self._reintentar_en = 0.0
+        self._lock = threading.Lock()
+
+        # Foto local (SQLite) y, en memoria, dni -> [id, nombre, apellido, plan, ingresos,
+        # vencimiento]; id -> dni. Se abren recién al primer uso, en el hilo de los
+        # escaneos y no al abrir la ventana; cerrar() las suelta y el próximo uso las reabre
+        self._local = None
+        self._socios = None
+        self._dni_de = None
+        self.ultimo_cambio = 0
+
+    def _abrir_local(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        self._local = sqlite3.connect(os.path.join(self.directorio, "socios.db"), check_same_thread=False)
+        self._local.execute("PRAGMA journal_mode=WAL")
+        self._local.execute("PRAGMA synchronous=NORMAL")
+        self._local.execute('''
+            CREATE TABLE IF NOT EXISTS socios (
+                id INTEGER PRIMARY KEY,
+                dni TEXT NOT NULL,
+                nombre TEXT, apellido TEXT, plan TEXT,
+                ingresos INTEGER, vencimiento TEXT
+            )
+        ''')
+        self._local.execute("CREATE TABLE IF NOT EXISTS estado (clave TEXT PRIMARY KEY, valor)")
+        self._local.commit()
+        if self._traer_anterior:
+            self._traer_anterior = False
+            self._traer_diario_anterior()
+        self._ajenos = bool(self._diarios_ajenos())
+
+    def _traer_diario_anterior(self):
+        """Las versiones anteriores anotaban en kiosco_local/, junto al programa: lo
+        pendiente pasa a esta carpeta como el diario de un kiosco cerrado"""
+        ruta = os.path.join(_directorio_programa(), "kiosco_local", "diario_ingresos.jsonl")
+        try:
+            with open(ruta, "r", encoding="utf-8") as anterior:
+                contenido = anterior.read()
+            if contenido:
+                destino = os.path.join(self.directorio, f"diario-anterior-{int(time.time() * 1000)}.jsonl")
+                with open(destino, "w", encoding="utf-8") as diario:
+                    diario.write(contenido)
+                    diario.flush()
+                    os.fsync(diario.fileno())
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"No se pudo traer el diario anterior del kiosco ({ruta}): {e}")
+
+    def _diarios_ajenos(self):
+        return [
+            ruta for ruta in glob.glob(os.path.join(self.directorio, "diario-*.jsonl"))
+            if os.path.normcase(ruta) != os.path.normcase(self.ruta_diario)
+        ]
+
+    def _cargar_foto(self):
+        if self._socios is not None:
+            return
+        if self._local is None:
+            self._abrir_local()
+        fila = self._local.execute("SELECT valor FROM estado WHERE clave = 'ultimo_cambio'").fetchone()
+        self.ultimo_cambio = fila[0] if fila else 0
+        socios = {}
+        dni_de = {}
+        for m_id, dni, nombre, apellido, plan, ingresos, venc in self._local.execute("SELECT * FROM socios"):
+            socios[dni] = [m_id, nombre, apellido, plan, ingresos, venc]
+            dni_de[m_id] = dni
+        self._socios = socios
+        self._dni_de = dni_de
+
+    def __len__(self):
+        with self._lock:
+            self._cargar_foto()
+            return len(self._socios)
+
+    # --- Escaneo ---
+
+    def registrar_ingreso(self, dni):
+        with self._lock:
+            self._cargar_foto()
+            if self.sin_conexion and time.monotonic() < self._reintentar_en:
+                return self._ingreso_local(dni)
+            try:
+                if self.sin_conexion or self.pendientes():
+                    # Volvió la base: primero lo anotado durante el corte
+                    self._aplicar_diario()
+                resultado = self.db.registrar_ingresos([dni], estricto=True)[0]
+            except sqlite3.Error as e:
+                self._marcar_corte(e)
+                return self._ingreso_local(dni)
+            self.sin_conexion = False
+            if resultado is not None and not resultado.get("repetido"):
+                socio = self._socios.get(dni)
+                if socio is not None:
+                    socio[4] = resultado["ingresos_restantes"]
+            return resultado
+
+    def _marcar_corte(self, error):
+        if not self.sin_conexion:
+            print(f"Base no disponible ({error}); el kiosco sigue con la foto local")
+        self.sin_conexion = True
+        self._reintentar_en = time.monotonic() + self.REINTENTO_S
+        # La conexión del hilo puede haber quedado inservible: se abre otra al reintentar
+        self.db.gestor.descartar()
+
+    def _ingreso_local(self, dni):
+        """Misma decisión que Database._ingreso, con la foto local"""
+        socio = self._socios.get(dni)
+        if socio is None:
+            return None
+        m_id, nombre, apellido, plan, ingresos, venc = socio
+        ahora = datetime.now()
+        hoy_str = ahora.strftime('%Y-%m-%d')
+
+        if venc and hoy_str >= venc:
+            tipo, mensaje = "Vencido", "⛔ CUOTA VENCIDA"
+        elif ingresos <= 0:
+            tipo, mensaje = "Sin Pases", "⛔ SIN PASES"
+        else:
+            tipo, mensaje = "Ingreso", "PASE HABILITADO"
+            ingresos -= 1
+
+        # Diario de solo agregado: una línea JSON por escaneo, con id único para no repetirlo.
+        # Si no se puede anotar, el escaneo no cuenta: ni se descuenta el pase
+        registro = [uuid.uuid4().hex, m_id, ahora.strftime('%Y-%m-%d %H:%M:%S'), tipo]
+        try:
+            self._anotar(registro)
+        except OSError as e:
+            print(f"No se pudo anotar el ingreso sin conexión de DNI {dni}: {e}")
+            return {"error": f"no se pudo anotar el ingreso sin conexión ({e})"}
+
+        if tipo == "Ingreso":
+            socio[4] = ingresos
+            try:
+                self._local.execute("UPDATE socios SET ingresos = ? WHERE id = ?", (ingresos, m_id))
+                self._local.commit()
+            except sqlite3.Error as e:
+                # El ingreso ya está en el diario; la foto se corrige al volver la base
+                print(f"No se pudo actualizar la foto local: {e}")
+
+        return {
+            "nombre": nombre,
+            "apellido": apellido,
+            "plan": plan,
+            "vencimiento": venc,
+            "ingresos_restantes": ingresos,
+            "acceso": tipo == "Ingreso",
+            "mensaje": mensaje,
+            "sin_conexion": True
+        }
+
+    # --- Sincronización ---
+
+    def _anotar(self, registro):
+        try:
+            if self._diario is None:
+                os.makedirs(self.directorio, exist_ok=True)
+                self._diario = open(self.ruta_diario, "a+", encoding="utf-8")
+                bloquear(self._diario)
+            self._diario.write(json.dumps(registro) + "\n")
+            self._diario.flush()
+            os.fsync(self._diario.fileno())
+        except OSError:
+            self._cerrar_diario()
+            raise
+
+    def _cerrar_diario(self):
+        if self._diario is not None:
+            try:
+                self._diario.close()
+            except OSError:
+                pass
+            self._diario = None
+
+    def pendientes(self):
+        """True si quedan escaneos sin conexión por aplicar (propios o de un kiosco cerrado)"""
+        if self._ajenos:
+            return True
+        try:
+            return os.path.getsize(self.ruta_diario) > 0
+        except OSError:
+            return False
+
+    def _aplicar_registros(self, registros):
+        aplicados = 0
+        for i in range(0, len(registros), self.LOTE_DIARIO):
+            aplicados += self.db.aplicar_ingresos_offline(registros[i:i + self.LOTE_DIARIO])
+        return aplicados
+
+    def _aplicar_diario(self):
+        """Aplica en la base el diario propio y los que dejaron kioscos cerrados.
+        Devuelve los registros nuevos."""
+        aplicados = 0
+        try:
+            tiene_propios = os.path.getsize(self.ruta_diario) > 0
+        except OSError:
+            tiene_propios = False
+        if tiene_propios:
+            if self._diario is None:
+                self._diario = open(self.ruta_diario, "a+", encoding="utf-8")
+                bloquear(self._diario)
+            self._diario.seek(0)
+            aplicados += self._aplicar_registros(leer_diario(self._diario))
+            # Si se corta antes de vaciarlo, el próximo intento reenvía todo y la base
+            # ignora lo ya aplicado. Solo este kiosco escribe acá (y con self._lock tomado)
+            self._diario.seek(0)
+            self._diario.truncate()
+        for ruta in self._diarios_ajenos():
+            with open(ruta, "r+", encoding="utf-8") as diario:
+                if not bloquear(diario):
+                    continue  # es de otro kiosco abierto en esta PC
+                diario.seek(0)
+                aplicados += self._aplicar_registros(leer_diario(diario))
+            os.remove(ruta)
+        self._ajenos = False
+        if aplicados:
+            print(f"Ingresos sin conexión aplicados: {aplicados}")
+        return aplicados
+
+    def actualizar_foto(self):
+        """Trae de la base los socios cambiados desde la última vez. Devuelve cuántos."""
+        self._cargar_foto()
+        total = 0
+        while True:
+            filas = self.db.socios_modificados(self.ultimo_cambio, self.LOTE_FOTO)
+            if not filas:
+                return total
+            altas = []
+            bajas = []
+            for m_id, dni, nombre, apellido, plan, ingresos, venc, activo, cambio in filas:
+                anterior = self._dni_de.pop(m_id, None)
+                if anterior is not None:
+                    self._socios.pop(anterior, None)
+                if activo:
+                    self._socios[dni] = [m_id, nombre, apellido, plan, ingresos, venc]
+                    self._dni_de[m_id] = dni
+                    altas.append((m_id, dni, nombre, apellido, plan, ingresos, venc))
+                else:
+                    bajas.append((m_id,))
+            self.ultimo_cambio = filas[-1][8]
+            with self._local:
+                self._local.executemany("INSERT OR REPLACE INTO socios VALUES (?, ?, ?, ?, ?, ?, ?)", altas)
+                self._local.executemany("DELETE FROM socios WHERE id = ?", bajas)
+                self._local.execute(
+                    "INSERT OR REPLACE INTO estado (clave, valor) VALUES ('ultimo_cambio', ?)", (self.ultimo_cambio,)
+                )
+            total += len(filas)
+
+    def sincronizar(self):
+        """Aplica el diario pendiente y refresca la foto. False si la base sigue sin responder."""
+        with self._lock:
+            self._cargar_foto()
+            try:
+                self._aplicar_diario()
+                # Recién con el diario aplicado: si no, la foto volvería a los pases de antes del corte
+                self.actualizar_foto()
+            except sqlite3.Error as e:
+                self._marcar_corte(e)
+                return False
+            self.sin_conexion = False
+            return True
+
+    def cerrar(self):
+        """Cierra la foto local y el diario; si el kiosco se vuelve a usar se reabren solos.
+        Un diario con pendientes queda en la carpeta para aplicarlo después."""
+        with self._lock:
+            if self._local is not None:
+                self._local.close()
+            self._local = None
+            self._socios = None
+            self._dni_de = None
+            self._cerrar_diario()
+            try:
+                if os.path.getsize(self.ruta_diario) == 0:
+                    os.remove(self.ruta_diario)
+            except OSError:
+                pass
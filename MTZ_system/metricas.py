@@ -0,0 +1,46 @@
+import threading
+from datetime import datetime
+from instancias import UnaPorBase
+
+
+class ServicioMetricas(UnaPorBase):
+    """KPIs del gimnasio (activos, vencidos, al día, caja estimada) para Dashboard y Reportes.
+
+    El resultado queda en caché y solo se recalcula si la base cambió: las escrituras
+    de este proceso suben gestor.escrituras y las de otros procesos/conexiones cambian
+    PRAGMA data_version. También se recalcula al cambiar el día (cambian los vencidos).
+    Mientras nada cambie, metricas() devuelve el mismo diccionario."""
+
+    def __init__(self, db):
+        self.db = db
+        self._version = None
+        self._metricas = None
+        self._lock = threading.Lock()
+        self.recalculos = 0
+
+    def _version_actual(self):
+        # data_version es propio de cada conexión, por eso va junto con la conexión
+        # (no con el id del hilo, que se reutiliza cuando un hilo termina)
+        conn = self.db.gestor.conexion()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return (
+            conn,
+            data_version,
+            self.db.gestor.escrituras,
+            datetime.now().strftime('%Y-%m-%d'),
+        )
+
+    def metricas(self):
+        with self._lock:
+            version = self._version_actual()
+            if version != self._version:
+                metricas = self.db.obtener_metricas()
+                metricas["al_dia"] = metricas["activos"] - metricas["vencidos"]
+                self._metricas = metricas
+                self._version = version
+                self.recalculos += 1
+            return self._metricas
+
+    def invalidar(self):
+        with self._lock:
+            self._version = None
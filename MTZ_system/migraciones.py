@@ -0,0 +1,276 @@
+"""Migraciones versionadas del esquema, controladas con PRAGMA user_version.
+
+Cada paso se aplica una sola vez, en orden, dentro de su propia transacción.
+Los pasos son idempotentes (IF NOT EXISTS / chequeos previos) para que una base
+creada a mano o a medio migrar también se pueda actualizar sin errores.
+"""
+import sqlite3
+
+
+def _columnas(cursor, tabla):
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return {fila[1] for fila in cursor.fetchall()}
+
+
+def _m001_vencimiento_en_bases_viejas(cursor):
+    # Las primeras versiones no tenían fecha_vencimiento en miembros
+    if "fecha_vencimiento" not in _columnas(cursor, "miembros"):
+        cursor.execute("ALTER TABLE miembros ADD COLUMN fecha_vencimiento DATE")
+
+
+def _m002_indice_historial_socio(cursor):
+    # Historial por socio y orden cronológico
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_historial_miembro_fecha
+        ON historial_acceso (miembro_id, fecha_hora)
+    ''')
+
+
+def _m003_indice_socios_activos(cursor):
+    # Parcial: solo socios activos. Cubre COUNT(*) WHERE activo = 1
+    # y los vencidos (activo = 1 AND fecha_vencimiento < ?) del dashboard y reportes
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_miembros_activos_vencimiento
+        ON miembros (fecha_vencimiento) WHERE activo = 1
+    ''')
+
+
+def _m004_estadisticas(cursor):
+    cursor.execute("ANALYZE")
+
+
+def _m005_bitacora_historial(cursor):
+    # Hasta qué registro de cada diario de historial_diferido ya está insertado
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bitacora_aplicada (
+            archivo TEXT PRIMARY KEY,
+            ultimo_seq INTEGER NOT NULL
+        )
+    ''')
+
+
+def _m006_busqueda_socios(cursor):
+    # Índice FTS5 de nombre/apellido/DNI para la búsqueda incremental de Gestión.
+    # Tabla de contenido externo: no duplica los datos, los triggers la mantienen al día.
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS miembros_busqueda USING fts5 (
+                nombre, apellido, dni,
+                content='miembros', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='1 2 3'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite sin FTS5: Database.buscar_socios usa LIKE
+        return
+    # Sin executescript: haría COMMIT en medio de la migración
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS miembros_busqueda_ai AFTER INSERT ON miembros BEGIN
+            INSERT INTO miembros_busqueda (rowid, nombre, apellido, dni)
+            VALUES (new.id, new.nombre, new.apellido, new.dni);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS miembros_busqueda_ad AFTER DELETE ON miembros BEGIN
+            INSERT INTO miembros_busqueda (miembros_busqueda, rowid, nombre, apellido, dni)
+            VALUES ('delete', old.id, old.nombre, old.apellido, old.dni);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS miembros_busqueda_au AFTER UPDATE OF nombre, apellido, dni ON miembros BEGIN
+            INSERT INTO miembros_busqueda (miembros_busqueda, rowid, nombre, apellido, dni)
+            VALUES ('delete', old.id, old.nombre, old.apellido, old.dni);
+            INSERT INTO miembros_busqueda (rowid, nombre, apellido, dni)
+            VALUES (new.id, new.nombre, new.apellido, new.dni);
+        END
+    ''')
+    cursor.execute("INSERT INTO miembros_busqueda (miembros_busqueda) VALUES ('rebuild')")
+
+
+def _m007_indices_historial_filtros(cursor):
+    # Filtros del historial: por rango de fechas y por tipo de evento.
+    # El rowid va implícito al final del índice, así (fecha_hora, id) sale ordenado.
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_historial_fecha
+        ON historial_acceso (fecha_hora)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_historial_tipo_fecha
+        ON historial_acceso (tipo_acceso, fecha_hora)
+    ''')
+
+
+def reconstruir_estadisticas(cursor):
+    """Recalcula desde cero los contadores que mantienen los triggers de _m008"""
+    cursor.execute("DELETE FROM estadisticas")
+    cursor.execute('''
+        INSERT INTO estadisticas (plan_id, activos)
+        SELECT IFNULL(plan_id, 0), COUNT(*) FROM miembros WHERE activo = 1 GROUP BY IFNULL(plan_id, 0)
+    ''')
+    cursor.execute("DELETE FROM estadisticas_vencimientos")
+    cursor.execute('''
+        INSERT INTO estadisticas_vencimientos (fecha, activos)
+        SELECT IFNULL(fecha_vencimiento, ''), COUNT(*) FROM miembros WHERE activo = 1
+        GROUP BY IFNULL(fecha_vencimiento, '')
+    ''')
+
+
+def _m008_contadores_resumen(cursor):
+    # Socios activos por plan (el ingreso potencial es activos * precio del plan)
+    # y por fecha de vencimiento, para que dashboard y reportes no recorran miembros.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estadisticas (
+            plan_id INTEGER PRIMARY KEY,  -- 0 = sin plan
+            activos INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estadisticas_vencimientos (
+            fecha TEXT PRIMARY KEY,  -- '' = sin fecha
+            activos INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    sumar = '''
+        INSERT INTO estadisticas (plan_id, activos) VALUES (IFNULL({f}.plan_id, 0), {d})
+            ON CONFLICT (plan_id) DO UPDATE SET activos = activos + {d};
+        INSERT INTO estadisticas_vencimientos (fecha, activos) VALUES (IFNULL({f}.fecha_vencimiento, ''), {d})
+            ON CONFLICT (fecha) DO UPDATE SET activos = activos + {d};
+    '''
+    alta = sumar.format(f="new", d="1")
+    baja = sumar.format(f="old", d="-1")
+    # El descuento de pases (ingresos_restantes) no dispara nada
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS estadisticas_ai AFTER INSERT ON miembros
+        WHEN new.activo = 1 BEGIN {alta} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS estadisticas_ad AFTER DELETE ON miembros
+        WHEN old.activo = 1 BEGIN {baja} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS estadisticas_au_baja AFTER UPDATE OF activo, plan_id, fecha_vencimiento ON miembros
+        WHEN old.activo = 1 BEGIN {baja} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS estadisticas_au_alta AFTER UPDATE OF activo, plan_id, fecha_vencimiento ON miembros
+        WHEN new.activo = 1 BEGIN {alta} END
+    ''')
+    reconstruir_estadisticas(cursor)
+
+
+def _m009_asistencia_horaria(cursor):
+    # Ingresos y rechazos por hora, día y plan. La llena Database.actualizar_asistencia
+    # de a partes (marca de agua en resumen_procesado), nunca los triggers del kiosco.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS asistencia_horaria (
+            fecha TEXT NOT NULL,
+            hora INTEGER NOT NULL,
+            plan_id INTEGER NOT NULL,  -- 0 = sin plan
+            ingresos INTEGER NOT NULL DEFAULT 0,
+            rechazos INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (fecha, hora, plan_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumen_procesado (
+            nombre TEXT PRIMARY KEY,
+            ultimo_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO resumen_procesado (nombre, ultimo_id) VALUES ('asistencia', 0)")
+
+
+def _m010_version_catalogo_planes(cursor):
+    # Número de versión del catálogo de planes: lo suben los triggers con cualquier
+    # cambio en planes, así CatalogoPlanes sabe cuándo releer la tabla.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS catalogo_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO catalogo_version (id, version) VALUES (1, 1)")
+    for evento in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS catalogo_version_{evento.lower()} AFTER {evento} ON planes BEGIN
+                UPDATE catalogo_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def _m011_cambios_socios(cursor):
+    # Número de cambio por socio para que los kioscos actualicen su foto local de a
+    # partes (WHERE cambio > último visto). Lo asignan los triggers, creciente.
+    if "cambio" not in _columnas(cursor, "miembros"):
+        cursor.execute("ALTER TABLE miembros ADD COLUMN cambio INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("UPDATE miembros SET cambio = id")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_miembros_cambio ON miembros (cambio)")
+    siguiente = "(SELECT MAX(cambio) FROM miembros) + 1"
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS miembros_cambio_ai AFTER INSERT ON miembros BEGIN
+            UPDATE miembros SET cambio = {siguiente} WHERE id = new.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS miembros_cambio_au
+        AFTER UPDATE OF nombre, apellido, dni, plan_id, ingresos_restantes, fecha_vencimiento, activo ON miembros
+        BEGIN
+            UPDATE miembros SET cambio = {siguiente} WHERE id = new.id;
+        END
+    ''')
+    # Ingresos registrados sin conexión y ya aplicados (kiosco_offline): evita repetirlos
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingresos_offline (
+            id TEXT PRIMARY KEY,
+            fecha_hora TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+# (versión, paso). Agregar siempre al final con la versión siguiente.
+MIGRACIONES = [
+    (1, _m001_vencimiento_en_bases_viejas),
+    (2, _m002_indice_historial_socio),
+    (3, _m003_indice_socios_activos),
+    (4, _m004_estadisticas),
+    (5, _m005_bitacora_historial),
+    (6, _m006_busqueda_socios),
+    (7, _m007_indices_historial_filtros),
+    (8, _m008_contadores_resumen),
+    (9, _m009_asistencia_horaria),
+    (10, _m010_version_catalogo_planes),
+    (11, _m011_cambios_socios),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def version_actual(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migraciones(conn):
+    """Lleva la base a VERSION_ESQUEMA. Devuelve la lista de versiones aplicadas."""
+    aplicadas = []
+    for version, paso in MIGRACIONES:
+        if version <= version_actual(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Otro proceso pudo haberla aplicado mientras esperábamos el lock
+            if version <= version_actual(conn):
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            paso(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        aplicadas.append(version)
+
+    conn.execute("PRAGMA optimize")
+    return aplicadas
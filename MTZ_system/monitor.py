@@ -1,21 +1,131 @@
 import sys
 import os
+import time
+import logging
+from collections import deque
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QLabel, QVBoxLayout,
-    QWidget, QLineEdit, QFrame
+    QWidget, QLineEdit, QFrame, QListWidget, QListWidgetItem, QStackedWidget
 )
-from PyQt6.QtCore import Qt, QTimer, QTime, QRect
+from PyQt6.QtCore import Qt, QTimer, QTime, QRect, QObject, QRunnable, QThreadPool, pyqtSignal, QEvent
 from PyQt6.QtGui import QFont, QPixmap, QPalette, QBrush, QColor, QKeyEvent, QPainter
 from database import Database
+from kiosco_offline import KioscoOffline
 from datetime import datetime
 
+# Si la base no responde en este tiempo avisamos en pantalla (el escaneo sigue en curso)
+TIMEOUT_INGRESO_MS = 3000
+# Pasado este plazo el escaneo se da por perdido en pantalla; si el resultado llega
+# después (el pase pudo haberse descontado) se anota como tardío
+LIMITE_INGRESO_MS = 10000
+
+# Cada cuánto se refresca la foto local de socios (y se aplica el diario si hubo corte)
+INTERVALO_FOTO_MS = 60000
+
+# Modo rápido (hora pico): cantidad de resultados visibles en la lista
+MAX_LISTA_RAPIDA = 8
+
+# Detalle de cada escaneo (latencia Enter -> resultado pintado, sin respuesta, tardíos)
+# en nivel debug; MTZ_TIEMPOS_MONITOR=1 lo muestra por la salida de errores
+log = logging.getLogger("mtz.monitor")
+if os.environ.get("MTZ_TIEMPOS_MONITOR", "0") not in ("", "0"):
+    log.setLevel(logging.DEBUG)
+    log.addHandler(logging.StreamHandler())
+
+# Hoja de estilo de la tarjeta, aplicada una sola vez: cada escaneo solo cambia la
+# propiedad "estado" (espera / permitido / denegado / error) y se repule la tarjeta
+ESTILO_TARJETA = """
+    QFrame#tarjeta {
+        background-color: rgba(255, 255, 255, 0.95);
+        border-radius: 30px;
+        border: 2px solid #ddd;
+    }
+    QFrame#tarjeta[estado="permitido"] { background-color: white; border: 5px solid #2ecc71; }
+    QFrame#tarjeta[estado="denegado"], QFrame#tarjeta[estado="error"] {
+        background-color: white; border: 5px solid #e74c3c;
+    }
+    QLabel { background: transparent; border: none; }
+    QLabel#saldo { font-size: 24px; font-weight: bold; color: #2ecc71; }
+    QLabel#saldo[estado="denegado"] { color: #e74c3c; }
+    QLabel#aviso { font-size: 20px; color: #555; }
+    QLabel#aviso[estado="ocupado"] { color: #e67e22; }
+"""
+
+def cambiar_estado(widget, estado):
+    """Cambia la propiedad dinámica y repule solo ese widget (no re-parsea estilos)"""
+    if widget.property("estado") == estado:
+        return
+    widget.setProperty("estado", estado)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+class SenalesIngreso(QObject):
+    resultado = pyqtSignal(int, object)
+
+class TareaIngreso(QRunnable):
+    """Ejecuta registrar_ingreso fuera del hilo de la interfaz (base local o servicio)"""
+    def __init__(self, db, ticket, dni):
+        super().__init__()
+        self.db = db
+        self.ticket = ticket
+        self.dni = dni
+        self.senales = SenalesIngreso()
+
+    def run(self):
+        try:
+            resultado = self.db.registrar_ingreso(self.dni)
+        except Exception as e:
+            # Sin esto el escaneo nunca se resuelve y termina en "SIN RESPUESTA"
+            print(f"Error registrando DNI {self.dni}: {e}")
+            resultado = {"error": str(e)}
+        self.senales.resultado.emit(self.ticket, resultado)
+
+class TareaSincronizacion(QRunnable):
+    """Refresca la foto local del kiosco en el mismo hilo que los escaneos"""
+    def __init__(self, kiosco):
+        super().__init__()
+        self.kiosco = kiosco
+
+    def run(self):
+        self.kiosco.sincronizar()
+
 class VentanaPrincipal(QMainWindow):
-    def __init__(self):
+    # Admin reutiliza la ventana: al volver a mostrarla se reanuda lo que detuvo closeEvent
+    cerrada = False
+
+    def __init__(self, modo_rapido=False, db=None, servidor=None):
         super().__init__()
         self.setWindowTitle("Monitor de Acceso - MTZ")
         self.showFullScreen() 
         
-        self.db = Database()
+        self.db = db or Database()
+        # Si la base no responde, el kiosco decide con su foto local y anota en un diario
+        self.kiosco = KioscoOffline(self.db)
+        # Modo cliente: los escaneos van al servicio de ingresos ("host:puerto");
+        # si no responde se registran en la base (o la foto local) como siempre
+        self.ingresos = self.kiosco
+        if servidor:
+            from servicio_ingresos import ClienteIngresos, IngresoConRespaldo
+            self.ingresos = IngresoConRespaldo(ClienteIngresos.desde_texto(servidor), self.kiosco)
+        self.modo_rapido = modo_rapido
+        self.marcas_ingreso = deque()
+        # Latencias (ms) desde el Enter hasta que el resultado quedó pintado
+        self.latencias = deque(maxlen=500)
+        self._escaneo_pendiente = None
+
+        # Un solo hilo: los escaneos se procesan en orden, sin frenar el reloj ni el teclado
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.tareas = {}
+        self.ultimo_ticket = 0
+        # Escaneos vencidos (ticket -> tarea) y resultados tardíos o que no se mostraron
+        self.vencidas = {}
+        self.anotados = deque(maxlen=100)
+
+        self.timer_foto = QTimer(self)
+        self.timer_foto.timeout.connect(self.sincronizar_foto)
+        self.timer_foto.start(INTERVALO_FOTO_MS)
+        self.sincronizar_foto()
         
         # --- 1. CONFIGURACIÓN DEL FONDO ---
         self.configurar_fondo()
@@ -31,28 +141,37 @@ class VentanaPrincipal(QMainWindow):
 
         # --- 3. LA TARJETA BLANCA (MÁS COMPACTA) ---
         self.card = QFrame()
+        self.card.setObjectName("tarjeta")
+        self.card.setProperty("estado", "espera")
         self.card.setFixedSize(550, 350) 
-        self.card.setStyleSheet("""
-            QFrame {
-                background-color: rgba(255, 255, 255, 0.95);
-                border-radius: 30px;
-                border: 2px solid #ddd;
-            }
-        """)
+        self.card.setStyleSheet(ESTILO_TARJETA)
         
+        # Vistas armadas de antemano: espera / resultado / error
+        self.vistas = QStackedWidget()
+        layout_vistas = QVBoxLayout()
+        layout_vistas.setContentsMargins(30, 30, 30, 30)
+        layout_vistas.addWidget(self.vistas)
+        self.card.setLayout(layout_vistas)
+
+        vista_espera = QWidget()
         self.layout_card = QVBoxLayout()
-        self.layout_card.setContentsMargins(30, 30, 30, 30)
+        self.layout_card.setContentsMargins(0, 0, 0, 0)
         self.layout_card.setSpacing(5) 
-        self.card.setLayout(self.layout_card)
+        vista_espera.setLayout(self.layout_card)
+        self.vistas.addWidget(vista_espera)
         
         self.layout_principal.addWidget(self.card)
 
         # --- 4. ELEMENTOS ---
         self.crear_elementos_ui()
+        self.aplicar_modo()
         self.input_dni.setFocus()
 
     def configurar_fondo(self):
-        """Carga fondo.png O fondo.jpg y lo centra sobre negro sin zoom excesivo"""
+        """Carga fondo.png O fondo.jpg y lo centra sobre negro sin zoom excesivo.
+
+        El fondo ya escalado se guarda en cache_fondo/ (junto a la base) por resolución
+        de pantalla, así los arranques siguientes no vuelven a escalar la imagen."""
         base_path = os.path.join(os.path.dirname(__file__), "assets")
         
         # 1. Buscamos el archivo (png o jpg)
@@ -62,23 +181,7 @@ class VentanaPrincipal(QMainWindow):
 
         if os.path.exists(ruta_fondo):
             screen_size = QApplication.primaryScreen().size()
-            
-            fondo_final = QPixmap(screen_size)
-            fondo_final.fill(Qt.GlobalColor.black)
-            
-            logo = QPixmap(ruta_fondo)
-            
-            logo_scaled = logo.scaled(
-                screen_size, 
-                Qt.AspectRatioMode.KeepAspectRatio, 
-                Qt.TransformationMode.SmoothTransformation
-            )
-            
-            painter = QPainter(fondo_final)
-            x = (screen_size.width() - logo_scaled.width()) // 2
-            y = (screen_size.height() - logo_scaled.height()) // 2
-            painter.drawPixmap(x, y, logo_scaled)
-            painter.end()
+            fondo_final = self.fondo_escalado(ruta_fondo, screen_size)
             
             palette = QPalette()
             palette.setBrush(QPalette.ColorRole.Window, QBrush(fondo_final))
@@ -87,6 +190,43 @@ class VentanaPrincipal(QMainWindow):
             self.setStyleSheet("QMainWindow { background-color: #2c3e50; }") 
             print(f"AVISO: No se encontró fondo en {base_path}")
 
+    def fondo_escalado(self, ruta_fondo, screen_size):
+        info = os.stat(ruta_fondo)
+        directorio_cache = os.path.join(os.path.dirname(self.db.db_path), "cache_fondo")
+        # Si cambia la imagen (fecha o tamaño) o la resolución, es otro archivo
+        ruta_cache = os.path.join(
+            directorio_cache,
+            f"fondo-{screen_size.width()}x{screen_size.height()}-{info.st_mtime_ns}-{info.st_size}.png"
+        )
+        if os.path.exists(ruta_cache):
+            fondo_final = QPixmap(ruta_cache)
+            if not fondo_final.isNull():
+                return fondo_final
+
+        fondo_final = QPixmap(screen_size)
+        fondo_final.fill(Qt.GlobalColor.black)
+        
+        logo = QPixmap(ruta_fondo)
+        
+        logo_scaled = logo.scaled(
+            screen_size, 
+            Qt.AspectRatioMode.KeepAspectRatio, 
+            Qt.TransformationMode.SmoothTransformation
+        )
+        
+        painter = QPainter(fondo_final)
+        x = (screen_size.width() - logo_scaled.width()) // 2
+        y = (screen_size.height() - logo_scaled.height()) // 2
+        painter.drawPixmap(x, y, logo_scaled)
+        painter.end()
+
+        try:
+            os.makedirs(directorio_cache, exist_ok=True)
+            fondo_final.save(ruta_cache, "PNG")
+        except OSError as e:
+            print(f"AVISO: No se pudo guardar el fondo en caché: {e}")
+        return fondo_final
+
     def crear_elementos_ui(self):
         # RELOJ
         self.lbl_reloj = QLabel("00:00")
@@ -136,111 +276,345 @@ class VentanaPrincipal(QMainWindow):
         self.layout_card.addStretch()
         
         # RESULTADO
+        # Avisos en la vista de espera (verificando / sistema ocupado)
         self.lbl_resultado = QLabel("")
+        self.lbl_resultado.setObjectName("aviso")
+        self.lbl_resultado.setTextFormat(Qt.TextFormat.PlainText)
         self.lbl_resultado.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.lbl_resultado.setStyleSheet("font-size: 22px; font-weight: bold; background: transparent; border: none;")
         self.lbl_resultado.hide()
         self.layout_card.addWidget(self.lbl_resultado)
 
+        self.crear_vista_resultado()
+        self.crear_vista_error()
+
         self.timer_limpieza = QTimer()
         self.timer_limpieza.setSingleShot(True)
         self.timer_limpieza.timeout.connect(self.resetear_pantalla)
 
+        self.timer_demora = QTimer(self)
+        self.timer_demora.setSingleShot(True)
+        self.timer_demora.timeout.connect(self.ingreso_demorado)
+
+        # MODO RÁPIDO: lista con los últimos escaneos en lugar de la tarjeta de resultado
+        self.lista_rapida = QListWidget()
+        self.lista_rapida.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.lista_rapida.setStyleSheet("""
+            QListWidget { background: transparent; border: none; font-size: 18px; font-weight: bold; }
+            QListWidget::item { padding: 4px; border-bottom: 1px solid #eee; }
+        """)
+        self.layout_card.addWidget(self.lista_rapida)
+
+        self.lbl_ritmo = QLabel("")
+        self.lbl_ritmo.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.lbl_ritmo.setStyleSheet("color: #777; font-size: 14px; background: transparent; border: none;")
+        self.layout_card.addWidget(self.lbl_ritmo)
+
+        # Para medir cuándo queda pintado el resultado
+        self.card.installEventFilter(self)
+        self.lista_rapida.viewport().installEventFilter(self)
+
+    def crear_vista_resultado(self):
+        vista = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(5)
+        layout.addStretch()
+        self.lbl_icono = self.etiqueta("font-size: 50px;")
+        self.lbl_nombre = self.etiqueta("font-size: 28px; font-weight: bold; color: #333;")
+        self.lbl_plan = self.etiqueta("font-size: 20px; font-weight: bold; color: #555;")
+        self.lbl_saldo = self.etiqueta("")
+        self.lbl_saldo.setObjectName("saldo")
+        self.lbl_vence = self.etiqueta("font-size: 16px; color: #777;")
+        for lbl in (self.lbl_icono, self.lbl_nombre, self.lbl_plan, self.lbl_saldo, self.lbl_vence):
+            layout.addWidget(lbl)
+        layout.addStretch()
+        vista.setLayout(layout)
+        self.vista_resultado = vista
+        self.vistas.addWidget(vista)
+
+    def crear_vista_error(self):
+        vista = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addStretch()
+        layout.addWidget(self.etiqueta("font-size: 50px;", "⚠️"))
+        self.lbl_error = self.etiqueta("font-size: 28px; font-weight: bold; color: #e74c3c; margin: 20px;")
+        layout.addWidget(self.lbl_error)
+        layout.addWidget(self.etiqueta("font-size: 16px; color: #555;", "Por favor consulta en administración"))
+        layout.addStretch()
+        vista.setLayout(layout)
+        self.vista_error = vista
+        self.vistas.addWidget(vista)
+
+    def etiqueta(self, estilo, texto=""):
+        lbl = QLabel(texto)
+        lbl.setTextFormat(Qt.TextFormat.PlainText)
+        lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        if estilo:
+            lbl.setStyleSheet(estilo)
+        return lbl
+
+    def aplicar_modo(self):
+        """Muestra la tarjeta normal o la lista del modo rápido (F2 alterna)"""
+        self.timer_limpieza.stop()
+        self.resetear_pantalla()
+        if self.modo_rapido:
+            self.card.setFixedSize(650, 650)
+            self.lbl_titulo.setText("Modo Rápido")
+            self.lista_rapida.show()
+            self.lbl_ritmo.show()
+            self.actualizar_ritmo()
+        else:
+            self.card.setFixedSize(550, 350)
+            self.lbl_titulo.setText("Bienvenido a MTZ")
+            self.lista_rapida.hide()
+            self.lbl_ritmo.hide()
+
     def actualizar_reloj(self):
         self.lbl_reloj.setText(QTime.currentTime().toString("HH:mm"))
 
+    def sincronizar_foto(self):
+        self.pool.start(TareaSincronizacion(self.kiosco))
+
     def procesar_dni(self):
         dni = self.input_dni.text().strip()
         if not dni: return
         self.input_dni.clear()
-        resultado = self.db.registrar_ingreso(dni)
-        if resultado:
-            self.mostrar_resultado_acceso(resultado)
+
+        self.ultimo_ticket += 1
+        tarea = TareaIngreso(self.ingresos, self.ultimo_ticket, dni)
+        tarea.inicio = time.perf_counter()
+        tarea.senales.resultado.connect(self.ingreso_resuelto)
+        self.tareas[self.ultimo_ticket] = tarea
+
+        if self.modo_rapido:
+            self.actualizar_ritmo()
+        else:
+            self.mostrar_verificando()
+        self.timer_demora.start(TIMEOUT_INGRESO_MS)
+        QTimer.singleShot(LIMITE_INGRESO_MS, lambda ticket=self.ultimo_ticket: self.ingreso_vencido(ticket))
+        self.pool.start(tarea)
+
+    def ingreso_vencido(self, ticket):
+        tarea = self.tareas.pop(ticket, None)
+        if tarea is None:
+            return
+        self.vencidas[ticket] = tarea
+        log.debug("Sin respuesta para DNI %s en %.0f s", tarea.dni, LIMITE_INGRESO_MS / 1000)
+        if self.modo_rapido:
+            self.agregar_a_lista(tarea.dni, None, "SIN RESPUESTA")
+            if not self.tareas:
+                self.timer_demora.stop()
+            return
+        if self.tareas:
+            return
+        self.timer_demora.stop()
+        self.mostrar_error("SIN RESPUESTA, ESCANEE DE NUEVO")
+
+    def anotar_resultado(self, tarea, resultado, motivo):
+        """Resultado que llegó tarde, que no se vio en la tarjeta o que falló: queda anotado"""
+        dni = tarea.dni if tarea else ""
+        if resultado is None:
+            mensaje = "DNI NO ENCONTRADO"
+        elif resultado.get('error'):
+            mensaje = f"ERROR: {resultado['error']}"
         else:
+            mensaje = resultado['mensaje']
+        self.anotados.append((time.strftime('%H:%M:%S'), dni, mensaje, motivo))
+        log.debug("Resultado %s: DNI %s -> %s", motivo, dni, mensaje)
+
+    def ingreso_resuelto(self, ticket, resultado):
+        tarea = self.tareas.pop(ticket, None)
+        if tarea is None:
+            tarea = self.vencidas.pop(ticket, None)
+            self.anotar_resultado(tarea, resultado, "tardío")
+            if self.modo_rapido:
+                self.agregar_a_lista(tarea.dni if tarea else "", resultado, "tardío")
+            return
+        if self.modo_rapido:
+            if resultado is not None and resultado.get('error'):
+                self.anotar_resultado(tarea, resultado, "con error")
+            self.marcar_escaneo(tarea)
+            self.agregar_a_lista(tarea.dni if tarea else "", resultado)
+            if not self.tareas:
+                self.timer_demora.stop()
+            return
+        if self.tareas:
+            # Ya hay otro DNI en cola: mostramos solo el más reciente
+            self.anotar_resultado(tarea, resultado, "no mostrado (había otro escaneo en cola)")
+            return
+        self.timer_demora.stop()
+        self.marcar_escaneo(tarea)
+        if resultado is None:
             self.mostrar_error("DNI NO ENCONTRADO")
+        elif resultado.get('error'):
+            self.anotar_resultado(tarea, resultado, "con error")
+            if resultado.get('sin_confirmar'):
+                # El servicio pudo haberlo registrado: repetirlo acá podría descontar dos veces
+                self.mostrar_error("INGRESO SIN CONFIRMAR")
+            else:
+                self.mostrar_error("ERROR AL REGISTRAR, ESCANEE DE NUEVO")
+        else:
+            self.mostrar_resultado_acceso(resultado)
+
+    def mostrar_verificando(self):
+        """Estado intermedio: el input sigue visible para el próximo DNI"""
+        self.timer_limpieza.stop()
+        cambiar_estado(self.lbl_resultado, "verificando")
+        self.lbl_resultado.setText("⏳ Verificando…")
+        self.lbl_resultado.show()
+
+    def agregar_a_lista(self, dni, info, nota=None):
+        hora = QTime.currentTime().toString("HH:mm:ss")
+        if nota == "SIN RESPUESTA":
+            texto = f"⏱ {hora}   DNI {dni} SIN RESPUESTA"
+            color = QColor("#e67e22")
+        elif info is None:
+            texto = f"⚠️ {hora}   DNI {dni} NO ENCONTRADO"
+            color = QColor("#e67e22")
+        elif info.get('error'):
+            accion = "SIN CONFIRMAR" if info.get('sin_confirmar') else "ERROR, ESCANEE DE NUEVO"
+            texto = f"⚠️ {hora}   DNI {dni} {accion}"
+            color = QColor("#e67e22")
+        elif info['acceso']:
+            saldo = "PASE LIBRE" if info['ingresos_restantes'] > 900 else f"Quedan {info['ingresos_restantes']}"
+            texto = f"✅ {hora}   {info['nombre']} {info['apellido']}  ·  {saldo}"
+            if info.get('repetido'):
+                texto += "  (repetido)"
+            if info.get('sin_conexion'):
+                texto += "  (sin conexión)"
+            color = QColor("#27ae60")
+        else:
+            texto = f"⛔ {hora}   {info['nombre']} {info['apellido']}  ·  {info['mensaje'].lstrip('⛔ ')}"
+            color = QColor("#c0392b")
+        if nota and nota != "SIN RESPUESTA":
+            texto += f"  ({nota})"
+
+        item = QListWidgetItem(texto)
+        item.setForeground(color)
+        self.lista_rapida.insertItem(0, item)
+        while self.lista_rapida.count() > MAX_LISTA_RAPIDA:
+            self.lista_rapida.takeItem(self.lista_rapida.count() - 1)
+
+        if nota != "SIN RESPUESTA":
+            self.marcas_ingreso.append(time.monotonic())
+        self.actualizar_ritmo()
+
+    def actualizar_ritmo(self):
+        """Escaneos resueltos en el último minuto y cuántos esperan en cola"""
+        limite = time.monotonic() - 60
+        while self.marcas_ingreso and self.marcas_ingreso[0] < limite:
+            self.marcas_ingreso.popleft()
+        texto = f"{len(self.marcas_ingreso)} ingresos/min"
+        repetidos = self.db.escaneos.estadisticas()["repetidos"]
+        if repetidos:
+            texto += f"  ·  repetidos ignorados: {repetidos}"
+        if self.tareas:
+            texto += f"  ·  en cola: {len(self.tareas)}"
+        self.lbl_ritmo.setText(texto)
+
+    def ingreso_demorado(self):
+        if self.modo_rapido:
+            self.lbl_ritmo.setText(f"⏳ Sistema ocupado, en cola: {len(self.tareas)}")
+            return
+        if self.tareas:
+            cambiar_estado(self.lbl_resultado, "ocupado")
+            self.lbl_resultado.setText("⏳ Sistema ocupado, aguarde…")
 
     def mostrar_resultado_acceso(self, info):
-        self.lbl_reloj.hide()
-        self.lbl_titulo.hide()
-        self.lbl_instruccion.hide()
-        self.input_dni.hide()
-        
         if info['acceso']:
-            color_borde = "#2ecc71"
+            estado = "permitido"
             icono = "✅"
             texto_saldo = f"Ingresos restantes: {info['ingresos_restantes']}"
             if info['ingresos_restantes'] > 900: texto_saldo = "PASE LIBRE"
         else:
-            color_borde = "#e74c3c"
+            estado = "denegado"
             icono = "⛔"
             texto_saldo = info['mensaje']
 
-        self.card.setStyleSheet(f"""
-            QFrame {{
-                background-color: white;
-                border-radius: 30px;
-                border: 5px solid {color_borde};
-            }}
-        """)
-        
         venc = datetime.strptime(info['vencimiento'], '%Y-%m-%d').strftime('%d/%m/%Y') if info['vencimiento'] else "--/--/--"
-        
-        texto_html = f"""
-            <h1 style='font-size: 50px; margin:0;'>{icono}</h1>
-            <h2 style='font-size: 28px; color: #333; margin:5px;'>{info['nombre']} {info['apellido']}</h2>
-            <h3 style='font-size: 20px; color: #555; margin:0;'>Plan: {info['plan']}</h3>
-            <h3 style='font-size: 24px; color: {color_borde}; font-weight: bold; margin:10px;'>{texto_saldo}</h3>
-            <p style='font-size: 16px; color: #777; margin:0;'>Vence: {venc}</p>
-        """
-        self.lbl_resultado.setText(texto_html)
-        self.lbl_resultado.show()
+
+        self.lbl_icono.setText(icono)
+        self.lbl_nombre.setText(f"{info['nombre']} {info['apellido']}")
+        self.lbl_plan.setText(f"Plan: {info['plan']}")
+        self.lbl_saldo.setText(texto_saldo)
+        self.lbl_vence.setText(f"Vence: {venc}" + ("  ·  sin conexión" if info.get('sin_conexion') else ""))
+        cambiar_estado(self.lbl_saldo, estado)
+        cambiar_estado(self.card, estado)
+        self.vistas.setCurrentWidget(self.vista_resultado)
         self.timer_limpieza.start(4000)
 
     def mostrar_error(self, mensaje):
-        self.lbl_reloj.hide()
-        self.lbl_titulo.hide()
-        self.lbl_instruccion.hide()
-        self.input_dni.hide()
-
-        self.card.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 30px;
-                border: 5px solid #e74c3c;
-            }
-        """)
-
-        texto_html = f"""
-            <h1 style='font-size: 50px; margin:0;'>⚠️</h1>
-            <h2 style='font-size: 28px; color: #e74c3c; margin:20px;'>{mensaje}</h2>
-            <p style='font-size: 16px; color: #555;'>Por favor consulta en administración</p>
-        """
-        self.lbl_resultado.setText(texto_html)
-        self.lbl_resultado.show()
+        self.lbl_error.setText(mensaje)
+        cambiar_estado(self.card, "error")
+        self.vistas.setCurrentWidget(self.vista_error)
         self.timer_limpieza.start(3000)
 
     def resetear_pantalla(self):
-        self.card.setStyleSheet("""
-            QFrame {
-                background-color: rgba(255, 255, 255, 0.95);
-                border-radius: 30px;
-                border: 2px solid #ddd;
-            }
-        """)
+        cambiar_estado(self.card, "espera")
         self.lbl_resultado.hide()
         self.lbl_resultado.clear()
-        self.lbl_reloj.show()
-        self.lbl_titulo.show()
-        self.lbl_instruccion.show()
-        self.input_dni.show()
+        self.vistas.setCurrentIndex(0)
         self.input_dni.setFocus()
 
+    def marcar_escaneo(self, tarea):
+        # La latencia se cierra en el próximo pintado de la tarjeta o de la lista
+        if tarea is not None:
+            self._escaneo_pendiente = tarea.inicio
+
+    def eventFilter(self, objeto, evento):
+        if evento.type() == QEvent.Type.Paint and self._escaneo_pendiente is not None:
+            ms = (time.perf_counter() - self._escaneo_pendiente) * 1000
+            self._escaneo_pendiente = None
+            self.latencias.append(ms)
+            log.debug("Escaneo -> pantalla: %.1f ms", ms)
+        return super().eventFilter(objeto, evento)
+
+    def estadisticas_latencia(self):
+        """p50/p95/máximo (ms) de los últimos escaneos, del Enter al resultado pintado"""
+        if not self.latencias:
+            return None
+        ordenadas = sorted(self.latencias)
+        return {
+            "n": len(ordenadas),
+            "p50_ms": ordenadas[len(ordenadas) // 2],
+            "p95_ms": ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))],
+            "max_ms": ordenadas[-1],
+        }
+
+    def showEvent(self, event):
+        if self.cerrada:
+            self.cerrada = False
+            self.timer_foto.start(INTERVALO_FOTO_MS)
+            self.sincronizar_foto()
+        super().showEvent(event)
+
+    def closeEvent(self, event):
+        # Que ningún escaneo o sincronización siga usando la foto local al cerrarla
+        self.timer_foto.stop()
+        self.pool.waitForDone()
+        # El historial diferido de este turno (con los escaneos recién terminados) se
+        # guarda al cerrar el monitor
+        self.db.historial.vaciar()
+        if self.ingresos is not self.kiosco:
+            self.ingresos.cerrar()
+        self.kiosco.cerrar()
+        self.cerrada = True
+        super().closeEvent(event)
+
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_Escape:
             self.close()
+        elif event.key() == Qt.Key.Key_F2:
+            self.modo_rapido = not self.modo_rapido
+            self.aplicar_modo()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    ventana = VentanaPrincipal()
+    Database().crear_tablas()
+    servidor = os.environ.get("MTZ_SERVIDOR_INGRESOS")
+    if "--servidor" in sys.argv[:-1]:
+        servidor = sys.argv[sys.argv.index("--servidor") + 1]
+    ventana = VentanaPrincipal(modo_rapido="--rapido" in sys.argv, servidor=servidor)
     ventana.show()
     sys.exit(app.exec())
\ No newline at end of file
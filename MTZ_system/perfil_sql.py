@@ -0,0 +1,202 @@
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+from instancias import UnaPorBase
+from entorno import numero_env
+
+
+def _normalizar(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+class PerfilSQL(UnaPorBase):
+    """Cuenta y cronometra cada sentencia SQL ejecutada por las conexiones del gestor.
+
+    Las sentencias que tardan más de umbral_ms van a un log rotativo
+    (<base>-consultas-lentas.log) junto con su EXPLAIN QUERY PLAN. Apagado no cuesta
+    más que un chequeo por execute; se enciende con MTZ_PERFIL_SQL=1 o con activar()."""
+
+    ACTIVO = os.environ.get("MTZ_PERFIL_SQL", "0") not in ("", "0")
+    UMBRAL_MS = numero_env("MTZ_SQL_LENTO_MS", 50.0)
+    LOG_BYTES = 1_000_000
+    LOG_COPIAS = 3
+
+    def __init__(self, db_path):
+        self.ruta_log = db_path + "-consultas-lentas.log"
+        self.activo = self.ACTIVO
+        self.umbral_ms = self.UMBRAL_MS
+        self._sentencias = {}  # sql -> [veces, total_ms, max_ms]
+        self._lock = threading.Lock()
+        self._log = None
+
+    def activar(self, activo=True, umbral_ms=None):
+        self.activo = activo
+        if umbral_ms is not None:
+            self.umbral_ms = umbral_ms
+
+    def reiniciar(self):
+        with self._lock:
+            self._sentencias.clear()
+
+    def tabla(self):
+        """[(sql, veces, total_ms, promedio_ms, max_ms)] de mayor a menor tiempo total"""
+        with self._lock:
+            filas = [(sql, v, t, t / v, m) for sql, (v, t, m) in self._sentencias.items()]
+        return sorted(filas, key=lambda fila: fila[2], reverse=True)
+
+    def _registrar(self, conn, sql, parametros, ms):
+        clave = _normalizar(sql)
+        with self._lock:
+            datos = self._sentencias.get(clave)
+            if datos is None:
+                self._sentencias[clave] = [1, ms, ms]
+            else:
+                datos[0] += 1
+                datos[1] += ms
+                if ms > datos[2]:
+                    datos[2] = ms
+        if ms >= self.umbral_ms:
+            self._registrar_lenta(conn, clave, sql, parametros, ms)
+
+    def _registrar_lenta(self, conn, clave, sql, parametros, ms):
+        plan = ""
+        if clave.split(" ", 1)[0].upper() in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+            try:
+                cursor = sqlite3.Cursor(conn)
+                sqlite3.Cursor.execute(cursor, "EXPLAIN QUERY PLAN " + sql, parametros)
+                plan = "".join(f"\n    {fila[3]}" for fila in cursor.fetchall())
+            except sqlite3.Error as e:
+                plan = f"\n    (sin plan: {e})"
+        with self._lock:
+            if self._log is None:
+                self._log = logging.getLogger(f"mtz.sql_lento.{self.ruta_log}")
+                self._log.propagate = False
+                manejador = logging.handlers.RotatingFileHandler(
+                    self.ruta_log, maxBytes=self.LOG_BYTES, backupCount=self.LOG_COPIAS, encoding="utf-8"
+                )
+                manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self._log.addHandler(manejador)
+                self._log.setLevel(logging.INFO)
+        self._log.info("%.1f ms  %s%s", ms, clave, plan)
+
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cronometra cada sentencia hasta terminar de leer sus filas.
+
+    En un SELECT el trabajo grueso ocurre en los fetch, no en execute(): el tiempo
+    de la sentencia es execute() más todos los fetch*/iteración hasta agotar las
+    filas. Se registra al agotarlas, en el próximo execute del cursor o al cerrarlo.
+    Las pausas de quien lee entre fetch y fetch no cuentan."""
+
+    _medicion = None  # [sql, parametros, ms acumulados] de la sentencia en curso
+
+    def _cerrar_medicion(self):
+        medicion = self._medicion
+        if medicion is not None:
+            self._medicion = None
+            self.connection.perfil._registrar(self.connection, *medicion)
+
+    def _medir(self, leer, *args):
+        medicion = self._medicion
+        if medicion is None:
+            return leer(*args)
+        inicio = time.perf_counter()
+        try:
+            return leer(*args)
+        finally:
+            medicion[2] += (time.perf_counter() - inicio) * 1000
+
+    def execute(self, sql, parametros=()):
+        if self._medicion is not None:
+            self._cerrar_medicion()
+        perfil = self.connection.perfil
+        if not perfil.activo:
+            return super().execute(sql, parametros)
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, parametros)
+        except BaseException:
+            perfil._registrar(self.connection, sql, parametros, (time.perf_counter() - inicio) * 1000)
+            raise
+        self._medicion = [sql, parametros, (time.perf_counter() - inicio) * 1000]
+        if self.description is None:
+            # Sin filas que leer (INSERT/UPDATE/...): ya terminó
+            self._cerrar_medicion()
+        return self
+
+    def executemany(self, sql, secuencia):
+        if self._medicion is not None:
+            self._cerrar_medicion()
+        perfil = self.connection.perfil
+        if not perfil.activo:
+            return super().executemany(sql, secuencia)
+        secuencia = list(secuencia)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, secuencia)
+        finally:
+            perfil._registrar(
+                self.connection, sql, secuencia[0] if secuencia else (), (time.perf_counter() - inicio) * 1000
+            )
+
+    def fetchone(self):
+        fila = self._medir(super().fetchone)
+        if fila is None:
+            self._cerrar_medicion()
+        return fila
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        filas = self._medir(super().fetchmany, size)
+        if len(filas) < size:
+            self._cerrar_medicion()
+        return filas
+
+    def fetchall(self):
+        filas = self._medir(super().fetchall)
+        self._cerrar_medicion()
+        return filas
+
+    def __next__(self):
+        try:
+            return self._medir(super().__next__)
+        except StopIteration:
+            self._cerrar_medicion()
+            raise
+
+    def close(self):
+        self._cerrar_medicion()
+        super().close()
+
+    def __del__(self):
+        # Cursor abandonado sin leer todas sus filas
+        try:
+            self._cerrar_medicion()
+        except Exception:
+            pass
+
+
+class ConexionInstrumentada(sqlite3.Connection):
+    """Conexión cuyos cursores, conn.execute y conn.executemany pasan por PerfilSQL"""
+
+    perfil = None
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia):
+        return self.cursor().executemany(sql, secuencia)
+
+
+def conectar_instrumentada(db_path, perfil, **opciones):
+    """Conexión aparte (archivo, respaldo) que también cuenta en el perfil de esa base"""
+    conn = sqlite3.connect(db_path, factory=ConexionInstrumentada, **opciones)
+    conn.perfil = perfil
+    return conn
@@ -6,6 +6,7 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 from database import Database
+from escritura_qt import EscrituraQt
 
 class VentanaRegistro(QWidget):
     def __init__(self, parent=None):
@@ -118,15 +119,31 @@ class VentanaRegistro(QWidget):
                 )
                 
                 if respuesta == QMessageBox.StandardButton.Yes:
-                    if self.db.reactivar_socio(nombre, apellido, dni, plan_nombre, ingresos):
-                        QMessageBox.information(self, "Reactivado", "¡Socio reactivado exitosamente!")
-                        self.limpiar_formulario() 
-                    else:
-                        QMessageBox.critical(self, "Error", "No se pudo reactivar.")
+                    self.btn_guardar.setEnabled(False)
+                    EscrituraQt(
+                        self.db.escribir(self.db.reactivar_socio, nombre, apellido, dni, plan_nombre, ingresos),
+                        self, self.reactivacion_terminada, lambda _: self.reactivacion_terminada(False)
+                    )
                 return
         
-        exito = self.db.registrar_socio(nombre, apellido, dni, plan_nombre, ingresos)
-        
+        # La escritura va al hilo escritor; el formulario no se congela mientras tanto
+        self.btn_guardar.setEnabled(False)
+        EscrituraQt(
+            self.db.escribir(self.db.registrar_socio, nombre, apellido, dni, plan_nombre, ingresos),
+            self, lambda exito: self.registro_terminado(exito, nombre, apellido),
+            lambda _: self.registro_terminado(False, nombre, apellido)
+        )
+
+    def reactivacion_terminada(self, exito):
+        self.btn_guardar.setEnabled(True)
+        if exito:
+            QMessageBox.information(self, "Reactivado", "¡Socio reactivado exitosamente!")
+            self.limpiar_formulario() 
+        else:
+            QMessageBox.critical(self, "Error", "No se pudo reactivar.")
+
+    def registro_terminado(self, exito, nombre, apellido):
+        self.btn_guardar.setEnabled(True)
         if exito:
             QMessageBox.information(self, "Éxito", f"Socio {nombre} {apellido} registrado correctamente.")
             self.limpiar_formulario()
@@ -5,7 +5,8 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt
 from database import Database
-from datetime import datetime
+from metricas import ServicioMetricas
+from escritura_qt import EscrituraQt
 
 class TarjetaDato(QFrame):
     """Una tarjetita bonita para mostrar un número y un título"""
@@ -42,10 +43,11 @@ class VentanaReportes(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Reportes y Estadísticas - MTZ")
-        self.setFixedSize(800, 500)
+        self.setFixedSize(800, 820)
         self.setStyleSheet("background-color: #2b2b2b; color: white;")
         
         self.db = Database()
+        self.metricas = ServicioMetricas.obtener(self.db)
         
         layout = QVBoxLayout()
         layout.setContentsMargins(40, 40, 40, 40)
@@ -60,6 +62,16 @@ class VentanaReportes(QDialog):
         self.grid = QGridLayout()
         self.grid.setSpacing(20)
         layout.addLayout(self.grid)
+
+        # Asistencia (sale de asistencia_horaria, no del historial crudo)
+        fila_asistencia = QHBoxLayout()
+        self.lbl_horas = QLabel()
+        self.lbl_dias = QLabel()
+        for lbl in (self.lbl_horas, self.lbl_dias):
+            lbl.setStyleSheet("font-family: monospace; font-size: 13px; background-color: #333; padding: 10px; border-radius: 8px;")
+            lbl.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+            fila_asistencia.addWidget(lbl)
+        layout.addLayout(fila_asistencia)
         
         # Botón para recalcular
         btn_actualizar = QPushButton("🔄 Actualizar Métricas")
@@ -89,37 +101,13 @@ class VentanaReportes(QDialog):
                 widget.deleteLater()
 
         # 1. OBTENER DATOS DE LA DB
-        conn = self.db.conectar()
-        if not conn:
-            return
-        
-        cursor = conn.cursor()
-        
-        # A. Total Socios Activos
-        cursor.execute("SELECT COUNT(*) FROM miembros WHERE activo = 1")
-        total_socios = cursor.fetchone()[0]
-        
-        # B. Socios Vencidos (Fecha vencimiento < Hoy)
-        hoy = datetime.now().strftime('%Y-%m-%d')
-        cursor.execute("SELECT COUNT(*) FROM miembros WHERE activo = 1 AND fecha_vencimiento < ?", (hoy,))
-        total_vencidos = cursor.fetchone()[0]
-        
-        # C. Socios al Día (Activos - Vencidos)
-        total_al_dia = total_socios - total_vencidos
-        
-        # D. Estimación de Ingresos (Suma de precios de planes activos)
-        # Esto asume que todos pagaron su plan actual. Es una estimación de "Caja Mensual Potencial".
-        sql_ingresos = """
-            SELECT SUM(p.precio) 
-            FROM miembros m 
-            JOIN planes p ON m.plan_id = p.id 
-            WHERE m.activo = 1
-        """
-        cursor.execute(sql_ingresos)
-        resultado_ingresos = cursor.fetchone()[0]
-        ingresos_estimados = resultado_ingresos if resultado_ingresos else 0
-        
-        conn.close()
+        # Las mismas métricas del Dashboard; se recalculan solo si la base cambió
+        metricas = self.metricas.metricas()
+        total_socios = metricas["activos"]
+        total_vencidos = metricas["vencidos"]
+        total_al_dia = metricas["al_dia"]
+        # Estimación de "Caja Mensual Potencial": suma de los precios de los planes activos
+        ingresos_estimados = metricas["ingreso_estimado"]
         
         # 2. CREAR LAS TARJETAS VISUALES
         
@@ -141,6 +129,42 @@ class VentanaReportes(QDialog):
         card_plata.setFixedWidth(640)
         self.grid.addWidget(card_plata, 1, 0, 1, 3, Qt.AlignmentFlag.AlignCenter)
 
+        self.mostrar_asistencia()
+
+    def mostrar_asistencia(self):
+        # Solo resume los accesos nuevos desde la última vez; en el hilo escritor,
+        # y al terminar se dibuja (mientras tanto la ventana ya se ve)
+        self.lbl_horas.setText("Calculando asistencia…")
+        EscrituraQt(
+            self.db.escribir(self.db.actualizar_asistencia),
+            self, self.dibujar_asistencia, self.dibujar_asistencia
+        )
+
+    def dibujar_asistencia(self, _=None):
+        horas = self.db.horas_pico(30)
+        maximo = max((promedio for _, promedio in horas), default=0) or 1
+        lineas = ["Horas pico (ingresos por día, últimos 30 días)", ""]
+        for hora, promedio in horas:
+            barra = "█" * round(promedio / maximo * 20)
+            lineas.append(f"{hora:02d}:00  {barra:<20} {promedio:5.1f}")
+        if not horas:
+            lineas.append("Sin accesos registrados.")
+        self.lbl_horas.setText("\n".join(lineas))
+
+        dias = self.db.tendencia_diaria(14)
+        maximo = max((ingresos for _, ingresos, _ in dias), default=0) or 1
+        lineas = ["Ingresos por día (últimos 14 días)", ""]
+        for fecha, ingresos, rechazos in dias:
+            barra = "█" * round(ingresos / maximo * 20)
+            lineas.append(f"{fecha[8:10]}/{fecha[5:7]}  {barra:<20} {ingresos:4d}  ({rechazos} rech.)")
+        planes = self.db.asistencia_por_plan(30)
+        if planes:
+            lineas += ["", "Por plan (últimos 30 días)"]
+            lineas += [f"{plan[:22]:<22} {ingresos:6d}" for plan, ingresos in planes]
+        if not dias:
+            lineas.append("Sin accesos registrados.")
+        self.lbl_dias.setText("\n".join(lineas))
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     ventana = VentanaReportes()
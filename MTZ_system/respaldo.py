@@ -0,0 +1,91 @@
+"""Respaldo en caliente de la base con la API de backup de SQLite.
+
+Copia página a página desde una foto consistente (incluye lo que todavía está en
+el -wal), así que los kioscos pueden seguir registrando ingresos mientras corre.
+Se usa desde Herramientas (en un hilo aparte) o sin interfaz:
+    python respaldo.py Respaldo.db      (o Respaldo.db.gz para comprimirlo)
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from database import Database
+from perfil_sql import conectar_instrumentada
+
+PAGINAS_POR_PASO = 256
+
+
+def crear_respaldo(db, destino, comprimir=None, progreso=None, paginas=PAGINAS_POR_PASO):
+    """Copia la base a `destino` y verifica la copia con PRAGMA integrity_check.
+
+    Si comprimir es None se comprime cuando `destino` termina en .gz.
+    progreso(copiadas, total) se llama después de cada paso. Devuelve un dict con
+    ruta, segundos, bytes, bytes_base e integridad; si la copia no pasa la
+    verificación se borra y se lanza sqlite3.DatabaseError."""
+    if comprimir is None:
+        comprimir = destino.endswith(".gz")
+    inicio = time.perf_counter()
+    temporal = destino + ".parcial"
+    copia = temporal + ".db" if comprimir else temporal
+
+    origen = conectar_instrumentada(db.db_path, db.perfil, timeout=db.gestor.TIMEOUT, isolation_level=None)
+    try:
+        # Transacción de lectura abierta: todos los pasos copian la misma foto
+        origen.execute("BEGIN")
+        origen.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        bytes_base = origen.execute("PRAGMA page_count").fetchone()[0] * origen.execute("PRAGMA page_size").fetchone()[0]
+        copia_conn = sqlite3.connect(copia)
+        try:
+            origen.backup(
+                copia_conn, pages=paginas,
+                progress=(lambda estado, restantes, total: progreso(total - restantes, total)) if progreso else None,
+            )
+            integridad = copia_conn.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            copia_conn.close()
+        origen.rollback()
+    except BaseException:
+        if os.path.exists(copia):
+            os.remove(copia)
+        raise
+    finally:
+        origen.close()
+
+    try:
+        if integridad != "ok":
+            raise sqlite3.DatabaseError(f"La copia no pasó integrity_check: {integridad}")
+        if comprimir:
+            with open(copia, "rb") as entrada, gzip.open(temporal, "wb", compresslevel=6) as salida:
+                shutil.copyfileobj(entrada, salida, 1 << 20)
+            os.remove(copia)
+        os.replace(temporal, destino)
+    except BaseException:
+        for ruta in (copia, temporal):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        raise
+
+    return {
+        "ruta": destino,
+        "segundos": time.perf_counter() - inicio,
+        "bytes": os.path.getsize(destino),
+        "bytes_base": bytes_base,
+        "integridad": integridad,
+    }
+
+
+def describir_respaldo(resultado):
+    return (
+        f"{resultado['ruta']}\n"
+        f"Tamaño: {resultado['bytes'] / 1048576:.1f} MB (base: {resultado['bytes_base'] / 1048576:.1f} MB)\n"
+        f"Duración: {resultado['segundos']:.1f} s - Verificación: {resultado['integridad']}"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python respaldo.py destino.db  (destino.db.gz para comprimir)")
+        sys.exit(1)
+    print(describir_respaldo(crear_respaldo(Database(), sys.argv[1])))
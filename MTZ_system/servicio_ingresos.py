@@ -0,0 +1,279 @@
+"""Servicio de ingresos: un solo proceso escribe en la base y los kioscos le piden por red.
+
+Con varios kioscos abriendo la misma base cada escaneo compite por el lock de
+escritura de SQLite. Acá los pedidos se toman en orden de llegada y todos los que
+se juntaron mientras se confirmaba el lote anterior se registran en una misma
+transacción (commit agrupado, Database.registrar_ingresos), en el hilo escritor
+del proceso (EjecutorEscrituras), el mismo que usan las demás escrituras.
+
+Protocolo: una línea JSON por pedido y una por respuesta, sobre TCP.
+    -> {"dni": "30111222"}
+    <- {"ok": true, "resultado": {...}}   (el mismo dict de registrar_ingreso, o null si el DNI no existe)
+    <- {"ok": false, "error": "..."}      (la base falló: el escaneo no se registró)
+
+Servidor (en la PC de recepción):
+    python servicio_ingresos.py [--host 0.0.0.0] [--puerto 8765]
+Kiosco cliente:
+    python monitor.py --servidor 192.168.0.10:8765
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from entorno import numero_env
+
+HOST = os.environ.get("MTZ_HOST_INGRESOS", "127.0.0.1")
+PUERTO = numero_env("MTZ_PUERTO_INGRESOS", 8765)
+
+
+class ServicioNoDisponible(ConnectionError):
+    """El servicio de ingresos no contestó (caído, sin red o timeout).
+
+    Con enviado=True el pedido salió pero no llegó la respuesta: el servicio pudo
+    haberlo registrado, así que no se debe repetir en otro lado."""
+
+    def __init__(self, mensaje, enviado=False):
+        super().__init__(mensaje)
+        self.enviado = enviado
+
+
+class ServicioIngresos:
+    """Servidor asyncio; la base se escribe solo desde el hilo escritor de Database"""
+
+    LOTE_MAX = 64
+    MAX_LINEA = 4096
+
+    def __init__(self, db, host=HOST, puerto=PUERTO):
+        self.db = db
+        self.host = host
+        self.puerto = puerto
+        self.cola = None
+        self.servidor = None
+        self.conexiones = set()
+        self.lotes = 0
+        self.pedidos = 0
+
+    async def iniciar(self):
+        self.cola = asyncio.Queue()
+        self.servidor = await asyncio.start_server(self.atender, self.host, self.puerto, limit=self.MAX_LINEA)
+        # Con puerto 0 el sistema elige uno libre (pruebas y benchmarks)
+        self.puerto = self.servidor.sockets[0].getsockname()[1]
+        self._tarea_escritor = asyncio.create_task(self._escribir())
+        return self
+
+    async def servir(self):
+        await self.iniciar()
+        print(f"Servicio de ingresos escuchando en {self.host}:{self.puerto}")
+        async with self.servidor:
+            await self.servidor.serve_forever()
+
+    async def detener(self):
+        if self.servidor:
+            self.servidor.close()
+        if self.cola is not None:
+            await self.cola.join()
+            self._tarea_escritor.cancel()
+        # Los kioscos conectados ven la conexión cerrada y pasan a la base local
+        for writer in list(self.conexiones):
+            writer.close()
+        while self.conexiones:
+            await asyncio.sleep(0.01)
+        if self.servidor:
+            await self.servidor.wait_closed()
+        self.db.historial.vaciar()
+
+    async def registrar(self, dni):
+        """Encola el escaneo y espera su resultado"""
+        futuro = asyncio.get_running_loop().create_future()
+        await self.cola.put((dni, futuro))
+        return await futuro
+
+    async def _escribir(self):
+        while True:
+            pedidos = [await self.cola.get()]
+            # Todo lo que llegó mientras se confirmaba el lote anterior va en este
+            while len(pedidos) < self.LOTE_MAX and not self.cola.empty():
+                pedidos.append(self.cola.get_nowait())
+            try:
+                # estricto: un error de la base vuelve como {"ok": false}, no como "no existe".
+                # agrupar=False: el pedido ya es un lote y confirma en su propia transacción
+                resultados = await asyncio.wrap_future(self.db.escritor.enviar(
+                    self.db.registrar_ingresos, [dni for dni, _ in pedidos], estricto=True, agrupar=False
+                ))
+                for (_, futuro), resultado in zip(pedidos, resultados):
+                    if not futuro.done():
+                        futuro.set_result(resultado)
+            except Exception as e:
+                for _, futuro in pedidos:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+            finally:
+                self.lotes += 1
+                self.pedidos += len(pedidos)
+                for _ in pedidos:
+                    self.cola.task_done()
+
+    async def atender(self, reader, writer):
+        """Una conexión por kiosco, reutilizada para todos sus escaneos"""
+        self.conexiones.add(writer)
+        try:
+            while True:
+                try:
+                    linea = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    break
+                if not linea:
+                    break
+                try:
+                    pedido = json.loads(linea)
+                    dni = str(pedido["dni"]).strip()
+                    respuesta = {"ok": True, "resultado": await self.registrar(dni)}
+                except (ValueError, KeyError, TypeError):
+                    respuesta = {"ok": False, "error": "pedido inválido"}
+                except Exception as e:
+                    respuesta = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(respuesta, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.conexiones.discard(writer)
+            writer.close()
+
+
+class ClienteIngresos:
+    """Cliente bloqueante del kiosco: una conexión persistente, reconectada a pedido.
+
+    Si el servicio no contesta se lanza ServicioNoDisponible y durante REINTENTO_S
+    segundos ni se intenta (cada escaneo iría a esperar el timeout)."""
+
+    TIMEOUT_S = 2.0
+    REINTENTO_S = 10.0
+
+    def __init__(self, host=HOST, puerto=PUERTO, timeout=None):
+        self.direccion = (host, int(puerto))
+        self.timeout = self.TIMEOUT_S if timeout is None else timeout
+        self._socket = None
+        self._lectura = None
+        self._caido_hasta = 0.0
+        self._enviado = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_texto(cls, texto):
+        """'host:puerto' o solo 'host'"""
+        host, _, puerto = texto.rpartition(":")
+        if not host:
+            return cls(puerto or HOST, PUERTO)
+        return cls(host, int(puerto))
+
+    def _conectar(self):
+        self._socket = socket.create_connection(self.direccion, timeout=self.timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._lectura = self._socket.makefile("rb")
+
+    def cerrar(self):
+        if self._socket is not None:
+            try:
+                self._lectura.close()
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._lectura = None
+
+    def _pedir(self, pedido):
+        self._enviado = False
+        if self._socket is None:
+            self._conectar()
+        self._socket.sendall(json.dumps(pedido).encode("utf-8") + b"\n")
+        self._enviado = True
+        linea = self._lectura.readline()
+        if not linea:
+            raise ConnectionResetError("el servicio cerró la conexión")
+        return json.loads(linea)
+
+    def registrar_ingreso(self, dni):
+        """Mismo contrato que Database.registrar_ingreso; si el servicio contesta con
+        error devuelve {"error": ...} (None es solo "DNI no encontrado")"""
+        with self._lock:
+            if time.monotonic() < self._caido_hasta:
+                raise ServicioNoDisponible("servicio de ingresos no disponible")
+            respuesta = None
+            # Un reintento: la conexión guardada pudo haberse cortado (servicio reiniciado)
+            for intento in range(2):
+                reutilizada = self._socket is not None
+                try:
+                    respuesta = self._pedir({"dni": dni})
+                    break
+                except (OSError, ValueError) as e:
+                    self.cerrar()
+                    if isinstance(e, socket.timeout) and self._enviado:
+                        self._caido_hasta = time.monotonic() + self.REINTENTO_S
+                        raise ServicioNoDisponible(str(e), enviado=True) from e
+                    if intento == 1 or not reutilizada:
+                        self._caido_hasta = time.monotonic() + self.REINTENTO_S
+                        raise ServicioNoDisponible(str(e)) from e
+            if not respuesta.get("ok"):
+                print(f"Error en servicio de ingresos: {respuesta.get('error')}")
+                return {"error": respuesta.get("error") or "error en el servicio de ingresos"}
+            return respuesta.get("resultado")
+
+
+class IngresoConRespaldo:
+    """Usa el servicio si responde; si no, registra directo en la base local"""
+
+    def __init__(self, cliente, db):
+        self.cliente = cliente
+        self.db = db
+        self.en_respaldo = False
+
+    def registrar_ingreso(self, dni):
+        try:
+            resultado = self.cliente.registrar_ingreso(dni)
+            self.en_respaldo = False
+            return resultado
+        except ServicioNoDisponible as e:
+            if e.enviado:
+                # Pudo haberse descontado el pase allá: no lo repetimos localmente, pero
+                # tampoco se da por "no encontrado" (el monitor pide verificarlo)
+                print(f"Sin respuesta del servicio de ingresos para {dni}: {e}")
+                return {"error": f"sin respuesta del servicio de ingresos ({e})", "sin_confirmar": True}
+            if not self.en_respaldo:
+                print(f"Servicio de ingresos no disponible ({e}); se registra en la base local")
+            self.en_respaldo = True
+            return self.db.registrar_ingreso(dni)
+
+    def cerrar(self):
+        self.cliente.cerrar()
+
+
+if __name__ == "__main__":
+    from database import Database
+    host, puerto = HOST, PUERTO
+    argumentos = sys.argv[1:]
+    try:
+        while argumentos:
+            opcion, valor = argumentos[0], argumentos[1]
+            if opcion == "--host":
+                host = valor
+            elif opcion == "--puerto":
+                puerto = int(valor)
+            else:
+                raise ValueError(opcion)
+            argumentos = argumentos[2:]
+    except (IndexError, ValueError):
+        print("Uso: python servicio_ingresos.py [--host 0.0.0.0] [--puerto 8765]")
+        sys.exit(1)
+    db = Database()
+    db.crear_tablas()
+    servicio = ServicioIngresos(db, host, puerto)
+    try:
+        asyncio.run(servicio.servir())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.historial.vaciar()
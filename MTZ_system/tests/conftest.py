@@ -0,0 +1,43 @@
+"""Pruebas de la capa de datos, sin interfaz.
+
+Uso (desde MTZ_system/):
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+# Los módulos del programa se importan por nombre, como cuando se corre desde MTZ_system/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+def alta(db, dni, ingresos=10, vencimiento="2999-01-01", plan="Libre"):
+    """Da de alta un socio y lo deja con los pases y el vencimiento pedidos. Devuelve su id."""
+    assert db.registrar_socio("Ana", "Paz", dni, plan, ingresos)
+    with db.transaccion() as cursor:
+        cursor.execute(
+            "UPDATE miembros SET ingresos_restantes = ?, fecha_vencimiento = ? WHERE dni = ?",
+            (ingresos, vencimiento, dni),
+        )
+        cursor.execute("SELECT id FROM miembros WHERE dni = ?", (dni,))
+        return cursor.fetchone()[0]
+
+
+def consultar(db, sql, params=()):
+    with db.transaccion() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Base nueva en una carpeta temporal, sin anti-repetidos (cada escaneo llega a SQLite)"""
+    monkeypatch.setenv("MTZ_DIR_KIOSCO", str(tmp_path / "kiosco"))
+    base = Database(str(tmp_path / "gym_mtz.db"))
+    base.crear_tablas()
+    base.escaneos.configurar(ventana=0)
+    yield base
+    base.historial.vaciar()
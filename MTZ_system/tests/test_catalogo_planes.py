@@ -0,0 +1,41 @@
+import sqlite3
+import threading
+
+from catalogo_planes import CatalogoPlanes
+
+
+def test_misma_foto_mientras_nada_cambia(db):
+    foto = db.planes.foto()
+    assert db.planes.foto() is foto
+    assert foto.id_de("Libre") is not None
+    assert foto.precio_de_id(foto.id_de("Libre")) == foto.por_nombre["Libre"][1]
+
+
+def test_cambio_de_planes_desde_otra_conexion_se_ve(db):
+    foto = db.planes.foto()
+    externa = sqlite3.connect(db.db_path)
+    with externa:
+        externa.execute("UPDATE planes SET precio = 1 WHERE nombre = 'Libre'")
+    externa.close()
+    nueva = db.planes.foto()
+    assert nueva is not foto and nueva.version > foto.version
+    assert nueva.por_nombre["Libre"][1] == 1
+    # Otra escritura que no toca planes: se revisa la versión y sigue la misma foto
+    with db.transaccion() as cursor:
+        cursor.execute("INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (1, '2026-01-01', 'x')")
+    assert db.planes.foto() is nueva
+
+
+def test_una_sola_foto_para_todos_los_hilos(db):
+    assert CatalogoPlanes.obtener(db.gestor) is db.planes
+    fotos = []
+
+    def leer():
+        fotos.append(db.planes.foto())
+
+    hilos = [threading.Thread(target=leer) for _ in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len({id(foto) for foto in fotos}) == 1
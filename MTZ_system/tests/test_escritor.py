@@ -0,0 +1,127 @@
+import contextlib
+import sqlite3
+import threading
+
+import pytest
+
+from escritor_db import EjecutorEscrituras
+from conftest import alta, consultar
+
+
+def _insertar(db, nombre):
+    with db.transaccion() as cursor:
+        cursor.execute("INSERT INTO planes (nombre, precio) VALUES (?, 1)", (nombre,))
+    return threading.current_thread().name
+
+
+def _insertar_en_lote(db, nombre):
+    # Dentro de un lote la transacción del lote ya está abierta antes del trabajo
+    en_lote = db.gestor.en_transaccion()
+    _insertar(db, nombre)
+    return en_lote
+
+
+def test_escrituras_corren_en_un_solo_hilo(db):
+    hilos = {db.escribir(_insertar, db, f"plan {i}").result() for i in range(20)}
+    assert hilos == {"EscritorDB"}
+    # Los métodos @escritura esperan el resultado como antes
+    assert db.registrar_socio("Ana", "Paz", "1", "Libre", 5) is True
+    assert db.escritor.en_hilo_escritor() is False
+
+
+def test_lote_agrupado_aisla_el_error_de_cada_trabajo(db):
+    ejecutor = db.escritor
+    liberar = threading.Event()
+    # Un trabajo que tarda: lo que se encola mientras tanto se confirma en un solo lote
+    bloqueo = ejecutor.enviar(liberar.wait, 5, agrupar=False)
+    futuros = [ejecutor.enviar(_insertar_en_lote, db, nombre) for nombre in ("A", "B", "Libre", "C")]
+    liberar.set()
+    bloqueo.result()
+    resultados = []
+    for futuro in futuros:
+        try:
+            resultados.append(futuro.result())
+        except sqlite3.IntegrityError:
+            resultados.append("error")
+    assert resultados == [True, True, "error", True]
+    # "Libre" ya existía: su SAVEPOINT se deshizo sin tocar a los demás
+    assert consultar(db, "SELECT nombre FROM planes WHERE nombre IN ('A', 'B', 'C') ORDER BY 1") == [
+        ("A",), ("B",), ("C",),
+    ]
+
+
+def test_commit_fallido_del_lote_reintenta_de_a_uno(db, monkeypatch):
+    ejecutor = db.escritor
+    original = ejecutor.gestor.transaccion
+    fallas = []
+
+    @contextlib.contextmanager
+    def transaccion(inmediata=False):
+        # Solo el lote (la transacción externa del hilo escritor) falla al confirmar
+        externa = not ejecutor.gestor.en_transaccion() and not fallas
+        with original(inmediata) as cursor:
+            yield cursor
+            if externa:
+                fallas.append(True)
+                raise sqlite3.OperationalError("database is locked")
+
+    liberar = threading.Event()
+    bloqueo = ejecutor.enviar(liberar.wait, 5, agrupar=False)
+    futuros = [ejecutor.enviar(_insertar, db, nombre) for nombre in ("X", "Y", "Z")]
+    monkeypatch.setattr(ejecutor.gestor, "transaccion", transaccion)
+    liberar.set()
+    bloqueo.result()
+    assert [f.result() for f in futuros] == ["EscritorDB"] * 3
+    assert fallas == [True]
+    assert consultar(db, "SELECT COUNT(*) FROM planes WHERE nombre IN ('X', 'Y', 'Z')") == [(3,)]
+
+
+def test_ejecutar_desde_el_hilo_escritor_no_se_bloquea(db):
+    ejecutor = db.escritor
+
+    def anidado():
+        return ejecutor.ejecutar(_insertar, db, "anidado")
+
+    assert ejecutor.enviar(anidado).result(timeout=5) == "EscritorDB"
+
+
+def test_trabajo_no_agrupable_conserva_su_lugar(db):
+    ejecutor = db.escritor
+    orden = []
+    liberar = threading.Event()
+    bloqueo = ejecutor.enviar(liberar.wait, 5, agrupar=False)
+    futuros = [
+        ejecutor.enviar(orden.append, 1),
+        ejecutor.enviar(orden.append, 2, agrupar=False),
+        ejecutor.enviar(orden.append, 3),
+    ]
+    liberar.set()
+    bloqueo.result()
+    for futuro in futuros:
+        futuro.result()
+    assert orden == [1, 2, 3]
+
+
+def test_historial_diferido_y_archivo_escriben_por_el_hilo_escritor(db, monkeypatch):
+    m_id = alta(db, "1")
+    vistos = []
+    original = EjecutorEscrituras.ejecutar
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        vistos.append(funcion.__name__)
+        return original(self, funcion, *args, **kwargs)
+
+    monkeypatch.setattr(EjecutorEscrituras, "ejecutar", ejecutar)
+    db.historial.registrar(m_id, "2000-01-01 10:00:00", "Ingreso")
+    assert db.historial.vaciar() == 1
+    db.actualizar_asistencia()
+    monkeypatch.setattr(db.archivo, "PAUSA_S", 0)
+    assert db.archivo.archivar(meses=1) == 1
+    assert "_insertar" in vistos and "_borrar_de_principal" in vistos
+
+
+@pytest.fixture(autouse=True)
+def _sin_trabajos_colgados(db):
+    yield
+    # Ningún trabajo queda esperando en la cola al terminar cada prueba
+    db.escritor.enviar(lambda: None).result(timeout=5)
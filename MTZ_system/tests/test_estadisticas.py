@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from conftest import alta, consultar
+
+VENCIDOS_ORIGINAL = "SELECT COUNT(*) FROM miembros WHERE activo = 1 AND fecha_vencimiento < ?"
+POR_PLAN = "SELECT IFNULL(plan_id, 0), COUNT(*) FROM miembros WHERE activo = 1 GROUP BY 1 ORDER BY 1"
+
+
+def _contadores(db):
+    return consultar(db, "SELECT plan_id, activos FROM estadisticas WHERE activos <> 0 ORDER BY plan_id")
+
+
+def test_triggers_siguen_altas_bajas_y_cambios(db):
+    ids = [alta(db, str(dni), vencimiento=venc) for dni, venc in
+           ((1, "2000-01-01"), (2, "2999-01-01"), (3, None), (4, ""), (5, "2999-01-01"))]
+    assert _contadores(db) == consultar(db, POR_PLAN)
+
+    assert db.renovar_socio(ids[0], "Menores", 8)
+    assert db.eliminar_socio(ids[1])
+    assert db.reactivar_socio("Ana", "Paz", "2", "Box/Funcional", 4)
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE miembros SET plan_id = NULL WHERE id = ?", (ids[2],))
+        cursor.execute("DELETE FROM miembros WHERE id = ?", (ids[4],))
+    assert _contadores(db) == consultar(db, POR_PLAN)
+    assert db.verificar_estadisticas() is True
+
+
+def test_descontar_pases_no_toca_los_contadores(db):
+    alta(db, "1", ingresos=3)
+    antes = consultar(db, "SELECT * FROM estadisticas_vencimientos")
+    db.registrar_ingreso("1")
+    assert consultar(db, "SELECT * FROM estadisticas_vencimientos") == antes
+
+
+def test_vencidos_igual_que_la_consulta_original(db):
+    # '' cuenta como vencido ('' < hoy) y NULL no, como en la versión original
+    for dni, venc in ((1, "2000-01-01"), (2, "2999-01-01"), (3, None), (4, ""), (5, "")):
+        alta(db, str(dni), vencimiento=venc)
+    db.eliminar_socio(consultar(db, "SELECT id FROM miembros WHERE dni = '5'")[0][0])
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    metricas = db.obtener_metricas()
+    assert metricas["vencidos"] == consultar(db, VENCIDOS_ORIGINAL, (hoy,))[0][0] == 2
+    assert metricas["activos"] == 4
+
+
+def test_verificar_estadisticas_corrige_contadores_desfasados(db):
+    alta(db, "1")
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE estadisticas SET activos = activos + 5")
+    assert db.verificar_estadisticas() is False
+    assert db.verificar_estadisticas() is True
+    assert db.obtener_metricas()["activos"] == 1
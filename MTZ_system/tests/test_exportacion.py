@@ -0,0 +1,37 @@
+import csv
+import os
+
+from exportacion import ENCABEZADO, exportar_socios
+from conftest import alta
+
+
+def _leer(archivo):
+    with open(archivo, newline="", encoding="utf-8-sig") as file:
+        return list(csv.reader(file, delimiter=";"))
+
+
+def test_exporta_todos_los_socios_por_lotes(db, tmp_path):
+    for dni in range(1, 8):
+        alta(db, str(dni), ingresos=dni)
+    avances = []
+    archivo = str(tmp_path / "socios.csv")
+    assert exportar_socios(db, archivo, progreso=lambda hechas, total: avances.append((hechas, total)), lote=3) == 7
+    assert avances == [(3, 7), (6, 7), (7, 7)]
+    filas = _leer(archivo)
+    assert filas[0] == ENCABEZADO
+    assert sorted(fila[2] for fila in filas[1:]) == [str(dni) for dni in range(1, 8)]
+    assert {fila[6] for fila in filas[1:]} == {"SI"}
+
+
+def test_exportacion_cancelada_no_deja_archivos(db, tmp_path):
+    for dni in range(1, 8):
+        alta(db, str(dni))
+    archivo = tmp_path / "socios.csv"
+    archivo.write_text("anterior", encoding="utf-8")
+    avances = []
+    assert exportar_socios(
+        db, str(archivo), progreso=lambda hechas, total: avances.append(hechas), cancelado=lambda: bool(avances), lote=3
+    ) is None
+    # El archivo anterior queda intacto y no queda el .parcial
+    assert archivo.read_text(encoding="utf-8") == "anterior"
+    assert not (tmp_path / "socios.csv.parcial").exists()
@@ -0,0 +1,110 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import alta, consultar
+
+
+def _diario(db, nombre, registros):
+    os.makedirs(db.historial.directorio, exist_ok=True)
+    with open(os.path.join(db.historial.directorio, nombre), "w", encoding="utf-8") as diario:
+        for registro in registros:
+            diario.write(json.dumps(registro) + "\n")
+        # Última línea cortada por la caída
+        diario.write('[99, 1, "2026-01')
+
+
+def test_recuperar_inserta_solo_lo_que_falta_del_diario(db):
+    m_id = alta(db, "1")
+    registros = [[seq, m_id, f"2026-01-01 10:0{seq}:00", "Ingreso"] for seq in range(1, 6)]
+    _diario(db, "1234-1.jsonl", registros)
+    # El proceso caído ya había insertado hasta la secuencia 2
+    with db.transaccion() as cursor:
+        cursor.executemany(
+            "INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)",
+            [r[1:] for r in registros[:2]],
+        )
+        cursor.execute("INSERT INTO bitacora_aplicada (archivo, ultimo_seq) VALUES ('1234-1.jsonl', 2)")
+
+    assert db.historial.recuperar() == 3
+    assert db.historial.recuperar() == 0
+    assert not os.path.exists(os.path.join(db.historial.directorio, "1234-1.jsonl"))
+    assert consultar(db, "SELECT COUNT(*), COUNT(DISTINCT fecha_hora) FROM historial_acceso") == [(5, 5)]
+    assert consultar(db, "SELECT COUNT(*) FROM bitacora_aplicada WHERE archivo = '1234-1.jsonl'") == [(0,)]
+
+
+def test_historial_diferido_se_vacia_en_un_lote(db):
+    m_id = alta(db, "1")
+    for i in range(10):
+        db.historial.registrar(m_id, f"2026-01-01 10:00:{i:02d}", "Ingreso")
+    assert db.historial.vaciar() == 10
+    assert db.historial.vaciar() == 0
+    assert consultar(db, "SELECT COUNT(*) FROM historial_acceso") == [(10,)]
+
+
+@pytest.fixture
+def historial_largo(db, monkeypatch):
+    """Tres socios con un acceso por día durante 400 días (varios años calendario)"""
+    monkeypatch.setattr(db.archivo, "PAUSA_S", 0)
+    monkeypatch.setattr(db.archivo, "LOTE", 97)
+    socios = [alta(db, str(dni)) for dni in (1, 2, 3)]
+    hoy = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    filas = []
+    for dias in range(400):
+        dia = hoy - timedelta(days=dias)
+        for i, m_id in enumerate(socios):
+            tipo = "Ingreso" if (dias + i) % 7 else "Vencido"
+            filas.append((m_id, (dia + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S'), tipo))
+    with db.transaccion() as cursor:
+        cursor.executemany(
+            "INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES (?, ?, ?)", filas
+        )
+    return db
+
+
+def _todas_las_paginas(db, limite, **filtros):
+    filas = []
+    pagina = db.pagina_historial(limite, **filtros)
+    while pagina:
+        filas += pagina
+        if len(pagina) < limite:
+            break
+        pagina = db.pagina_historial(limite, clave=(pagina[-1][1], pagina[-1][0]), **filtros)
+    return filas
+
+
+FILTROS = [
+    {},
+    {"socio": "2"},
+    {"tipo": "Vencido"},
+    {"desde": (datetime.now() - timedelta(days=300)).strftime('%Y-%m-%d'),
+     "hasta": (datetime.now() - timedelta(days=100)).strftime('%Y-%m-%d')},
+]
+
+
+def test_paginas_del_historial_iguales_antes_y_despues_de_archivar(historial_largo):
+    db = historial_largo
+    antes = [_todas_las_paginas(db, 50, **filtros) for filtros in FILTROS]
+    assert len(antes[0]) == 1200
+    assert [fila[0] for fila in antes[0]] == [fila[0] for fila in sorted(antes[0], key=lambda f: (f[1], f[0]), reverse=True)]
+
+    db.actualizar_asistencia()
+    movidas = db.archivo.archivar(meses=3)
+    assert movidas > 0
+    assert db.archivo.anios()
+    assert consultar(db, "SELECT COUNT(*) FROM historial_acceso") == [(1200 - movidas,)]
+
+    despues = [_todas_las_paginas(db, 50, **filtros) for filtros in FILTROS]
+    assert despues == antes
+
+
+def test_archivar_no_mueve_lo_que_no_se_resumio(historial_largo):
+    db = historial_largo
+    assert db.archivo.archivar(meses=3) == 0
+    db.actualizar_asistencia()
+    movidas = db.archivo.archivar(meses=3)
+    assert movidas > 0
+    total = consultar(db, "SELECT SUM(ingresos + rechazos) FROM asistencia_horaria")
+    assert total == [(1200,)]
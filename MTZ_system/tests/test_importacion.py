@@ -0,0 +1,68 @@
+from database import Database
+from exportacion import exportar_socios
+from importacion import importar_socios
+from conftest import alta, consultar
+
+COLUMNAS = "SELECT nombre, apellido, dni, plan_id, ingresos_restantes, fecha_vencimiento, activo FROM miembros ORDER BY dni"
+
+
+def _socios_variados(db):
+    alta(db, "1", ingresos=3, vencimiento="2030-05-01")
+    alta(db, "2", ingresos=0, vencimiento=None)
+    alta(db, "3", ingresos=7, vencimiento="2000-01-01", plan="Menores")
+    with db.transaccion() as cursor:
+        cursor.execute("UPDATE miembros SET activo = 0 WHERE dni = '3'")
+        cursor.execute(
+            "INSERT INTO miembros (nombre, apellido, dni, plan_id, ingresos_restantes) VALUES ('Sin', 'Plan', '4', NULL, 2)"
+        )
+
+
+def test_exportar_e_importar_no_cambia_nada(db, tmp_path):
+    _socios_variados(db)
+    antes = consultar(db, COLUMNAS)
+    archivo = str(tmp_path / "socios.csv")
+    assert exportar_socios(db, archivo, lote=2) == 4
+
+    resultado = importar_socios(db, archivo)
+    assert resultado["errores"] == []
+    assert (resultado["actualizados"], resultado["reactivados"]) == (4, 0)
+    assert consultar(db, COLUMNAS) == antes
+
+    # En una base nueva quedan los mismos socios (los planes se crean con los mismos ids)
+    otra = Database(str(tmp_path / "otra.db"))
+    otra.crear_tablas()
+    assert importar_socios(otra, archivo)["nuevos"] == 4
+    assert consultar(otra, COLUMNAS) == antes
+
+
+def test_vencimiento_vacio_conserva_el_del_socio(db, tmp_path):
+    alta(db, "1", vencimiento="2030-05-01")
+    archivo = tmp_path / "socios.csv"
+    archivo.write_text(
+        "Nombre;Apellido;DNI;Plan;Pases Restantes;Vencimiento;Activo\n"
+        "Ana;Paz;1;Libre;4;;SI\n"
+        "Luis;Sosa;2;Libre;4;;SI\n",
+        encoding="utf-8",
+    )
+    resultado = importar_socios(db, str(archivo))
+    assert (resultado["nuevos"], resultado["actualizados"]) == (1, 1)
+    assert consultar(db, "SELECT dni, ingresos_restantes, fecha_vencimiento FROM miembros ORDER BY dni") == [
+        ("1", 4, "2030-05-01"), ("2", 4, None),
+    ]
+
+
+def test_filas_invalidas_se_informan_y_no_se_importan(db, tmp_path):
+    archivo = tmp_path / "socios.csv"
+    archivo.write_text(
+        "Nombre;Apellido;DNI;Plan;Pases Restantes;Vencimiento;Activo\n"
+        "Ana;Paz;1;Libre;4;2030-01-01;SI\n"
+        "Ana;Paz;1;Libre;4;2030-01-01;SI\n"
+        "Luis;Sosa;2;Inexistente;4;;SI\n"
+        "Eva;Ruiz;3;Libre;-1;;SI\n"
+        "Juan;Gil;5;Libre;1;01/02/2030;SI\n",
+        encoding="utf-8",
+    )
+    resultado = importar_socios(db, str(archivo))
+    assert resultado["nuevos"] == 1
+    assert [linea for linea, _ in resultado["errores"]] == [3, 4, 5, 6]
+    assert consultar(db, "SELECT dni FROM miembros") == [("1",)]
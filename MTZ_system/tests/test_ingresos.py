@@ -0,0 +1,215 @@
+import json
+import os
+import sqlite3
+import threading
+
+from database import Database
+from kiosco_offline import KioscoOffline
+from conftest import alta, consultar
+
+
+def test_ultimo_pase_se_usa_una_sola_vez(db):
+    alta(db, "30111222", ingresos=1)
+    kioscos = 8
+    barrera = threading.Barrier(kioscos)
+    resultados = []
+    lock = threading.Lock()
+
+    def kiosco():
+        # Cada hilo con su propia conexión, como un kiosco más
+        propio = Database(db.db_path)
+        barrera.wait()
+        resultado = propio.registrar_ingreso("30111222")
+        with lock:
+            resultados.append(resultado)
+
+    hilos = [threading.Thread(target=kiosco) for _ in range(kioscos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sum(r["acceso"] for r in resultados) == 1
+    assert all(r["mensaje"] == "⛔ SIN PASES" for r in resultados if not r["acceso"])
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '30111222'") == [(0,)]
+    db.historial.vaciar()
+    assert consultar(db, "SELECT tipo_acceso, COUNT(*) FROM historial_acceso GROUP BY 1 ORDER BY 1") == [
+        ("Ingreso", 1), ("Sin Pases", kioscos - 1),
+    ]
+
+
+def test_ingresos_agrupados_respetan_el_orden(db):
+    alta(db, "1", ingresos=1)
+    alta(db, "2", ingresos=5, vencimiento="2000-01-01")
+    resultados = db.registrar_ingresos(["1", "2", "99", "1"])
+    assert [r and r["mensaje"] for r in resultados] == [
+        "PASE HABILITADO", "⛔ CUOTA VENCIDA", None, "⛔ SIN PASES",
+    ]
+
+
+def test_repetido_dentro_de_la_ventana_no_descuenta(db):
+    alta(db, "1", ingresos=3)
+    db.escaneos.configurar(ventana=60)
+    primero = db.registrar_ingreso("1")
+    segundo = db.registrar_ingreso("1")
+    assert primero["ingresos_restantes"] == 2
+    assert segundo["repetido"] and segundo["ingresos_restantes"] == 2
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '1'") == [(2,)]
+
+
+def test_diario_offline_se_aplica_una_sola_vez(db):
+    m_id = alta(db, "1", ingresos=5)
+    registros = [
+        ["a1", m_id, "2026-01-01 10:00:00", "Ingreso"],
+        ["a2", m_id, "2026-01-01 11:00:00", "Ingreso"],
+        ["a3", m_id, "2026-01-01 12:00:00", "Sin Pases"],
+    ]
+    assert db.aplicar_ingresos_offline(registros) == 3
+    # Reenviar el diario (se cortó antes de vaciarlo) no descuenta de nuevo
+    assert db.aplicar_ingresos_offline(registros) == 0
+    assert db.aplicar_ingresos_offline(registros[:1] + [["a4", m_id, "2026-01-01 13:00:00", "Ingreso"]]) == 1
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE id = ?", (m_id,)) == [(2,)]
+    assert consultar(db, "SELECT COUNT(*) FROM historial_acceso") == [(4,)]
+
+
+class BaseCaida:
+    """Database que no responde: cada escaneo cae en la foto local"""
+
+    def __init__(self, db):
+        self.db = db
+        self.gestor = db.gestor
+        self.caida = True
+
+    def __getattr__(self, nombre):
+        return getattr(self.db, nombre)
+
+    def registrar_ingresos(self, dnis, estricto=False):
+        if self.caida:
+            raise sqlite3.OperationalError("unable to open database file")
+        return self.db.registrar_ingresos(dnis, estricto)
+
+    def aplicar_ingresos_offline(self, registros):
+        if self.caida:
+            raise sqlite3.OperationalError("unable to open database file")
+        return self.db.aplicar_ingresos_offline(registros)
+
+
+def test_kiosco_sin_base_decide_con_la_foto_y_repone_al_volver(db, tmp_path):
+    alta(db, "1", ingresos=2)
+    base = BaseCaida(db)
+    base.caida = False
+    kiosco = KioscoOffline(base, str(tmp_path / "local"))
+    assert kiosco.sincronizar()
+    assert len(kiosco) == 1
+
+    base.caida = True
+    resultados = [kiosco.registrar_ingreso("1") for _ in range(3)]
+    assert [r["acceso"] for r in resultados] == [True, True, False]
+    assert all(r["sin_conexion"] for r in resultados)
+    assert kiosco.registrar_ingreso("99") is None
+    with open(kiosco.ruta_diario, encoding="utf-8") as diario:
+        anotados = [json.loads(linea) for linea in diario]
+    assert len(anotados) == 3
+
+    # La base vuelve: el diario se aplica una vez y la foto toma los pases de la base
+    base.caida = False
+    assert kiosco.sincronizar()
+    assert not kiosco.pendientes()
+    assert db.aplicar_ingresos_offline(anotados) == 0
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '1'") == [(0,)]
+    assert kiosco.registrar_ingreso("1")["mensaje"] == "⛔ SIN PASES"
+    kiosco.cerrar()
+
+
+def test_kiosco_reiniciado_durante_el_corte_conserva_la_foto(db, tmp_path):
+    alta(db, "1", ingresos=2)
+    base = BaseCaida(db)
+    base.caida = False
+    local = str(tmp_path / "local")
+    kiosco = KioscoOffline(base, local)
+    kiosco.sincronizar()
+    base.caida = True
+    kiosco.registrar_ingreso("1")
+    kiosco.cerrar()
+
+    reiniciado = KioscoOffline(base, local)
+    assert reiniciado.registrar_ingreso("1")["ingresos_restantes"] == 0
+    assert reiniciado.pendientes()
+    reiniciado.cerrar()
+
+
+def test_foto_y_diario_van_en_el_disco_local_una_carpeta_por_base(db, tmp_path, monkeypatch):
+    from kiosco_offline import _directorio_local
+    monkeypatch.delenv("MTZ_DIR_KIOSCO")
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "local"))
+    carpeta = _directorio_local(db.db_path)
+    assert carpeta.startswith(str(tmp_path / "local"))
+    assert os.path.dirname(db.db_path) not in (carpeta, os.path.dirname(carpeta))
+    assert _directorio_local(str(tmp_path / "otra.db")) != carpeta
+
+
+def test_dos_kioscos_en_la_misma_carpeta_no_se_pisan_el_diario(db, tmp_path):
+    alta(db, "1", ingresos=10)
+    base = BaseCaida(db)
+    base.caida = False
+    local = str(tmp_path / "local")
+    primero = KioscoOffline(base, local)
+    segundo = KioscoOffline(base, local)
+    assert primero.sincronizar() and segundo.sincronizar()
+
+    base.caida = True
+    for _ in range(2):
+        primero.registrar_ingreso("1")
+    for _ in range(3):
+        segundo.registrar_ingreso("1")
+    assert primero.ruta_diario != segundo.ruta_diario
+
+    # El primero aplica lo suyo; el diario del segundo (abierto) no se toca
+    base.caida = False
+    assert primero.sincronizar()
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '1'") == [(8,)]
+    assert segundo.pendientes()
+    assert segundo.sincronizar()
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '1'") == [(5,)]
+    primero.cerrar()
+    segundo.cerrar()
+
+
+def test_diario_de_un_kiosco_cerrado_lo_aplica_el_siguiente(db, tmp_path):
+    alta(db, "1", ingresos=10)
+    base = BaseCaida(db)
+    base.caida = False
+    local = str(tmp_path / "local")
+    cerrado = KioscoOffline(base, local)
+    cerrado.sincronizar()
+    base.caida = True
+    cerrado.registrar_ingreso("1")
+    cerrado.cerrar()
+    assert os.path.exists(cerrado.ruta_diario)
+
+    base.caida = False
+    siguiente = KioscoOffline(base, local)
+    assert siguiente.registrar_ingreso("1")["ingresos_restantes"] == 8
+    assert not os.path.exists(cerrado.ruta_diario)
+    siguiente.cerrar()
+    assert os.listdir(local) and not any(nombre.startswith("diario-") for nombre in os.listdir(local))
+
+
+def test_sin_diario_el_ingreso_local_devuelve_error(db, tmp_path, monkeypatch):
+    alta(db, "1", ingresos=2)
+    base = BaseCaida(db)
+    base.caida = False
+    kiosco = KioscoOffline(base, str(tmp_path / "local"))
+    kiosco.sincronizar()
+    base.caida = True
+
+    def sin_disco(registro):
+        raise OSError("No such device")
+
+    monkeypatch.setattr(kiosco, "_anotar", sin_disco)
+    resultado = kiosco.registrar_ingreso("1")
+    assert "No such device" in resultado["error"]
+    # No se anotó: tampoco se descuenta el pase de la foto
+    del kiosco._anotar
+    assert kiosco.registrar_ingreso("1")["ingresos_restantes"] == 1
+    kiosco.cerrar()
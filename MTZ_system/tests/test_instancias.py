@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+from cache_escaneos import CacheEscaneos
+from database import GestorConexiones
+from entorno import numero_env
+from escritor_db import EjecutorEscrituras
+from metricas import ServicioMetricas
+
+
+def test_una_instancia_por_base_y_por_clase(db, tmp_path):
+    assert GestorConexiones.obtener(db.db_path) is db.gestor
+    assert EjecutorEscrituras.obtener(db.gestor) is db.escritor
+    assert ServicioMetricas.obtener(db) is ServicioMetricas.obtener(db)
+    assert CacheEscaneos.obtener(db.db_path) is db.escaneos
+    otra = str(tmp_path / "otra.db")
+    assert GestorConexiones.obtener(otra) is not db.gestor
+    # Cada clase lleva su propio registro
+    assert db.db_path in GestorConexiones._instancias
+    assert db.db_path in CacheEscaneos._instancias
+    assert GestorConexiones._instancias is not CacheEscaneos._instancias
+
+
+def test_numero_env_usa_el_defecto_si_el_valor_no_sirve(monkeypatch, capsys):
+    monkeypatch.setenv("MTZ_PRUEBA", "12")
+    assert numero_env("MTZ_PRUEBA", 5) == 12
+    monkeypatch.setenv("MTZ_PRUEBA", "2.5")
+    assert numero_env("MTZ_PRUEBA", 5.0) == 2.5
+    assert numero_env("MTZ_PRUEBA", 5) == 5
+    assert "MTZ_PRUEBA" in capsys.readouterr().out
+    monkeypatch.setenv("MTZ_PRUEBA", " ")
+    assert numero_env("MTZ_PRUEBA", 5) == 5
+    monkeypatch.delenv("MTZ_PRUEBA")
+    assert numero_env("MTZ_PRUEBA", 5) == 5
+
+
+def test_variables_mal_escritas_no_impiden_importar(monkeypatch):
+    for nombre in ("MTZ_VENTANA_REPETIDOS", "MTZ_SQL_LENTO_MS", "MTZ_MESES_HISTORIAL", "MTZ_PUERTO_INGRESOS"):
+        monkeypatch.setenv(nombre, "abc")
+    # Se importa en otro proceso: los valores se leen al definir las clases
+    resultado = subprocess.run(
+        [sys.executable, "-c", "import database, servicio_ingresos; print(servicio_ingresos.PUERTO)"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True, text=True,
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.strip().endswith("8765")
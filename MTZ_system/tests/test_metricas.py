@@ -0,0 +1,33 @@
+import sqlite3
+
+from database import Database
+from metricas import ServicioMetricas
+from conftest import alta
+
+
+def test_metricas_en_cache_hasta_que_cambia_la_base(db):
+    alta(db, "1", vencimiento="2000-01-01")
+    servicio = ServicioMetricas.obtener(db)
+    primeras = servicio.metricas()
+    recalculos = servicio.recalculos
+    assert servicio.metricas() is primeras
+    assert servicio.recalculos == recalculos
+    assert primeras["al_dia"] == primeras["activos"] - primeras["vencidos"] == 0
+
+    # Escritura de este proceso
+    alta(db, "2")
+    assert servicio.metricas()["activos"] == 2
+
+    # Escritura de otro proceso o conexión: la avisa PRAGMA data_version
+    externa = sqlite3.connect(db.db_path)
+    with externa:
+        externa.execute("UPDATE miembros SET activo = 0 WHERE dni = '1'")
+    externa.close()
+    metricas = servicio.metricas()
+    assert (metricas["activos"], metricas["vencidos"], metricas["al_dia"]) == (1, 0, 1)
+
+
+def test_dashboard_y_reportes_comparten_el_servicio(db):
+    otra = Database(db.db_path)
+    assert ServicioMetricas.obtener(otra) is ServicioMetricas.obtener(db)
+
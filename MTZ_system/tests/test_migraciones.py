@@ -0,0 +1,79 @@
+import sqlite3
+
+from database import Database
+from migraciones import VERSION_ESQUEMA, aplicar_migraciones, version_actual
+from conftest import consultar
+
+# Esquema de las bases creadas antes de las migraciones (user_version 0)
+ESQUEMA_ORIGINAL = '''
+    CREATE TABLE planes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT UNIQUE NOT NULL,
+        precio REAL NOT NULL
+    );
+    CREATE TABLE miembros (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL,
+        apellido TEXT NOT NULL,
+        dni TEXT UNIQUE NOT NULL,
+        plan_id INTEGER,
+        ingresos_restantes INTEGER DEFAULT 0,
+        ultimo_pago DATE,
+        fecha_vencimiento DATE,
+        fecha_registro DATE DEFAULT CURRENT_DATE,
+        activo BOOLEAN DEFAULT 1,
+        FOREIGN KEY(plan_id) REFERENCES planes(id)
+    );
+    CREATE TABLE historial_acceso (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        miembro_id INTEGER,
+        fecha_hora DATETIME DEFAULT CURRENT_TIMESTAMP,
+        tipo_acceso TEXT,
+        FOREIGN KEY(miembro_id) REFERENCES miembros(id)
+    );
+    INSERT INTO planes (nombre, precio) VALUES ('Libre', 38000), ('Menores', 34000);
+    INSERT INTO miembros (nombre, apellido, dni, plan_id, ingresos_restantes, fecha_vencimiento, activo) VALUES
+        ('Ana', 'Paz', '1', 1, 5, '2999-01-01', 1),
+        ('Luis', 'Sosa', '2', 2, 0, '2000-01-01', 1),
+        ('Eva', 'Ruiz', '3', 1, 3, '2999-01-01', 0);
+    INSERT INTO historial_acceso (miembro_id, fecha_hora, tipo_acceso) VALUES
+        (1, '2025-03-01 10:00:00', 'Ingreso'),
+        (2, '2025-03-01 11:00:00', 'Vencido');
+'''
+
+
+def _base_original(ruta):
+    conn = sqlite3.connect(ruta)
+    conn.executescript(ESQUEMA_ORIGINAL)
+    conn.close()
+
+
+def test_base_original_sube_a_la_ultima_version(tmp_path):
+    ruta = str(tmp_path / "vieja.db")
+    _base_original(ruta)
+
+    db = Database(ruta)
+    db.crear_tablas()
+    assert version_actual(db.gestor.conexion()) == VERSION_ESQUEMA
+    # Los datos siguen y lo nuevo funciona sobre ellos
+    assert consultar(db, "SELECT dni, ingresos_restantes FROM miembros ORDER BY id") == [("1", 5), ("2", 0), ("3", 3)]
+    assert consultar(db, "SELECT COUNT(*) FROM historial_acceso") == [(2,)]
+    assert [fila[3] for fila in db.buscar_socios("Pa")] == ["1"]
+    assert db.obtener_metricas()["activos"] == 2
+    assert db.verificar_estadisticas() is True
+    assert db.actualizar_asistencia() == 2
+    assert db.registrar_ingreso("1")["ingresos_restantes"] == 4
+
+
+def test_migraciones_no_se_repiten(tmp_path):
+    ruta = str(tmp_path / "vieja.db")
+    _base_original(ruta)
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    assert aplicar_migraciones(conn) == list(range(1, VERSION_ESQUEMA + 1))
+    assert aplicar_migraciones(conn) == []
+    conn.close()
+
+
+def test_base_nueva_queda_en_la_ultima_version(db):
+    assert version_actual(db.gestor.conexion()) == VERSION_ESQUEMA
+    assert consultar(db, "SELECT COUNT(*) FROM planes") == [(5,)]
@@ -0,0 +1,84 @@
+"""Pantalla de acceso sin pantalla real (Qt offscreen)"""
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+from conftest import alta, consultar  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def monitor(app, db):
+    from monitor import VentanaPrincipal
+    ventana = VentanaPrincipal(db=db)
+    yield ventana
+    ventana.close()
+
+
+def escanear(app, ventana, dni):
+    ventana.input_dni.setText(dni)
+    ventana.procesar_dni()
+    ventana.pool.waitForDone()
+    # El resultado llega por señal desde el hilo del pool
+    app.processEvents()
+
+
+def test_escaneo_muestra_el_resultado(app, monitor, db):
+    alta(db, "1", ingresos=3)
+    escanear(app, monitor, "1")
+    assert monitor.vistas.currentWidget() is monitor.vista_resultado
+    assert monitor.lbl_saldo.text() == "Ingresos restantes: 2"
+    escanear(app, monitor, "99")
+    assert monitor.lbl_error.text() == "DNI NO ENCONTRADO"
+
+
+def test_cerrar_y_reabrir_sigue_registrando(app, monitor, db):
+    alta(db, "1", ingresos=3)
+    escanear(app, monitor, "1")
+    monitor.close()
+    assert not monitor.timer_foto.isActive()
+
+    # Admin vuelve a mostrar la misma ventana
+    monitor.show()
+    assert monitor.timer_foto.isActive()
+    monitor.pool.waitForDone()
+    assert not monitor.kiosco.sin_conexion
+    escanear(app, monitor, "1")
+    assert monitor.lbl_saldo.text() == "Ingresos restantes: 1"
+    assert not monitor.anotados
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '1'") == [(1,)]
+
+
+def test_error_del_registro_pide_escanear_de_nuevo(app, monitor, monkeypatch):
+    def falla(dni):
+        raise RuntimeError("disco lleno")
+
+    monkeypatch.setattr(monitor.kiosco, "registrar_ingreso", falla)
+    escanear(app, monitor, "1")
+    assert monitor.lbl_error.text() == "ERROR AL REGISTRAR, ESCANEE DE NUEVO"
+    assert monitor.anotados[-1][1:] == ("1", "ERROR: disco lleno", "con error")
+
+
+def test_ingreso_sin_confirmar_no_pide_escanear_de_nuevo(app, monitor, monkeypatch):
+    monkeypatch.setattr(
+        monitor.kiosco, "registrar_ingreso", lambda dni: {"error": "timed out", "sin_confirmar": True}
+    )
+    escanear(app, monitor, "1")
+    assert monitor.lbl_error.text() == "INGRESO SIN CONFIRMAR"
+    assert monitor.anotados[-1][2] == "ERROR: timed out"
+
+
+def test_al_cerrar_se_guarda_el_historial_de_los_escaneos_en_curso(app, monitor, db):
+    alta(db, "1", ingresos=3)
+    monitor.input_dni.setText("1")
+    monitor.procesar_dni()
+    # Sin esperar al pool: el escaneo puede seguir en curso cuando se cierra
+    monitor.close()
+    assert consultar(db, "SELECT tipo_acceso FROM historial_acceso") == [("Ingreso",)]
@@ -0,0 +1,59 @@
+import pytest
+
+from conftest import consultar
+
+
+@pytest.fixture
+def socios(db):
+    planes = ["Libre", "Menores", "Box/Funcional"]
+    apellidos = ["Paz", "Sosa", "Ruiz", "Luna"]
+    with db.transaccion() as cursor:
+        cursor.execute("SELECT nombre, id FROM planes")
+        ids = dict(cursor.fetchall())
+        # Valores repetidos en cada columna: el desempate por id tiene que sostener el orden
+        cursor.executemany(
+            "INSERT INTO miembros (nombre, apellido, dni, plan_id, ingresos_restantes, activo) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (f"Socio{i % 7}", apellidos[i % 4], str(30000000 + i), ids[planes[i % 3]], i % 5, int(i % 11 != 0))
+                for i in range(230)
+            ],
+        )
+    return db
+
+
+def _recorrer(db, filtro, orden, descendente, limite=17):
+    filas = []
+    pagina = db.pagina_socios(filtro, limite, orden=orden, descendente=descendente)
+    while pagina:
+        filas += pagina
+        if len(pagina) < limite:
+            break
+        ultima = pagina[-1]
+        pagina = db.pagina_socios(filtro, limite, orden=orden, descendente=descendente,
+                                  clave=(ultima[orden], ultima[0]))
+    return filas
+
+
+@pytest.mark.parametrize("orden", range(6))
+@pytest.mark.parametrize("descendente", [True, False])
+@pytest.mark.parametrize("filtro", ["", "Paz", "socio3 paz", "3000012"])
+def test_paginas_por_clave_equivalen_a_una_sola_consulta(socios, orden, descendente, filtro):
+    completa = socios.pagina_socios(filtro, None, orden=orden, descendente=descendente)
+    assert completa
+    paginada = _recorrer(socios, filtro, orden, descendente)
+    assert paginada == completa
+    assert len({fila[0] for fila in paginada}) == len(paginada)
+    clave = (lambda f: (f[orden], f[0])) if orden else (lambda f: f[0])
+    assert paginada == sorted(completa, key=clave, reverse=descendente)
+
+
+def test_solo_socios_activos(socios):
+    activos = consultar(socios, "SELECT COUNT(*) FROM miembros WHERE activo = 1")[0][0]
+    assert len(_recorrer(socios, "", 0, True)) == activos
+
+
+def test_clave_inclusiva_repite_la_fila_de_partida(socios):
+    primera = socios.pagina_socios("", 10, orden=2)
+    ultima = primera[-1]
+    siguiente = socios.pagina_socios("", 10, orden=2, clave=(ultima[2], ultima[0]), inclusivo=True)
+    assert siguiente[0] == ultima
@@ -0,0 +1,55 @@
+import gzip
+import shutil
+import sqlite3
+
+import pytest
+
+from respaldo import crear_respaldo
+from conftest import alta, consultar
+
+
+@pytest.fixture
+def con_socios(db):
+    with db.transaccion() as cursor:
+        cursor.executemany(
+            "INSERT INTO miembros (nombre, apellido, dni, plan_id, ingresos_restantes) VALUES ('A', 'B', ?, 1, 3)",
+            [(str(dni),) for dni in range(2000)],
+        )
+    return db
+
+
+def _socios(ruta):
+    conn = sqlite3.connect(ruta)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM miembros").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_respaldo_es_una_foto_consistente_aunque_se_siga_escribiendo(con_socios, tmp_path):
+    db = con_socios
+    escritos = []
+
+    def progreso(copiadas, total):
+        # Un kiosco registra mientras se copia: no entra en la copia ni la frena
+        alta(db, f"nuevo{len(escritos)}")
+        escritos.append(copiadas)
+
+    destino = str(tmp_path / "respaldo.db")
+    resultado = crear_respaldo(db, destino, progreso=progreso, paginas=5)
+    assert resultado["integridad"] == "ok"
+    assert len(escritos) > 1
+    assert _socios(destino) == 2000
+    assert consultar(db, "SELECT COUNT(*) FROM miembros") == [(2000 + len(escritos),)]
+    assert not (tmp_path / "respaldo.db.parcial").exists()
+
+
+def test_respaldo_comprimido(con_socios, tmp_path):
+    destino = str(tmp_path / "respaldo.db.gz")
+    resultado = crear_respaldo(con_socios, destino)
+    assert resultado["bytes"] < resultado["bytes_base"]
+    copia = str(tmp_path / "copia.db")
+    with gzip.open(destino, "rb") as entrada, open(copia, "wb") as salida:
+        shutil.copyfileobj(entrada, salida)
+    assert _socios(copia) == 2000
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name.startswith("respaldo")) == ["respaldo.db.gz"]
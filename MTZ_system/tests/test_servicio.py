@@ -0,0 +1,105 @@
+import asyncio
+import socket
+import sqlite3
+import threading
+
+import pytest
+
+from servicio_ingresos import ClienteIngresos, IngresoConRespaldo, ServicioIngresos
+from conftest import alta, consultar
+
+
+@pytest.fixture
+def servicio(db):
+    """Servicio en un hilo con su propio loop, en un puerto libre"""
+    loop = asyncio.new_event_loop()
+    hilo = threading.Thread(target=loop.run_forever, daemon=True)
+    hilo.start()
+    servicio = ServicioIngresos(db, "127.0.0.1", 0)
+    asyncio.run_coroutine_threadsafe(servicio.iniciar(), loop).result(timeout=5)
+    yield servicio
+    asyncio.run_coroutine_threadsafe(servicio.detener(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    hilo.join()
+    loop.close()
+
+
+@pytest.fixture
+def cliente(servicio):
+    cliente = ClienteIngresos("127.0.0.1", servicio.puerto)
+    yield cliente
+    cliente.cerrar()
+
+
+def test_pedidos_de_varios_kioscos_se_registran_una_vez(db, servicio):
+    alta(db, "1", ingresos=5)
+    resultados = []
+    lock = threading.Lock()
+
+    def kiosco():
+        cliente = ClienteIngresos("127.0.0.1", servicio.puerto)
+        resultado = cliente.registrar_ingreso("1")
+        cliente.cerrar()
+        with lock:
+            resultados.append(resultado)
+
+    hilos = [threading.Thread(target=kiosco) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sum(r["acceso"] for r in resultados) == 5
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '1'") == [(0,)]
+    assert servicio.pedidos == 8
+
+
+def test_dni_inexistente_es_none(cliente):
+    assert cliente.registrar_ingreso("99") is None
+
+
+def test_error_de_la_base_no_es_dni_no_encontrado(db, cliente, monkeypatch):
+    alta(db, "1", ingresos=5)
+
+    def bloqueada(dnis, estricto=False):
+        if estricto:
+            raise sqlite3.OperationalError("database is locked")
+        return [None] * len(dnis)
+
+    monkeypatch.setattr(db, "registrar_ingresos", bloqueada)
+    assert cliente.registrar_ingreso("1") == {"error": "database is locked"}
+
+
+def test_respuesta_perdida_no_se_repite_en_la_base_local(db):
+    alta(db, "1", ingresos=5)
+    # Servidor que recibe el pedido y nunca contesta
+    servidor = socket.socket()
+    servidor.bind(("127.0.0.1", 0))
+    servidor.listen()
+    conexiones = []
+    hilo = threading.Thread(target=lambda: conexiones.append(servidor.accept()), daemon=True)
+    hilo.start()
+
+    cliente = ClienteIngresos("127.0.0.1", servidor.getsockname()[1], timeout=0.2)
+    respaldo = IngresoConRespaldo(cliente, db)
+    resultado = respaldo.registrar_ingreso("1")
+    assert resultado["sin_confirmar"] and resultado["error"]
+    assert consultar(db, "SELECT ingresos_restantes FROM miembros WHERE dni = '1'") == [(5,)]
+    respaldo.cerrar()
+    hilo.join()
+    for conexion, _ in conexiones:
+        conexion.close()
+    servidor.close()
+
+
+def test_el_servicio_escribe_por_el_hilo_escritor_de_la_base(db, cliente, monkeypatch):
+    alta(db, "1", ingresos=5)
+    hilos = []
+    original = db.registrar_ingresos
+
+    def registrar_ingresos(dnis, estricto=False):
+        hilos.append(threading.current_thread().name)
+        return original(dnis, estricto)
+
+    monkeypatch.setattr(db, "registrar_ingresos", registrar_ingresos)
+    assert cliente.registrar_ingreso("1")["ingresos_restantes"] == 4
+    assert hilos == ["EscritorDB"]